@@ -0,0 +1,284 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeFeed:
+    """
+    Shared feed of Message changes for live admin pages.
+
+    One background thread polls the change log and keeps the most recent
+    events in memory. Connected clients only wait on a condition and read from
+    that buffer, so the database is queried once per poll interval no matter
+    how many admin tabs are open. Clients that fall behind the buffer catch up
+    straight from the database.
+    """
+
+    def __init__(self, fetch_after: Callable[[int, int], List[Dict]], fetch_latest_id: Callable[[], int],
+                 poll_interval: float = 1.0, buffer_size: int = 1000, batch_size: int = 500,
+                 prune: Optional[Callable[[int], None]] = None, prune_every: int = 600):
+        """
+        Args:
+            fetch_after: Returns up to N events with change id greater than the given one, oldest first
+            fetch_latest_id: Returns the newest change id
+            poll_interval: Seconds between polls of the change log
+            buffer_size: Number of recent events kept in memory
+            batch_size: Maximum number of events read per poll
+            prune: Optional callback that deletes old change log rows, given the newest change id
+            prune_every: Number of polls between prune calls
+        """
+        self.fetch_after = fetch_after
+        self.fetch_latest_id = fetch_latest_id
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.prune = prune
+        self.prune_every = prune_every
+        self._buffer: Deque[Dict] = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._latest_id: Optional[int] = None
+        self._poller: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[], None]] = []
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Call callback from the poller thread whenever new events arrive."""
+        with self._cond:
+            self._listeners.append(callback)
+
+    @property
+    def latest_id(self) -> int:
+        self._ensure_started()
+        return self._latest_id
+
+    def _ensure_started(self) -> None:
+        with self._cond:
+            if self._poller is None:
+                self._latest_id = self.fetch_latest_id()
+                self._poller = threading.Thread(target=self._poll_loop, name='admin-feed', daemon=True)
+                self._poller.start()
+
+    def _poll_loop(self) -> None:
+        polls = 0
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                events = self.fetch_after(self._latest_id, self.batch_size)
+                polls += 1
+                if self.prune and polls % self.prune_every == 0:
+                    self.prune(self._latest_id)
+            except Exception as e:
+                logger.error("Error polling message changes: %s", e)
+                continue
+            if events:
+                with self._cond:
+                    self._buffer.extend(events)
+                    self._latest_id = events[-1]['change_id']
+                    self._cond.notify_all()
+                    listeners = list(self._listeners)
+                for listener in listeners:
+                    listener()
+
+    def buffered_events_after(self, after_id: int) -> Optional[List[Dict]]:
+        """
+        Return events newer than after_id from the in-memory buffer without waiting.
+
+        Returns:
+            Events oldest first, or None if the buffer no longer reaches back to after_id
+        """
+        self._ensure_started()
+        with self._cond:
+            if self._latest_id <= after_id:
+                return []
+            oldest = self._buffer[0]['change_id'] if self._buffer else None
+            if oldest is not None and oldest <= after_id + 1:
+                return [event for event in self._buffer if event['change_id'] > after_id]
+        return None
+
+    def wait_for_events(self, after_id: int, timeout: float) -> List[Dict]:
+        """
+        Return events newer than after_id, waiting up to timeout seconds for new ones.
+
+        Returns:
+            Events oldest first; empty list on timeout
+        """
+        self._ensure_started()
+        with self._cond:
+            if self._latest_id <= after_id:
+                self._cond.wait(timeout)
+        events = self.buffered_events_after(after_id)
+        if events is not None:
+            return events
+
+        # Клиент отстал от буфера (долгий разрыв соединения) — догоняем из базы
+        return self.fetch_after(after_id, self.batch_size)
+
+
+
+def format_sse_event(event: Dict) -> str:
+    return f"id: {event['change_id']}\nevent: message\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+class FeedStreamServer:
+    """
+    Server-sent events endpoint for a ChangeFeed that runs on one asyncio event loop.
+
+    A threaded WSGI server keeps a request thread busy for as long as a stream
+    is open. Here every connected admin tab is a coroutine waiting on a shared
+    asyncio.Event, so a thousand open tabs cost a thousand sockets and no
+    threads. The feed's poller thread wakes all clients through
+    call_soon_threadsafe; catching up from the database runs in the loop's
+    default executor.
+    """
+
+    def __init__(self, feed: ChangeFeed, path: str, keepalive: float = 15, retry_ms: int = 3000,
+                 allow_origin: str = ''):
+        """
+        Args:
+            feed: Source of change events
+            path: URL path served, e.g. /admin/api/messages/stream
+            keepalive: Seconds of silence after which a comment line is sent
+            retry_ms: Reconnect delay suggested to the browser
+            allow_origin: Value for Access-Control-Allow-Origin; empty allows pages served
+                from the same host on any port (the Flask admin on its own port)
+        """
+        self.feed = feed
+        self.path = path
+        self.keepalive = keepalive
+        self.retry_ms = retry_ms
+        self.allow_origin = allow_origin
+        self.clients = 0
+        self.port: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, host: str, port: int) -> 'FeedStreamServer':
+        """Listen on host:port from a background thread; returns once the socket is bound."""
+        started = threading.Event()
+        errors: List[BaseException] = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._changed = asyncio.Event()
+                self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, host, port))
+                self.port = self._server.sockets[0].getsockname()[1]
+            except BaseException as e:
+                errors.append(e)
+                started.set()
+                return
+            self.feed.add_listener(lambda: self._loop.call_soon_threadsafe(self._notify))
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='admin-feed-server', daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        logger.info("Admin live feed available at http://%s:%s%s", host, self.port, self.path)
+        return self
+
+    def shutdown(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _notify(self) -> None:
+        # Будим всех ожидающих и сразу заводим новое событие для следующего ожидания
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=10)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+
+        lines = head.decode('latin-1').split('\r\n')
+        parts = lines[0].split()
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        url = urlsplit(parts[1]) if len(parts) == 3 else None
+        if url is None or parts[0] != 'GET' or url.path != self.path:
+            await self._respond_error(writer, '404 Not Found')
+            return
+
+        last_id = headers.get('last-event-id') or parse_qs(url.query).get('last_id', [''])[0]
+        try:
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            await self._respond_error(writer, '400 Bad Request')
+            return
+
+        # Первое обращение к ленте читает базу и запускает опрос — не на цикле событий
+        latest_id = await asyncio.get_running_loop().run_in_executor(None, lambda: self.feed.latest_id)
+        if last_id is None:
+            last_id = latest_id
+
+        response = ['HTTP/1.1 200 OK', 'Content-Type: text/event-stream; charset=utf-8',
+                    'Cache-Control: no-cache', 'X-Accel-Buffering: no', 'Connection: close']
+        origin = self._allowed_origin(headers.get('origin'), headers.get('host'))
+        if origin:
+            response.append(f'Access-Control-Allow-Origin: {origin}')
+        writer.write(('\r\n'.join(response) + '\r\n\r\n' + f'retry: {self.retry_ms}\n\n').encode())
+
+        self.clients += 1
+        try:
+            await self._stream(writer, last_id)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def _stream(self, writer: asyncio.StreamWriter, last_id: int) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Событие берём до проверки буфера, чтобы не пропустить уведомление между ними
+            changed = self._changed
+            events = self.feed.buffered_events_after(last_id)
+            if events is None:
+                events = await loop.run_in_executor(None, self.feed.fetch_after, last_id, self.feed.batch_size)
+
+            if events:
+                last_id = events[-1]['change_id']
+                writer.write(''.join(format_sse_event(event) for event in events).encode())
+            else:
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=self.keepalive)
+                    continue
+                except asyncio.TimeoutError:
+                    writer.write(b': keepalive\n\n')
+            # Медленный клиент не должен копить буфер бесконечно
+            await asyncio.wait_for(writer.drain(), timeout=self.keepalive)
+
+    def _allowed_origin(self, origin: Optional[str], host: Optional[str]) -> Optional[str]:
+        if not origin:
+            return None
+        if self.allow_origin:
+            return self.allow_origin
+        if host and urlsplit(origin).hostname == urlsplit(f'//{host}').hostname:
+            return origin
+        return None
+
+    @staticmethod
+    async def _respond_error(writer: asyncio.StreamWriter, status: str) -> None:
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode())
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
@@ -1,21 +1,208 @@
-from flask import Flask, render_template, redirect, url_for, request
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from flask import Flask, render_template, redirect, url_for, request, abort, jsonify, Response
 from flask_sqlalchemy import SQLAlchemy
+from markupsafe import escape
+from sqlalchemy import and_, func, or_, text
 from config import Config
+from admin_feed import ChangeFeed, FeedStreamServer, format_sse_event
+from metrics import CONTENT_TYPE, REGISTRY, track_queries
+from storage import configure_sqlite, is_sqlite_file_url, sqlite_engine_options
 
 app = Flask(__name__)
 app.config.from_object(Config)
+if is_sqlite_file_url(Config.SQLALCHEMY_DATABASE_URI):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options()
 
 # Инициализация базы данных
 db = SQLAlchemy(app)
+with app.app_context():
+    # WAL и прагмы для каждого нового соединения пула
+    configure_sqlite(db.engine)
+    # Длительность каждого запроса к базе — в метрики /metrics
+    track_queries(db.engine)
 
-from models import Message
+from models import Message, MessageChange, create_message_indexes, create_search_index, create_change_triggers
+
+# Индексы keyset-пагинации и полнотекстовый индекс для баз, созданных до их появления;
+# FTS-индекс строится при запуске, а не в первом поисковом запросе
+with app.app_context():
+    with db.engine.begin() as connection:
+        create_message_indexes(connection)
+        create_search_index(connection)
+
+
+# Колонки для списка сообщений: без полных текстов сообщения и комментария
+MESSAGE_LIST_COLUMNS = (
+    Message.id,
+    Message.user_id,
+    Message.username,
+    Message.first_name,
+    Message.is_resolved,
+    Message.created_at,
+    func.substr(Message.message_text, 1, Config.ADMIN_PREVIEW_LENGTH).label('preview'),
+)
+
+
+def encode_cursor(message) -> str:
+    """Build a keyset cursor from the last message of a page."""
+    return f"{message.created_at.isoformat()}_{message.id}"
+
+
+def decode_cursor(cursor: str):
+    """Parse a keyset cursor into (created_at, id); abort with 400 if it is malformed."""
+    try:
+        created_at, message_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(message_id)
+    except ValueError:
+        abort(400, 'Invalid cursor')
+
+
+def parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        abort(400, f'Invalid date: {value}')
+
+
+def message_filters(args) -> list:
+    """Build SQL conditions from the is_resolved, user_id, date_from and date_to query parameters."""
+    conditions = []
+    if args.get('is_resolved') in ('0', '1'):
+        conditions.append(Message.is_resolved == (args['is_resolved'] == '1'))
+    if args.get('user_id'):
+        user_id = args.get('user_id', type=int)
+        if user_id is None:
+            abort(400, 'Invalid user_id')
+        conditions.append(Message.user_id == user_id)
+    if args.get('date_from'):
+        conditions.append(Message.created_at >= parse_date(args['date_from']))
+    if args.get('date_to'):
+        # date_to включительно
+        conditions.append(Message.created_at < parse_date(args['date_to']) + timedelta(days=1))
+    return conditions
+
+
+def list_messages(args):
+    """
+    Return one page of messages, newest first, using keyset pagination.
+
+    Returns:
+        Tuple (rows, next_cursor); next_cursor is None on the last page
+    """
+    limit = max(1, min(args.get('limit', Config.ADMIN_PAGE_SIZE, type=int), Config.ADMIN_MAX_PAGE_SIZE))
+    query = db.select(*MESSAGE_LIST_COLUMNS).where(*message_filters(args))
+
+    if args.get('cursor'):
+        created_at, message_id = decode_cursor(args['cursor'])
+        query = query.where(or_(
+            Message.created_at < created_at,
+            and_(Message.created_at == created_at, Message.id < message_id),
+        ))
+
+    query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+    rows = db.session.execute(query).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
 
 
 # Главная страница с сообщениями
 @app.route('/admin/messages')
 def admin_messages():
-    messages = Message.query.all()  # Получаем все сообщения
-    return render_template('admin_messages.html', messages=messages)
+    messages, next_cursor = list_messages(request.args)
+    filters = {key: request.args[key] for key in ('is_resolved', 'user_id', 'date_from', 'date_to') if request.args.get(key)}
+    return render_template('admin_messages.html', messages=messages, next_cursor=next_cursor, filters=filters)
+
+
+# Маркеры подсветки в snippet(); заменяются на <mark> после экранирования HTML
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+SEARCH_SQL = text(f"""
+    SELECT m.id, m.user_id, m.username, m.first_name, m.is_resolved, m.created_at,
+           snippet(message_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}', '…', :tokens) AS text_snippet,
+           snippet(message_fts, 1, '{SNIPPET_START}', '{SNIPPET_END}', '…', :tokens) AS comment_snippet,
+           bm25(message_fts) AS score
+    FROM message_fts
+    JOIN message AS m ON m.id = message_fts.rowid
+    WHERE message_fts MATCH :match
+    ORDER BY score
+    LIMIT :limit OFFSET :offset
+""").columns(created_at=db.DateTime, is_resolved=db.Boolean)
+
+
+def build_match_query(query: str) -> str:
+    """Turn user input into an FTS5 query matching all words, with FTS syntax characters escaped."""
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    return ' '.join(terms)
+
+
+def highlight(snippet) -> str:
+    """Escape a snippet and wrap the matched words in <mark>."""
+    if not snippet:
+        return ''
+    return str(escape(snippet)).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+
+
+def search_messages(query: str, page: int, per_page: int):
+    """
+    Full-text search over message texts and admin comments, best matches first.
+
+    Returns:
+        Tuple (results, has_more) where results is a list of dicts with highlighted snippets
+    """
+    match = build_match_query(query)
+    if not match:
+        return [], False
+
+    rows = db.session.execute(SEARCH_SQL, {
+        'match': match,
+        'tokens': Config.SEARCH_SNIPPET_TOKENS,
+        'limit': per_page + 1,
+        'offset': (page - 1) * per_page,
+    }).all()
+
+    results = [{
+        'id': row.id,
+        'user_id': row.user_id,
+        'username': row.username,
+        'first_name': row.first_name,
+        'is_resolved': row.is_resolved,
+        'created_at': row.created_at,
+        'text_snippet': highlight(row.text_snippet),
+        'comment_snippet': highlight(row.comment_snippet),
+        'score': row.score,
+    } for row in rows[:per_page]]
+    return results, len(rows) > per_page
+
+
+def search_args():
+    query = request.args.get('q', '').strip()
+    page = max(1, request.args.get('page', 1, type=int))
+    if page > Config.SEARCH_MAX_PAGE:
+        abort(400, 'Page number is too large, refine the query')
+    per_page = max(1, min(request.args.get('per_page', Config.ADMIN_PAGE_SIZE, type=int), Config.ADMIN_MAX_PAGE_SIZE))
+    return query, page, per_page
+
+
+# Поиск по сообщениям (страница со строкой поиска)
+@app.route('/admin/messages/search')
+def admin_search_messages():
+    query, page, per_page = search_args()
+    results, has_more = search_messages(query, page, per_page)
+    return render_template('admin_messages.html', messages=results, search_query=query,
+                           page=page, has_more=has_more, filters={})
+
+
+# Поиск по сообщениям (JSON)
+@app.route('/admin/api/messages/search')
+def api_search_messages():
+    query, page, per_page = search_args()
+    results, has_more = search_messages(query, page, per_page)
+    for result in results:
+        result['created_at'] = result['created_at'].isoformat() if result['created_at'] else None
+    return jsonify({'query': query, 'page': page, 'per_page': per_page, 'has_more': has_more, 'results': results})
 
 
 # Страница с деталями сообщения
@@ -33,6 +220,8 @@ def admin_message_details(message_id):
 
         db.session.commit()  # Сохраняем изменения в базе данных
 
+        if wants_json():
+            return jsonify(message_status(message))
         return redirect(url_for('admin_messages'))  # Перенаправляем на список сообщений
 
     return render_template('message_details.html', message=message)
@@ -44,11 +233,211 @@ def admin_toggle_message_status(message_id):
     message = Message.query.get_or_404(message_id)
     message.is_resolved = not message.is_resolved
     db.session.commit()
+    if wants_json():
+        return jsonify(message_status(message))
     return redirect(url_for('admin_message_details', message_id=message.id))
+
+
+# Массовые операции над сообщениями одним запросом и одной транзакцией
+BULK_ACTIONS = {
+    'resolve': {'is_resolved': True},
+    'reopen': {'is_resolved': False},
+    'comment': {},
+}
+
+
+@app.route('/admin/api/messages/bulk', methods=['POST'])
+def api_bulk_update_messages():
+    """
+    Resolve, reopen or comment on a set of messages.
+
+    Expects JSON {"ids": [...], "action": "resolve" | "reopen" | "comment", "comment": "..."}.
+    A comment may be sent with any action; it is required for "comment".
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    action = data.get('action')
+
+    if action not in BULK_ACTIONS:
+        return jsonify({'error': f"action must be one of {sorted(BULK_ACTIONS)}"}), 400
+    if not isinstance(ids, list) or not ids or not all(type(i) is int for i in ids):
+        return jsonify({'error': 'ids must be a non-empty list of integers'}), 400
+    if len(ids) > Config.ADMIN_BULK_MAX_IDS:
+        return jsonify({'error': f'at most {Config.ADMIN_BULK_MAX_IDS} ids per request'}), 400
+
+    values = dict(BULK_ACTIONS[action])
+    if 'comment' in data:
+        comment = data['comment']
+        if not isinstance(comment, str):
+            return jsonify({'error': 'comment must be a string'}), 400
+        values['admin_comment'] = comment
+    if action == 'comment' and not values.get('admin_comment', '').strip():
+        return jsonify({'error': 'comment is required'}), 400
+
+    updated = db.session.execute(
+        db.update(Message).where(Message.id.in_(ids)).values(**values).returning(Message.id)
+    ).scalars().all()
+    db.session.commit()
+
+    return jsonify({
+        'action': action,
+        'updated': sorted(updated),
+        'missing': sorted(set(ids) - set(updated)),
+    })
+
+
+def wants_json() -> bool:
+    """Whether the client (the admin page script) asked for a JSON response instead of a redirect."""
+    return request.accept_mimetypes.best == 'application/json'
+
+
+def message_status(message) -> dict:
+    return {'id': message.id, 'is_resolved': message.is_resolved, 'admin_comment': message.admin_comment}
+
+
+# Живая лента изменений сообщений для админки (server-sent events)
+def fetch_changes_after(change_id: int, limit: int) -> list:
+    """Read message changes newer than change_id from the change log."""
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(MessageChange.id.label('change_id'), *MESSAGE_LIST_COLUMNS)
+            .join(Message, Message.id == MessageChange.message_id)
+            .where(MessageChange.id > change_id)
+            .order_by(MessageChange.id)
+            .limit(limit)
+        ).all()
+        return [{
+            'change_id': row.change_id,
+            'id': row.id,
+            'user_id': row.user_id,
+            'username': row.username,
+            'first_name': row.first_name,
+            'is_resolved': row.is_resolved,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'preview': row.preview,
+        } for row in rows]
+
+
+def fetch_latest_change_id() -> int:
+    with app.app_context():
+        with db.engine.begin() as connection:
+            MessageChange.__table__.create(connection, checkfirst=True)
+            create_change_triggers(connection)
+        return db.session.execute(db.select(func.max(MessageChange.id))).scalar() or 0
+
+
+def prune_changes(latest_id: int) -> None:
+    with app.app_context():
+        db.session.execute(db.delete(MessageChange).where(MessageChange.id <= latest_id - Config.ADMIN_FEED_RETENTION))
+        db.session.commit()
+
+
+message_feed = ChangeFeed(
+    fetch_after=fetch_changes_after,
+    fetch_latest_id=fetch_latest_change_id,
+    poll_interval=Config.ADMIN_FEED_POLL_INTERVAL,
+    prune=prune_changes,
+)
+
+
+# Сервер ленты на asyncio; запускается при первом запросе, пока None — лента отдаётся маршрутом Flask
+feed_server: Optional[FeedStreamServer] = None
+_feed_server_lock = threading.Lock()
+_feed_server_attempted = False
+
+
+@app.context_processor
+def admin_script_context():
+    """Expose the admin page script for <script src="{{ admin_script_url }}" defer></script>."""
+    return {'admin_script_url': url_for('static', filename='admin.js')}
+
+
+@app.context_processor
+def live_feed_context():
+    """Expose the stream URL for <body data-live-feed="{{ live_feed_url }}">."""
+    if feed_server is None:
+        return {'live_feed_url': url_for('api_message_stream')}
+    scheme, host = request.scheme, request.host.rsplit(':', 1)[0]
+    return {'live_feed_url': f'{scheme}://{host}:{feed_server.port}{feed_server.path}'}
+
+
+@app.route('/admin/api/messages/stream')
+def api_message_stream():
+    """
+    Stream new and changed messages as server-sent events.
+
+    Each event id is a change id; on reconnect the browser sends it back in
+    Last-Event-ID (or the page passes ?last_id=) and only later changes are sent.
+    This route holds a WSGI thread per client; pages use the asyncio feed
+    server (ADMIN_FEED_PORT) when it is running.
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_id = int(last_id) if last_id else message_feed.latest_id
+    except ValueError:
+        abort(400, 'Invalid last event id')
+
+    def stream(last_id):
+        yield f'retry: {Config.ADMIN_FEED_RETRY_MS}\n\n'
+        while True:
+            events = message_feed.wait_for_events(last_id, timeout=Config.ADMIN_FEED_KEEPALIVE)
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            for event in events:
+                last_id = event['change_id']
+                yield format_sse_event(event)
+
+    return Response(stream(last_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics of the admin process."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
 @app.route('/')
 def hello():
     return 'Hello, World!'
 
 
+def start_feed_server() -> FeedStreamServer:
+    """Serve the live feed from an asyncio event loop so open admin tabs don't hold WSGI threads."""
+    global feed_server
+    feed_server = FeedStreamServer(
+        message_feed,
+        path='/admin/api/messages/stream',
+        keepalive=Config.ADMIN_FEED_KEEPALIVE,
+        retry_ms=Config.ADMIN_FEED_RETRY_MS,
+        allow_origin=Config.ADMIN_FEED_ALLOW_ORIGIN,
+    ).start(Config.ADMIN_FEED_HOST, Config.ADMIN_FEED_PORT)
+    return feed_server
+
+
+@app.before_request
+def ensure_feed_server() -> None:
+    """
+    Start the feed server on the first request of the process that serves requests.
+
+    Works the same under app.run and WSGI servers. The reloader's parent
+    process never serves requests, so it never takes the port. With several
+    worker processes only the first one binds it; the others keep the Flask
+    route.
+    """
+    global _feed_server_attempted
+    if _feed_server_attempted or not Config.ADMIN_FEED_PORT:
+        return
+    with _feed_server_lock:
+        if _feed_server_attempted:
+            return
+        _feed_server_attempted = True
+        try:
+            start_feed_server()
+        except OSError as e:
+            app.logger.warning("Live feed server not started on port %s: %s", Config.ADMIN_FEED_PORT, e)
+
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
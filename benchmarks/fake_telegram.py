@@ -0,0 +1,166 @@
+"""
+Local fake of the Telegram Bot API for benchmarks.
+
+Serves getUpdates from an in-memory queue and records every outgoing bot call
+(sendMessage and friends) with its arrival time, so a benchmark can measure
+how long it took from an update being produced to the bot's reply.
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def make_message_update(update_id: int, user_id: int, text: str) -> Dict:
+    """Build a private-chat text message update."""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': f'u{update_id}'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'u{update_id}'},
+            'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+            if text.startswith('/') else [],
+        },
+    }
+
+
+def make_callback_update(update_id: int, user_id: int, data: str, message_id: int = 1) -> Dict:
+    """Build a press of an inline keyboard button under a bot message in a private chat."""
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'u{update_id}'},
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': {'id': 1, 'is_bot': True, 'first_name': 'bench'},
+                'text': 'menu',
+            },
+        },
+    }
+
+
+class FakeTelegramServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), FakeTelegramHandler)
+        self.lock = threading.Lock()
+        self.updates_ready = threading.Condition(self.lock)
+        self.pending: List[Dict] = []
+        # Время появления обновления по update_id и записанные вызовы бота
+        self.produced_at: Dict[int, float] = {}
+        self.calls: List[Dict] = []
+        self._next_message_id = 1
+        # Вызывается с каждым записанным вызовом бота (вне блокировки)
+        self.on_call: Optional[Callable[[Dict], None]] = None
+
+    @property
+    def api_url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}/bot{{0}}/{{1}}'
+
+    def start(self) -> 'FakeTelegramServer':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def handle_error(self, request, client_address):
+        # Бот закрывает соединение long polling при остановке — это не ошибка
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def push_update(self, update: Dict) -> None:
+        """Queue an update for getUpdates."""
+        with self.updates_ready:
+            self.produced_at[update['update_id']] = time.perf_counter()
+            self.pending.append(update)
+            self.updates_ready.notify_all()
+
+    def mark_produced(self, update_id: int) -> None:
+        with self.lock:
+            self.produced_at[update_id] = time.perf_counter()
+
+    def calls_of(self, method: str) -> List[Dict]:
+        with self.lock:
+            return [call for call in self.calls if call['method'] == method]
+
+    def get_updates(self, offset: int, limit: int, timeout: float) -> List[Dict]:
+        deadline = time.monotonic() + timeout
+        with self.updates_ready:
+            self.pending = [u for u in self.pending if u['update_id'] >= offset]
+            while not self.pending and time.monotonic() < deadline:
+                self.updates_ready.wait(deadline - time.monotonic())
+            return self.pending[:limit]
+
+    def record_call(self, method: str, params: Dict) -> Dict:
+        call = {'method': method, 'params': params, 'time': time.perf_counter()}
+        with self.lock:
+            self.calls.append(call)
+            message_id = self._next_message_id
+            self._next_message_id += 1
+        if self.on_call is not None:
+            self.on_call(call)
+        if method in ('sendMessage', 'editMessageText'):
+            return {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+                'text': params.get('text', ''),
+            }
+        return True
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    server: FakeTelegramServer
+    disable_nagle_algorithm = True
+
+    def _handle(self):
+        url = urlparse(self.path)
+        method = url.path.rsplit('/', 1)[-1]
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            body = self.rfile.read(length)
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                params.update(json.loads(body))
+            else:
+                params.update(parse_qsl(body.decode()))
+
+        if method == 'sendMessage' and len(params.get('text', '')) > TELEGRAM_MESSAGE_LIMIT:
+            # Как настоящий Bot API: слишком длинный текст отклоняется
+            self._reply(400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: message is too long'})
+            return
+        if method == 'getUpdates':
+            result = self.server.get_updates(
+                int(params.get('offset', 0)), int(params.get('limit', 100)), float(params.get('timeout', 0)))
+        elif method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'bench', 'username': 'bench_bot'}
+        else:
+            result = self.server.record_call(method, params)
+
+        self._reply(200, {'ok': True, 'result': result})
+
+    def _reply(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,199 @@
+"""
+Offline benchmarks of the stats hot paths against the saved page corpus.
+
+Profile pages from benchmarks/corpus (normal profile, "Нет игр", not found,
+huge tables, partial page) are served by a local iccup.com stub, and the
+following are timed for each page:
+
+    get_player_stats.cold    HTTP fetch + parse (stats cache cleared every call)
+    get_player_stats.warm    cache hit (negative cache hit for the not found page)
+    parse.<backend>          parse_player_stats with every available backend
+    format_stats_message     rendering of the /stats reply
+    analyze_player_performance
+
+Results are printed as JSON (and written to --output). With --compare the
+p50 of every benchmark is checked against a previous result file, and the
+script exits with status 1 if any got slower by more than --threshold.
+
+    python benchmarks/hot_paths.py --output baseline.json
+    python benchmarks/hot_paths.py --compare baseline.json --threshold 0.2
+"""
+import os
+
+# Бенчмарк не должен писать историю, ходить в фон и создавать журналы
+os.environ.setdefault('HISTORY_ENABLED', '0')
+os.environ.setdefault('PREFETCH_ENABLED', '0')
+os.environ.setdefault('USER_STATE_PATH', '')
+
+import argparse  # noqa: E402
+import datetime  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import platform  # noqa: E402
+import statistics  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+from typing import Callable, Dict, List  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import scraper  # noqa: E402
+from bot import analyze_player_performance, format_stats_message  # noqa: E402
+from iccup_stub import IccupStubServer, load_corpus  # noqa: E402
+
+
+def measure(func: Callable[[], object], iterations: int, min_time: float) -> Dict[str, float]:
+    """
+    Time func, repeating it at least iterations times and for at least min_time seconds.
+
+    Returns:
+        Dict with 'iterations' and 'min_us', 'p50_us', 'p95_us', 'mean_us' per call
+    """
+    func()  # прогрев: импорты, пулы соединений, кэши парсеров
+    timings: List[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < iterations or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'iterations': len(timings),
+        'min_us': round(timings[0] * 1e6, 1),
+        'p50_us': round(statistics.median(timings) * 1e6, 1),
+        'p95_us': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1e6, 1),
+        'mean_us': round(statistics.fmean(timings) * 1e6, 1),
+    }
+
+
+def available_backends() -> List[str]:
+    return [backend for backend in scraper.PARSER_BACKENDS if scraper.get_parser_backend(backend) == backend]
+
+
+def run_benchmarks(pages: Dict[str, bytes], iterations: int, min_time: float,
+                   only: str = '') -> Dict[str, Dict[str, float]]:
+    results = {}
+
+    def bench(name, func):
+        if only in name:
+            results[name] = measure(func, iterations, min_time)
+
+    def cold(nickname):
+        scraper._stats_cache.clear()
+        scraper._not_found_cache.clear()
+        return scraper.get_player_stats(nickname)
+
+    for page, body in pages.items():
+        html = body.decode('utf-8')
+        bench(f'get_player_stats.cold.{page}', lambda: cold(page))
+        scraper.get_player_stats(page)
+        bench(f'get_player_stats.warm.{page}', lambda: scraper.get_player_stats(page))
+
+        for backend in available_backends():
+            bench(f'parse.{backend}.{page}', lambda: scraper.parse_player_stats(html, backend))
+
+        # Страница «не найден» до разбора не доходит, отображать нечего
+        stats = scraper.parse_profile_response(page, 200, html)
+        if stats:
+            bench(f'format_stats_message.{page}', lambda: format_stats_message(page, stats))
+            bench(f'analyze_player_performance.{page}', lambda: analyze_player_performance(stats))
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float, min_delta_us: float = 0.0) -> List[Dict]:
+    """
+    Find the benchmarks that got slower than in the baseline.
+
+    Args:
+        results: Current results by benchmark name
+        baseline: Previous results by benchmark name
+        threshold: Allowed relative growth of p50 (0.2 = 20%)
+        min_delta_us: Smaller absolute growth of p50 is treated as noise
+
+    Returns:
+        One dict per regression, sorted by benchmark name
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous or not previous.get('p50_us'):
+            continue
+        ratio = current['p50_us'] / previous['p50_us']
+        if ratio > 1 + threshold and current['p50_us'] - previous['p50_us'] >= min_delta_us:
+            regressions.append({
+                'benchmark': name,
+                'baseline_p50_us': previous['p50_us'],
+                'p50_us': current['p50_us'],
+                'ratio': round(ratio, 2),
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50, help='minimum calls per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per benchmark')
+    parser.add_argument('--delay', type=float, default=0.0, help='stub server latency per request, seconds')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--output', help='write the JSON result to this file')
+    parser.add_argument('--compare', help='previous JSON result to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed relative p50 slowdown before a regression is reported')
+    parser.add_argument('--min-delta-us', type=float, default=5.0,
+                        help='ignore p50 slowdowns smaller than this many microseconds')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    pages = load_corpus()
+    stub = IccupStubServer(delay=args.delay, pages=pages).start()
+    scraper.PROFILE_URL = stub.profile_url
+    try:
+        results = run_benchmarks(pages, args.iterations, args.min_time, args.filter)
+    finally:
+        scraper.close_http_session()
+        stub.shutdown()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parser_backends': available_backends(),
+            'corpus': {page: len(body) for page, body in pages.items()},
+            'stub_requests': stub.requests,
+        },
+        'results': results,
+    }
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold, args.min_delta_us)
+        report['regressions'] = regressions
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+    for regression in regressions:
+        print(f"REGRESSION {regression['benchmark']}: {regression['baseline_p50_us']} -> "
+              f"{regression['p50_us']} us (x{regression['ratio']})", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Local stand-in for iccup.com profile pages.
+
+Serves /dota/gamingprofile/<nickname>.html from the saved page corpus in
+benchmarks/corpus. A nickname is mapped to a page by its prefix
+(normal-17 -> normal.html); unknown nicknames get the "not found" page, as
+the real site does. An optional delay and error rate simulate a slow or
+failing site.
+"""
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import unquote
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+PROFILE_PREFIX = '/dota/gamingprofile/'
+
+
+def load_corpus(directory: str = CORPUS_DIR) -> Dict[str, bytes]:
+    """Read every saved page of the corpus: page name -> HTML bytes."""
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.html'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                pages[name[:-len('.html')]] = f.read()
+    return pages
+
+
+class IccupStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, delay: float = 0.0,
+                 pages: Optional[Dict[str, bytes]] = None, error_rate: float = 0.0, jitter: float = 0.0):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one)
+            delay: Seconds to wait before answering each request
+            pages: Page name -> HTML (default: the saved corpus)
+            error_rate: Share of requests answered with 503 Service Unavailable
+            jitter: Random extra delay, up to this many seconds
+        """
+        super().__init__((host, port), IccupStubHandler)
+        self.delay = delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.pages = pages if pages is not None else load_corpus()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def profile_url(self) -> str:
+        """Value for scraper.PROFILE_URL that points at this server."""
+        return f'http://127.0.0.1:{self.server_port}{PROFILE_PREFIX}{{nickname}}.html'
+
+    def start(self) -> 'IccupStubServer':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def page_for(self, nickname: str) -> bytes:
+        return self.pages.get(nickname.split('-')[0], self.pages['notfound'])
+
+
+class IccupStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело уходят отдельными write: без этого Nagle + delayed ACK дают +40 мс
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if not self.path.startswith(PROFILE_PREFIX) or not self.path.endswith('.html'):
+            self.send_error(404)
+            return
+        failed = random.random() < self.server.error_rate
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.errors += failed
+        delay = self.server.delay + random.uniform(0, self.server.jitter)
+        if delay:
+            time.sleep(delay)
+        if failed:
+            self.send_error(503)
+            return
+
+        nickname = unquote(self.path[len(PROFILE_PREFIX):-len('.html')])
+        body = self.server.page_for(nickname)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
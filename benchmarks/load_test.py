@@ -0,0 +1,302 @@
+"""
+Tournament-night load test of the bots against local fakes.
+
+The real handler set from setup_bot and the support bot's ticket handler from
+techsup run against a local fake Telegram Bot API, and the scraper fetches
+profiles from a local iccup.com stub with configurable latency and error
+rate. Simulated users arrive at --rate per second and play one scenario each:
+
+    menu    /start, a menu button, the "back to menu" inline button
+    stats   /stats <nick>, or the stats button followed by the nickname
+    ticket  a problem description to the support bot, then a clarification
+
+Every step waits for the bot's reply (sendMessage to the user's chat, or
+answerCallbackQuery) plus --think-time before the next one is sent. The
+result is printed as JSON: throughput and p50/p95/p99 latency from an update
+being available in getUpdates to the reply, overall and per scenario.
+
+Outgoing messages go through the production send limits (SEND_GLOBAL_RATE,
+SEND_CHAT_RATE); raise them through the environment to measure the bot's own
+capacity rather than Telegram's.
+
+    python benchmarks/load_test.py --users 2000 --rate 100 --iccup-delay 0.3 --iccup-error-rate 0.05
+"""
+import os
+import tempfile
+
+# Ничего не пишем в рабочий каталог: история, журналы состояний и тикетов — во временной папке
+WORK_DIR = tempfile.mkdtemp(prefix='load-test-')
+os.environ.setdefault('HISTORY_ENABLED', '0')
+os.environ.setdefault('PREFETCH_ENABLED', '0')
+os.environ.setdefault('USER_STATE_PATH', '')
+os.environ.setdefault('TICKETS_SNAPSHOT_PATH', os.path.join(WORK_DIR, 'tickets.json'))
+os.environ.setdefault('TICKETS_JOURNAL_PATH', os.path.join(WORK_DIR, 'tickets.journal'))
+os.environ.setdefault('ADMIN_CHAT_ID', '-1001')
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import heapq  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import random  # noqa: E402
+import shutil  # noqa: E402
+import sys  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+from collections import Counter  # noqa: E402
+from typing import Dict, List, Optional, Tuple  # noqa: E402
+
+import telebot  # noqa: E402
+from telebot import apihelper  # noqa: E402
+from telegram.ext import ApplicationBuilder, MessageHandler, filters  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper  # noqa: E402
+import techsup  # noqa: E402
+from bot import setup_bot  # noqa: E402
+from fake_telegram import FakeTelegramServer, make_callback_update, make_message_update  # noqa: E402
+from iccup_stub import IccupStubServer  # noqa: E402
+
+BOT_TOKEN = '123456:load'
+SUPPORT_TOKEN = '654321:load'
+USER_ID_BASE = 1_000_000
+MENU_BUTTONS = ('🎉 Конкурсы', '❓ FAQ', 'Вакансии', '🛠 Техническая поддержка')
+# Доли страниц корпуса среди запрошенных ников; «typo» — несуществующий игрок
+NICKNAME_PAGES = (('normal', 0.7), ('nogames', 0.1), ('huge', 0.05), ('typo', 0.15))
+
+# Шаг сценария: (бот 'main' | 'support', 'text' | 'callback', текст или callback_data)
+Step = Tuple[str, str, str]
+
+
+def make_scenario(name: str, rng: random.Random, players: int) -> List[Step]:
+    if name == 'menu':
+        return [('main', 'text', '/start'), ('main', 'text', rng.choice(MENU_BUTTONS)),
+                ('main', 'callback', 'back_to_main')]
+    if name == 'stats':
+        pages, weights = zip(*NICKNAME_PAGES)
+        nickname = f'{rng.choices(pages, weights)[0]}-{rng.randrange(players)}'
+        if rng.random() < 0.5:
+            return [('main', 'text', f'/stats {nickname}')]
+        return [('main', 'text', '📈 Статистика игроков'), ('main', 'text', nickname)]
+    if name == 'ticket':
+        return [('support', 'text', 'Не могу подключиться к Battle.Net'),
+                ('support', 'text', 'Ошибка появляется после обновления лаунчера')]
+    raise ValueError(f'Unknown scenario {name}')
+
+
+class SimulatedUser:
+    __slots__ = ('user_id', 'scenario', 'steps', 'index', 'sent_at')
+
+    def __init__(self, user_id: int, scenario: str, steps: List[Step]):
+        self.user_id = user_id
+        self.scenario = scenario
+        self.steps = steps
+        self.index = 0
+        self.sent_at: Optional[float] = None
+
+
+class LoadDriver:
+    """
+    Replays simulated users against the fake Telegram servers.
+
+    A single scheduler thread sends each user's next step when it is due; the
+    fake servers report every bot call, and a reply to a user who is waiting
+    records the latency and schedules that user's next step.
+    """
+
+    def __init__(self, servers: Dict[str, FakeTelegramServer], think_time: float):
+        self.servers = servers
+        self.think_time = think_time
+        self.lock = threading.Condition()
+        self.queue: List[Tuple[float, int, SimulatedUser]] = []
+        self.users: Dict[int, SimulatedUser] = {}
+        self.waiting: Dict[int, SimulatedUser] = {}
+        self.latencies: Dict[str, List[float]] = {}
+        # id колбэка (совпадает с update_id) -> пользователь, нажавший кнопку
+        self.callbacks: Dict[str, int] = {}
+        self.finished = 0
+        self.sent = 0
+        self._update_id = 0
+        self._stopped = False
+        for server in servers.values():
+            server.on_call = self.on_call
+
+    def add_user(self, user: SimulatedUser, start_at: float) -> None:
+        with self.lock:
+            self.users[user.user_id] = user
+            self._schedule(user, start_at)
+
+    def _schedule(self, user: SimulatedUser, due: float) -> None:
+        heapq.heappush(self.queue, (due, user.user_id, user))
+        self.lock.notify()
+
+    def run(self) -> None:
+        """Send due steps until stop() is called."""
+        while True:
+            with self.lock:
+                while not self._stopped and (not self.queue or self.queue[0][0] > time.perf_counter()):
+                    self.lock.wait(self.queue[0][0] - time.perf_counter() if self.queue else None)
+                if self._stopped:
+                    return
+                _, _, user = heapq.heappop(self.queue)
+                self._update_id += 1
+                update_id = self._update_id
+                bot, kind, payload = user.steps[user.index]
+                user.sent_at = time.perf_counter()
+                self.waiting[user.user_id] = user
+                self.sent += 1
+                if kind == 'callback':
+                    self.callbacks[str(update_id)] = user.user_id
+            if kind == 'callback':
+                update = make_callback_update(update_id, user.user_id, payload)
+            else:
+                update = make_message_update(update_id, user.user_id, payload)
+            self.servers[bot].push_update(update)
+
+    def on_call(self, call: Dict) -> None:
+        params = call['params']
+        with self.lock:
+            if call['method'] == 'sendMessage':
+                user_id = int(params.get('chat_id', 0))
+            elif call['method'] == 'answerCallbackQuery':
+                user_id = self.callbacks.pop(str(params.get('callback_query_id')), 0)
+            else:
+                return
+            user = self.waiting.pop(user_id, None)
+            if user is None:
+                return
+            self.latencies.setdefault(user.scenario, []).append(call['time'] - user.sent_at)
+            user.index += 1
+            if user.index < len(user.steps):
+                self._schedule(user, call['time'] + self.think_time)
+            else:
+                self.finished += 1
+                self.lock.notify_all()
+
+    def wait(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            while self.finished < len(self.users) and time.monotonic() < deadline:
+                self.lock.wait(min(1.0, deadline - time.monotonic()))
+
+    def stop(self) -> None:
+        with self.lock:
+            self._stopped = True
+            self.lock.notify_all()
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(values)
+    if not values:
+        return {'count': 0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+
+    def at(p):
+        return round(values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000, 1)
+
+    return {'count': len(values), 'p50_ms': at(50), 'p95_ms': at(95), 'p99_ms': at(99),
+            'max_ms': round(values[-1] * 1000, 1)}
+
+
+async def run_support_bot(base_url: str, stop: threading.Event) -> None:
+    """Run the support bot's ticket handler with long polling until stop is set."""
+    application = ApplicationBuilder().token(SUPPORT_TOKEN).base_url(base_url).build()
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, techsup.handle_message))
+    async with application:
+        await application.start()
+        await application.updater.start_polling(poll_interval=0, timeout=10)
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        await application.updater.stop()
+        await application.stop()
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000, help='number of simulated users')
+    parser.add_argument('--rate', type=float, default=50, help='new users per second (0 = all at once)')
+    parser.add_argument('--mix', default='menu=0.5,stats=0.35,ticket=0.15', help='scenario weights')
+    parser.add_argument('--players', type=int, default=300, help='distinct nicknames requested')
+    parser.add_argument('--think-time', type=float, default=1.0, help='seconds between a reply and the next step')
+    parser.add_argument('--iccup-delay', type=float, default=0.2, help='iccup.com stub latency, seconds')
+    parser.add_argument('--iccup-jitter', type=float, default=0.2, help='random extra iccup.com latency, seconds')
+    parser.add_argument('--iccup-error-rate', type=float, default=0.0, help='share of iccup.com requests failing with 503')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds to wait for all users to finish')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    telebot.logger.setLevel('CRITICAL')
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+
+    iccup = IccupStubServer(delay=args.iccup_delay, jitter=args.iccup_jitter,
+                            error_rate=args.iccup_error_rate).start()
+    scraper.PROFILE_URL = iccup.profile_url
+    main_api = FakeTelegramServer().start()
+    support_api = FakeTelegramServer().start()
+    apihelper.API_URL = main_api.api_url
+
+    bot = setup_bot(BOT_TOKEN)
+    threading.Thread(target=bot.polling, kwargs={'none_stop': True, 'interval': 0, 'timeout': 20},
+                     daemon=True).start()
+    support_stop = threading.Event()
+    support_thread = threading.Thread(
+        target=asyncio.run,
+        args=(run_support_bot(f'http://127.0.0.1:{support_api.server_port}/bot', support_stop),),
+        daemon=True)
+    support_thread.start()
+
+    driver = LoadDriver({'main': main_api, 'support': support_api}, args.think_time)
+    mix = parse_mix(args.mix)
+    started = time.perf_counter()
+    for i in range(args.users):
+        scenario = rng.choices(list(mix), list(mix.values()))[0]
+        user = SimulatedUser(USER_ID_BASE + i, scenario, make_scenario(scenario, rng, args.players))
+        driver.add_user(user, started + (i / args.rate if args.rate else 0))
+    threading.Thread(target=driver.run, daemon=True).start()
+    driver.wait(args.timeout)
+    elapsed = time.perf_counter() - started
+    driver.stop()
+
+    with driver.lock:
+        latencies = {name: list(values) for name, values in driver.latencies.items()}
+        replies = sum(len(values) for values in latencies.values())
+        unanswered = len(driver.waiting)
+    calls = Counter(call['method'] for server in (main_api, support_api) for call in server.calls)
+    result = {
+        'users': args.users,
+        'finished_users': driver.finished,
+        'elapsed_seconds': round(elapsed, 2),
+        'steps_sent': driver.sent,
+        'replies': replies,
+        'unanswered': unanswered,
+        'replies_per_second': round(replies / elapsed, 1),
+        'latency': {'all': percentiles([v for values in latencies.values() for v in values]),
+                    **{name: percentiles(values) for name, values in sorted(latencies.items())}},
+        'iccup': {'requests': iccup.requests, 'errors': iccup.errors},
+        'telegram_calls': dict(calls),
+        'stats_queue': bot.stats_queue.stats(),
+        'admin_notifications': sum(int(call['params'].get('chat_id', 0)) == techsup.ADMIN_CHAT_ID
+                                   for call in support_api.calls_of('sendMessage')),
+    }
+
+    bot.stop_polling()
+    support_stop.set()
+    support_thread.join(timeout=15)
+    for server in (main_api, support_api, iccup):
+        server.shutdown()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Admin-panel read latency while the bot writes support messages into SQLite.
+
+Runs the same workload against three setups of a fresh database with the
+real Message schema (indexes, FTS and change-log triggers):
+
+    default    rollback journal, stock pragmas, one transaction per insert
+    wal        storage.configure_sqlite pragmas, one transaction per insert
+    wal+batch  storage.configure_sqlite pragmas, inserts grouped by MessageBatchWriter
+
+Reader threads repeatedly load the first page of /admin/messages while one
+writer inserts messages at a fixed rate.
+
+    python benchmarks/sqlite_concurrency.py --seconds 5 --readers 4 --write-rate 500
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Абсолютный путь, чтобы импорт приложения не трогал рабочую базу и instance/
+_scratch = tempfile.mkdtemp(prefix='sqlite-bench-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_scratch, 'unused.db')}")
+
+from sqlalchemy import create_engine, select  # noqa: E402
+
+from app import MESSAGE_LIST_COLUMNS, db  # noqa: E402
+from models import Message  # noqa: E402
+from storage import MessageBatchWriter, configure_sqlite, sqlite_engine_options  # noqa: E402
+
+PAGE_QUERY = select(*MESSAGE_LIST_COLUMNS).order_by(Message.created_at.desc(), Message.id.desc()).limit(50)
+UNRESOLVED_QUERY = (
+    select(*MESSAGE_LIST_COLUMNS)
+    .where(Message.is_resolved.is_(False))
+    .order_by(Message.created_at.desc(), Message.id.desc())
+    .limit(50)
+)
+
+
+def make_row(i: int) -> dict:
+    return {
+        'user_id': i % 5000,
+        'username': f'user{i % 5000}',
+        'first_name': 'Test',
+        'message_text': f'Не работает статистика для ника player{i}, помогите пожалуйста',
+        'created_at': datetime.utcnow(),
+    }
+
+
+def build_engine(path: str, tuned: bool):
+    url = f'sqlite:///{path}'
+    if not tuned:
+        return create_engine(url)
+    engine = create_engine(url, **sqlite_engine_options())
+    configure_sqlite(engine)
+    return engine
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def run_mode(mode: str, args) -> dict:
+    path = os.path.join(_scratch, f'{mode.replace("+", "_")}.db')
+    engine = build_engine(path, tuned=mode != 'default')
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Message.__table__.insert(), [make_row(i) for i in range(args.seed)])
+
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def reader(query):
+        local = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(query).all()
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    writer = MessageBatchWriter(engine, Message.__table__, batch_size=args.batch_size, flush_interval=0.05)
+    written = 0
+    write_latencies = []
+
+    def write_loop():
+        nonlocal written
+        interval = 1.0 / args.write_rate
+        next_at = time.perf_counter()
+        i = args.seed
+        while not stop.is_set():
+            row = make_row(i)
+            i += 1
+            if mode == 'wal+batch':
+                writer.add(row)
+            else:
+                started = time.perf_counter()
+                try:
+                    with engine.begin() as connection:
+                        connection.execute(Message.__table__.insert(), row)
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                write_latencies.append(time.perf_counter() - started)
+                written += 1
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    threads = [threading.Thread(target=write_loop)]
+    for n in range(args.readers):
+        threads.append(threading.Thread(target=reader, args=(PAGE_QUERY if n % 2 == 0 else UNRESOLVED_QUERY,)))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    writer.shutdown()
+    elapsed = time.perf_counter() - started
+    if mode == 'wal+batch':
+        written = writer.written
+
+    engine.dispose()
+    return {
+        'mode': mode,
+        'rows_written': written,
+        'write_rows_per_second': round(written / elapsed, 1),
+        'write_transactions': writer.batches if mode == 'wal+batch' else written,
+        'write_p95_ms': round(percentile(write_latencies, 0.95) * 1000, 2) if write_latencies else None,
+        'reads': len(latencies),
+        'read_p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'read_p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'read_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'read_max_ms': round(max(latencies) * 1000, 2) if latencies else None,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5, help='duration of each run')
+    parser.add_argument('--readers', type=int, default=4, help='number of admin reader threads')
+    parser.add_argument('--write-rate', type=float, default=500, help='bot inserts per second')
+    parser.add_argument('--batch-size', type=int, default=100, help='rows per transaction in wal+batch mode')
+    parser.add_argument('--seed', type=int, default=20000, help='rows inserted before the run')
+    parser.add_argument('--modes', default='default,wal,wal+batch', help='comma-separated modes to run')
+    args = parser.parse_args()
+
+    try:
+        results = [run_mode(mode, args) for mode in args.modes.split(',')]
+    finally:
+        shutil.rmtree(_scratch, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Storage size and /progress query time of the columnar stats history.
+
+Writes a year of daily snapshots for many players straight into the
+StatsHistory column files (the same layout record() produces, interleaved by
+day as a live bot would), then times opening the history and answering
+/progress for random players.
+
+    python benchmarks/stats_history.py --players 100000 --days 365
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import HISTORY_FIELDS, SECONDS_PER_DAY, StatsHistory  # noqa: E402
+
+
+def write_history(directory: str, players: int, days: int) -> float:
+    """Fill the column files with one snapshot per player per day; returns seconds spent."""
+    started = time.perf_counter()
+    history = StatsHistory(directory)
+    with open(os.path.join(directory, 'players.txt'), 'w', encoding='utf-8') as f:
+        f.writelines(f'player{i}\n' for i in range(players))
+
+    rng = np.random.default_rng(1)
+    player_ids = np.arange(players, dtype=np.uint32)
+    pts = rng.normal(1500, 300, players)
+    wins = rng.integers(0, 500, players).astype(np.float64)
+    losses = rng.integers(0, 500, players).astype(np.float64)
+    start_ts = int(time.time()) - days * SECONDS_PER_DAY
+
+    files = {name: open(history._column_path(name), 'ab') for name in history._column_names()}
+    try:
+        for day in range(days):
+            played = rng.poisson(2, players)
+            won = rng.binomial(played, 0.5)
+            wins += won
+            losses += played - won
+            pts += (won - (played - won)) * 15
+            columns = {
+                'player': player_ids,
+                'ts': np.full(players, start_ts + day * SECONDS_PER_DAY, dtype=np.uint32),
+                'pts': pts,
+                'wins': wins,
+                'losses': losses,
+                'win_ratio': 100 * wins / np.maximum(wins + losses, 1),
+                'kda': rng.normal(3, 0.5, players),
+                'apm': rng.normal(150, 20, players),
+                'leave_rate': rng.uniform(0, 5, players),
+            }
+            for name, values in columns.items():
+                values.astype(history._column_dtype(name)).tofile(files[name])
+    finally:
+        for f in files.values():
+            f.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--players', type=int, default=100_000, help='number of players')
+    parser.add_argument('--days', type=int, default=365, help='daily snapshots per player')
+    parser.add_argument('--queries', type=int, default=200, help='number of /progress queries to time')
+    parser.add_argument('--window', type=int, default=30, help='/progress window in days')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='stats-history-')
+    try:
+        write_seconds = write_history(directory, args.players, args.days)
+        snapshots = args.players * args.days
+        disk_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+        load_started = time.perf_counter()
+        history = StatsHistory(directory)
+        history.series('player0')
+        load_seconds = time.perf_counter() - load_started
+
+        random.seed(1)
+        keys = [f'player{random.randrange(args.players)}' for _ in range(args.queries)]
+        timings = {'series_full_year': [], 'progress_window': [], 'progress_full_year': []}
+        for key in keys:
+            started = time.perf_counter()
+            ts, _ = history.series(key)
+            timings['series_full_year'].append(time.perf_counter() - started)
+            assert len(ts) == args.days
+
+            started = time.perf_counter()
+            history.progress(key, days=args.window)
+            timings['progress_window'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            history.progress(key, days=args.days + 1)
+            timings['progress_full_year'].append(time.perf_counter() - started)
+        history.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    result = {
+        'players': args.players,
+        'days': args.days,
+        'snapshots': snapshots,
+        'fields': len(HISTORY_FIELDS),
+        'bytes_per_snapshot': round(disk_bytes / snapshots, 2),
+        'disk_mb': round(disk_bytes / 2 ** 20, 1),
+        'write_seconds': round(write_seconds, 2),
+        'open_and_index_seconds': round(load_seconds, 2),
+    }
+    for name, values in timings.items():
+        values = np.array(values) * 1000
+        result[f'{name}_p50_ms'] = round(float(np.percentile(values, 50)), 3)
+        result[f'{name}_p95_ms'] = round(float(np.percentile(values, 95)), 3)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
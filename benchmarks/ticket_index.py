@@ -0,0 +1,94 @@
+"""
+Open-ticket lookup in techsup: linear scan over all tickets vs the per-user index.
+
+Builds a TicketStore with a large support history (mostly closed tickets)
+and times finding a user's open ticket both ways.
+
+    python benchmarks/ticket_index.py --tickets 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ticket_store import TicketStore  # noqa: E402
+
+
+def linear_scan(tickets, user_id):
+    """The lookup handle_message used before the index."""
+    for ticket_id, ticket in tickets.items():
+        if ticket['user_id'] == user_id and not ticket.get('closed'):
+            return ticket_id
+    return None
+
+
+def build_store(directory: str, count: int, users: int, open_ratio: float) -> TicketStore:
+    tickets = {}
+    for ticket_id in range(1, count + 1):
+        tickets[ticket_id] = {
+            'user_id': random.randrange(users),
+            'username': None,
+            'full_name': 'user',
+            'time': '2025-01-01 00:00:00',
+            'problem': 'problem',
+            'updates': [],
+            'closed': True,
+        }
+    # Не больше одного открытого тикета на пользователя, как в handle_message
+    users_with_open = set()
+    for ticket_id in random.sample(range(1, count + 1), int(count * open_ratio)):
+        ticket = tickets[ticket_id]
+        if ticket['user_id'] not in users_with_open:
+            users_with_open.add(ticket['user_id'])
+            ticket['closed'] = False
+
+    snapshot_path = os.path.join(directory, 'tickets.json')
+    with open(snapshot_path, 'w', encoding='utf-8') as f:
+        json.dump(tickets, f)
+    return TicketStore(snapshot_path, os.path.join(directory, 'tickets.journal'), fsync=False)
+
+
+def timeit(func, user_ids):
+    started = time.perf_counter()
+    for user_id in user_ids:
+        func(user_id)
+    return (time.perf_counter() - started) / len(user_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=100_000, help='number of historical tickets')
+    parser.add_argument('--users', type=int, default=20_000, help='number of distinct users')
+    parser.add_argument('--open-ratio', type=float, default=0.001, help='share of tickets that are open')
+    parser.add_argument('--lookups', type=int, default=200, help='number of lookups to time')
+    args = parser.parse_args()
+
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as directory:
+        load_started = time.perf_counter()
+        store = build_store(directory, args.tickets, args.users, args.open_ratio)
+        load_seconds = time.perf_counter() - load_started
+
+        user_ids = [random.randrange(args.users) for _ in range(args.lookups)]
+        assert all(linear_scan(store.tickets, u) == store.find_open_ticket(u) for u in user_ids)
+
+        scan = timeit(lambda u: linear_scan(store.tickets, u), user_ids)
+        indexed = timeit(store.find_open_ticket, user_ids)
+
+    print(json.dumps({
+        'tickets': args.tickets,
+        'lookups': args.lookups,
+        'build_and_load_seconds': round(load_seconds, 3),
+        'linear_scan_us': round(scan * 1e6, 2),
+        'indexed_us': round(indexed * 1e6, 3),
+        'speedup': round(scan / indexed, 1) if indexed else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Compare update ingestion via long polling and via the webhook server.
+
+Both modes run the real handler set from setup_bot against a local fake
+Telegram Bot API. Every simulated user sends /start; the benchmark measures
+the time from the update being produced to the bot's sendMessage reply.
+
+    python benchmarks/webhook_vs_polling.py --updates 2000 --rate 500
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import telebot
+from telebot import apihelper
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot import setup_bot  # noqa: E402
+from webhook import SECRET_TOKEN_HEADER, run_webhook  # noqa: E402
+from fake_telegram import FakeTelegramServer, make_message_update  # noqa: E402
+
+TOKEN = '123456:bench'
+SECRET = 'bench-secret'
+USER_ID_BASE = 1_000_000
+
+
+def produce(count: int, rate: float, send) -> None:
+    """Call send(update) for count updates, spread evenly at the given rate (0 = burst)."""
+    start = time.perf_counter()
+    for i in range(count):
+        if rate:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        update_id = i + 1
+        send(make_message_update(update_id, USER_ID_BASE + update_id, '/start'))
+
+
+def wait_for_replies(fake: FakeTelegramServer, count: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while len(fake.calls_of('sendMessage')) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def summarize(mode: str, fake: FakeTelegramServer, count: int, started: float) -> dict:
+    replies = fake.calls_of('sendMessage')
+    latencies = sorted(
+        reply['time'] - fake.produced_at[int(reply['params']['chat_id']) - USER_ID_BASE]
+        for reply in replies
+    )
+    finished = max((reply['time'] for reply in replies), default=started)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000 if latencies else None
+
+    return {
+        'mode': mode,
+        'updates': count,
+        'replies': len(replies),
+        'elapsed_seconds': round(finished - started, 3),
+        'throughput_per_second': round(len(replies) / (finished - started), 1) if finished > started else None,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+    }
+
+
+def run_polling(count: int, rate: float, timeout: float) -> dict:
+    fake = FakeTelegramServer().start()
+    apihelper.API_URL = fake.api_url
+    bot = setup_bot(TOKEN)
+    thread = threading.Thread(target=bot.polling, kwargs={'none_stop': True, 'interval': 0, 'timeout': 20}, daemon=True)
+    thread.start()
+
+    started = time.perf_counter()
+    produce(count, rate, fake.push_update)
+    wait_for_replies(fake, count, timeout)
+    result = summarize('polling', fake, count, started)
+
+    bot.stop_polling()
+    fake.shutdown()
+    return result
+
+
+def run_webhook_mode(count: int, rate: float, timeout: float, connections: int) -> dict:
+    fake = FakeTelegramServer().start()
+    apihelper.API_URL = fake.api_url
+    bot = setup_bot(TOKEN)
+    server = run_webhook(bot, '127.0.0.1', 0, '/telegram/webhook', secret_token=SECRET)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/telegram/webhook'
+
+    # Telegram доставляет обновления через ограниченное число параллельных соединений
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=connections))
+    pool = ThreadPoolExecutor(max_workers=connections)
+
+    def post(update):
+        fake.mark_produced(update['update_id'])
+        pool.submit(session.post, url, json=update, headers={SECRET_TOKEN_HEADER: SECRET})
+
+    started = time.perf_counter()
+    produce(count, rate, post)
+    wait_for_replies(fake, count, timeout)
+    result = summarize('webhook', fake, count, started)
+
+    pool.shutdown()
+    server.shutdown()
+    fake.shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=1000, help='number of simulated updates')
+    parser.add_argument('--rate', type=float, default=0, help='updates per second (0 = send all at once)')
+    parser.add_argument('--connections', type=int, default=40, help='parallel webhook connections')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds to wait for all replies')
+    args = parser.parse_args()
+
+    telebot.logger.setLevel('CRITICAL')
+    results = [
+        run_polling(args.updates, args.rate, args.timeout),
+        run_webhook_mode(args.updates, args.rate, args.timeout, args.connections),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
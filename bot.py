@@ -1,109 +1,243 @@
+import hashlib
+import html
 import logging
-from typing import Dict, Optional
+import re
+import threading
+from concurrent.futures import Future, wait
+from typing import Callable, Dict, List, Optional
 import telebot
 from telebot.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+from telebot.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
 import numpy as np
-from scraper import get_player_stats
+from scraper import IccupUnavailableError, get_player_stats, get_stats_history, normalize_nickname, submit_player_stats
+from player_stats import PlayerStats
+from config import Config
+from cache import TTLCache
+from metrics import HANDLER_SECONDS, REGISTRY, instrument_telebot, timed
+from workers import ChatTaskQueue, Debouncer
+from sender import PRIORITY_INTERACTIVE, SendScheduler, send_queues
+from user_state import UserStateStore
 from telegram import Update
 from telegram.ext import ApplicationBuilder, MessageHandler, filters, ContextTypes
 from telebot.types import ReplyKeyboardRemove
 
-user_states = {}  # {user_id: {state: str, data: {}}}
+# Состояния диалога: {user_id: state} с TTL и ограничением размера, изменения пишутся в журнал
+user_states = UserStateStore(
+    maxsize=Config.USER_STATE_MAX_USERS,
+    ttl=Config.USER_STATE_TTL,
+    path=Config.USER_STATE_PATH,
+)
 STATE_WAITING_FOR_NICKNAME = 'waiting_for_nickname'
 STATE_WAITING_FOR_SUPPORT_MESSAGE = 'waiting_for_support_message'
 
-def analyze_player_performance(stats: Dict) -> str:
+# Ответ, пока выключатель запросов к iccup.com разомкнут: не ждём таймаут, сразу просим повторить позже
+ICCUP_UNAVAILABLE_MESSAGE = (
+    'Сайт iccup.com сейчас не отвечает. Пожалуйста, попробуйте через минуту.\n'
+    'Используйте команду /stats для нового поиска.'
+)
+NICKNAME_PROMPT = 'Пожалуйста, введите никнейм игрока (можно несколько через пробел или с новой строки):'
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Очереди воркеров по имени; заполняется в setup_bot, метрики читаются при каждом запросе /metrics
+worker_queues: Dict[str, ChatTaskQueue] = {}
+
+
+def _worker_queue_metric(field: str) -> Callable[[], Dict[tuple, float]]:
+    return lambda: {(name,): queue.stats()[field] for name, queue in worker_queues.items()}
+
+
+REGISTRY.callback('worker_queue_depth', 'Tasks waiting in the chat worker queues',
+                  _worker_queue_metric('queue_depth'), ('queue',))
+REGISTRY.callback('worker_queue_active', 'Tasks currently running on the chat worker pools',
+                  _worker_queue_metric('active'), ('queue',))
+REGISTRY.callback('worker_queue_wait_avg_seconds', 'Average time a task waited in a chat worker queue',
+                  _worker_queue_metric('avg_wait_seconds'), ('queue',))
+REGISTRY.callback('worker_queue_wait_max_seconds', 'Longest time a task waited in a chat worker queue',
+                  _worker_queue_metric('max_wait_seconds'), ('queue',))
+REGISTRY.callback('worker_queue_rejected', 'Tasks rejected because a chat worker queue was full',
+                  _worker_queue_metric('rejected'), ('queue',), type_name='counter')
+
+
+def parse_nicknames(text: str) -> List[str]:
+    """Split user input into unique nicknames, keeping their order."""
+    nicknames = []
+    seen = set()
+    for nickname in re.split(r'[\s,;]+', text.strip()):
+        key = nickname.lower()
+        if nickname and key not in seen:
+            seen.add(key)
+            nicknames.append(nickname)
+    return nicknames
+
+
+def split_message(blocks: List[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """
+    Join message blocks into as few messages as possible, each within the Telegram size limit.
+
+    Blocks are never split unless a single block is longer than the limit; then
+    it is split by lines so HTML tags on one line stay intact.
+    """
+    chunks = []
+    current = ''
+    for block in blocks:
+        pieces = [block] if len(block) <= limit else block.splitlines(keepends=True)
+        for index, piece in enumerate(pieces):
+            while len(piece) > limit:
+                if current:
+                    chunks.append(current)
+                    current = ''
+                chunks.append(piece[:limit])
+                piece = piece[limit:]
+            separator = '\n' if current and index == 0 else ''
+            if len(current) + len(separator) + len(piece) > limit:
+                chunks.append(current)
+                current, separator = '', ''
+            current += separator + piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def analyze_player_performance(stats: PlayerStats) -> str:
     """Perform an analysis on the player's performance and format it as a message."""
     analysis = "<b>Анализ производительности:</b>\n\n"
 
-    if stats.get('win_ratio') is not None:
-        if stats['win_ratio'] > 70:
+    if stats.win_ratio is not None:
+        if stats.win_ratio > 70:
             analysis += "🏆 <b>Отличный результат!</b> Процент побед выше 70%. Вы настоящий чемпион!\n"
-        elif stats['win_ratio'] > 50:
+        elif stats.win_ratio > 50:
             analysis += "👍 <b>Хороший результат.</b> Процент побед больше 50%. Есть куда стремиться!\n"
         else:
             analysis += "😟 <b>Низкий процент побед.</b> Возможно, стоит пересмотреть стратегию игры.\n"
 
-    if stats.get('apm') is not None:
-        if stats['apm'] > 200:
+    if stats.apm is not None:
+        if stats.apm > 200:
             analysis += "⚡ <b>Высокий APM.</b> Ваши действия в игре очень быстрые!\n"
-        elif stats['apm'] < 100:
+        elif stats.apm < 100:
             analysis += "🐢 <b>Низкий APM.</b> Попробуйте увеличить скорость действий.\n"
 
-    if stats.get('leave_rate') is not None and stats['leave_rate'] > 10:
+    if stats.leave_rate is not None and stats.leave_rate > 10:
         analysis += "❗ <b>Высокий процент выходов из игр.</b> Постарайтесь завершать больше матчей.\n"
 
     analysis += "\n<i>Это предварительный анализ на основе доступных данных.</i>"
     return analysis
 
-def format_stats_message(nickname: str, stats: Dict) -> str:
+# Поля истории, которые показывает /progress: (поле, подпись, единица)
+PROGRESS_FIELDS = (
+    ('pts', 'PTS', ''),
+    ('win_ratio', 'Процент побед', '%'),
+    ('kda', 'KDA', ''),
+    ('apm', 'APM', ''),
+    ('leave_rate', 'Процент выходов', '%'),
+)
+
+def format_number(value: float) -> str:
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+def format_progress_message(nickname: str, progress: Optional[Dict]) -> str:
+    """Format the result of StatsHistory.progress: values at both ends of the period, change and daily trend."""
+    if progress is None:
+        return (f"📊 Для игрока <b>{html.escape(nickname)}</b> пока недостаточно данных.\n"
+                f"Статистика сохраняется при каждом запросе /stats — загляните через день-другой.")
+
+    first, last, delta, trend = progress['first'], progress['last'], progress['delta'], progress['trend']
+    message = (f"📊 <b>Прогресс игрока {html.escape(nickname)}</b> за {max(1, round(progress['days']))} дн. "
+               f"({progress['snapshots']} снимков):\n\n")
+
+    for field, label, unit in PROGRESS_FIELDS:
+        if np.isnan(last[field]):
+            continue
+        line = f"{label}: {format_number(first[field])}{unit} → {format_number(last[field])}{unit}"
+        if not np.isnan(delta[field]):
+            line += f" ({'+' if delta[field] >= 0 else ''}{format_number(delta[field])})"
+        if not np.isnan(trend[field]) and abs(trend[field]) >= 0.01:
+            line += f", {'+' if trend[field] > 0 else ''}{format_number(trend[field])}{unit}/день"
+        message += f"<pre><code>{line}</code></pre>\n"
+
+    games = np.array([delta['wins'], delta['losses']])
+    if not np.isnan(games).any():
+        message += (f"<pre><code>Сыграно игр: {int(games.sum())} "
+                    f"({int(games[0])} побед, {int(games[1])} поражений)</code></pre>\n")
+
+    message += "\n<i>Данные по снимкам статистики с сайта iccup.com</i>"
+    return message
+
+def format_stats_summary(stats: PlayerStats) -> str:
+    """One-line summary of the main stats, used as the inline result description."""
+    parts = []
+    if stats.status == "Нет игр":
+        return 'Игрок еще не сыграл ни одной игры'
+    if stats.pts:
+        parts.append(f"PTS: {stats.pts}")
+    if stats.games_played:
+        parts.append(f"Игр: {stats.games_played}")
+    if stats.win_ratio is not None:
+        parts.append(f"Побед: {format_number(stats.win_ratio)}%")
+    return ' · '.join(parts) or 'Статистика с сайта iccup.com'
+
+# Дополнительные показатели: (поле PlayerStats, подпись, единица)
+ADDITIONAL_FIELDS = (
+    ('apm', 'APM', ''),
+    ('farm', 'Фарм', ''),
+    ('experience_per_min', 'Опыт в минуту', ''),
+    ('gank_participation', 'Участие в ганках', ''),
+    ('total_match_time', 'Общее время матчей', ''),
+    ('avg_match_time', 'Среднее время матча', ''),
+    ('leave_rate', 'Процент выходов', '%'),
+)
+
+def format_value(value) -> str:
+    return format_number(value) if isinstance(value, float) else html.escape(str(value))
+
+def format_stats_message(nickname: str, stats: PlayerStats) -> str:
     """Format player stats into a readable message with each stat in a code block."""
-    display_name = stats.get('username', nickname)
+    # Никнейм введён пользователем, остальное взято со страницы: в HTML-разметку всё попадает экранированным
+    display_name = html.escape(stats.username or nickname)
     message = f"<b>Статистика игрока {display_name}:</b>\n\n"
 
     # Проверяем статус игрока
-    if stats.get('status') == "Нет игр":
+    if stats.status == "Нет игр":
         message += f"😢 <b>Игрок еще не сыграл ни одной игры</b>\n"
         message += f"\n<i>Данные получены с сайта iccup.com</i>"
         return message
 
     # Основные показатели
-    if stats.get('pts'):
-        message += f"<pre><code>PTS: {stats['pts']}</code></pre>\n"
+    if stats.pts:
+        message += f"<pre><code>PTS: {stats.pts}</code></pre>\n"
 
-    if stats.get('rank'):
-        message += f"<pre><code>Ранг: {stats['rank']}</code></pre>\n"
+    if stats.rank:
+        message += f"<pre><code>Ранг: {html.escape(str(stats.rank))}</code></pre>\n"
 
     # Статистика игр
-    if stats.get('games_played'):
-        message += f"<pre><code>Всего игр: {stats['games_played']}</code></pre>\n"
+    if stats.games_played:
+        message += f"<pre><code>Всего игр: {stats.games_played}</code></pre>\n"
 
-        if stats.get('win_ratio') is not None:
-            message += f"<pre><code>Процент побед: {stats['win_ratio']}%</code></pre>\n"
+        if stats.win_ratio is not None:
+            message += f"<pre><code>Процент побед: {format_number(stats.win_ratio)}%</code></pre>\n"
 
-    if stats.get('wins') is not None and stats.get('losses') is not None:
-        message += f"<pre><code>Победы/Поражения: {stats['wins']} / {stats['losses']}</code></pre>\n"
+    if stats.wins is not None and stats.losses is not None:
+        message += f"<pre><code>Победы/Поражения: {stats.wins} / {stats.losses}</code></pre>\n"
 
     # KDA
-    if stats.get('average_kills') is not None:
-        message += f"<pre><code>Среднее K/D/A: {stats.get('average_kills', 0)}/{stats.get('average_deaths', 0)}/{stats.get('average_assists', 0)}</code></pre>\n"
+    if stats.kda is not None:
+        message += f"<pre><code>KDA: {format_number(stats.kda)}</code></pre>\n"
+
+    if stats.average_kills is not None:
+        message += (f"<pre><code>Среднее K/D/A: {format_value(stats.average_kills)}/"
+                    f"{format_value(stats.average_deaths or 0)}/{format_value(stats.average_assists or 0)}</code></pre>\n")
 
     # Локация
-    if stats.get('location'):
-        message += f"<pre><code>Локация: {stats['location']}</code></pre>\n"
+    if stats.location:
+        message += f"<pre><code>Локация: {html.escape(stats.location)}</code></pre>\n"
 
     # Дополнительные данные
-    additional_keys = [
-        'apm', 'farm', 'experience_per_min', 'gank_participation',
-        'total_match_time', 'avg_match_time', 'leave_rate'
-    ]
-
-    nice_names = {
-        'apm': 'APM',
-        'farm': 'Фарм',
-        'experience_per_min': 'Опыт в минуту',
-        'gank_participation': 'Участие в ганках',
-        'total_match_time': 'Общее время матчей',
-        'avg_match_time': 'Среднее время матча',
-        'leave_rate': 'Процент выходов'
-    }
-
-    for key in additional_keys:
-        if stats.get(key) is not None:
-            display_name = nice_names.get(key, key.replace('_', ' ').title())
-            value = stats[key]
-            if isinstance(value, (float, int)) and 'rate' in key:
-                value = f"{value}%"
-            message += f"<pre><code>{display_name}: {value}</code></pre>\n"
-
-    # Остальные неучтённые данные
-    excluded_keys = ['username', 'pts', 'rank', 'games_played', 'win_ratio', 'wins', 'losses',
-                     'average_kills', 'average_deaths', 'average_assists', 'location', 'status'] + additional_keys
-
-    for key, value in stats.items():
-        if key not in excluded_keys:
-            display_name = key.replace('_', ' ').title()
-            message += f"<pre><code>{display_name}: {value}</code></pre>\n"
+    for field, label, unit in ADDITIONAL_FIELDS:
+        value = getattr(stats, field)
+        if value is not None:
+            message += f"<pre><code>{label}: {format_value(value)}{unit}</code></pre>\n"
+
+    # Остальные данные со страницы, для которых нет поля
+    for label, value in stats.extra.items():
+        message += f"<pre><code>{html.escape(label)}: {format_value(value)}</code></pre>\n"
 
     return message
 
@@ -113,6 +247,29 @@ def setup_bot(token: str) -> telebot.TeleBot:
     """Setup and return the bot instance."""
     bot = telebot.TeleBot(token)
 
+    # Пул воркеров для запросов статистики: долгий скрапинг не блокирует остальные обработчики
+    stats_queue = ChatTaskQueue(
+        max_workers=Config.STATS_WORKERS,
+        max_backlog=Config.STATS_QUEUE_LIMIT,
+        max_per_chat=Config.STATS_QUEUE_PER_CHAT_LIMIT,
+        name='stats-worker',
+    )
+    bot.stats_queue = stats_queue
+    worker_queues['stats'] = stats_queue
+
+    # Все исходящие сообщения идут через очередь с лимитами Telegram
+    send_queue = SendScheduler(
+        global_rate=Config.SEND_GLOBAL_RATE,
+        chat_rate=Config.SEND_CHAT_RATE,
+        group_rate=Config.SEND_GROUP_RATE,
+        max_workers=Config.SEND_WORKERS,
+    )
+    bot.send_queue = send_queue
+    send_queues['bot'] = send_queue
+
+    def send_message(chat_id, text, priority=PRIORITY_INTERACTIVE, **kwargs) -> Future:
+        """Queue a message through the outbound send scheduler."""
+        return send_queue.submit(chat_id, bot.send_message, chat_id, text, priority=priority, **kwargs)
     # Функция для создания главного меню
     def get_main_menu():
         markup = ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
@@ -130,13 +287,13 @@ def setup_bot(token: str) -> telebot.TeleBot:
     def start_command(message: Message):
         """Sends a welcome message when the command /start is issued."""
         msg = f'Привет, {message.from_user.first_name}! 👋\n\nЯ бот для получения статистики игроков DotA с сайта iccup.com. С моей помощью вы можете быстро узнать рейтинг и достижения любого игрока!\n\nЧто я умею:\n• Получать статистику игроков по никнейму\n• Предоставлять полезную информацию об игре\n• Сообщать о новых конкурсах и событиях\n\nИспользуйте кнопки меню или команду /stats для начала работы.'
-        bot.send_message(message.chat.id, msg, parse_mode='HTML', reply_markup=get_main_menu())
+        send_message(message.chat.id, msg, parse_mode='HTML', reply_markup=get_main_menu())
 
     # Обработчик команды /menu
     @bot.message_handler(commands=['menu'])
     def menu_command(message: Message):
         """Показывает главное меню"""
-        bot.send_message(
+        send_message(
             message.chat.id,
             'Главное меню:',
             parse_mode='HTML',
@@ -155,7 +312,7 @@ def setup_bot(token: str) -> telebot.TeleBot:
             info_key = callback_data.split('_')[1]
             if info_key in INFO_DATABASE:
                 bot.answer_callback_query(call.id)
-                bot.send_message(call.message.chat.id, INFO_DATABASE[info_key], parse_mode='HTML')
+                send_message(call.message.chat.id, INFO_DATABASE[info_key], parse_mode='HTML')
             else:
                 bot.answer_callback_query(call.id, "Информация не найдена", show_alert=True)
 
@@ -163,7 +320,7 @@ def setup_bot(token: str) -> telebot.TeleBot:
         elif callback_data == 'back_to_main':
             bot.answer_callback_query(call.id)
             bot.delete_message(call.message.chat.id, call.message.message_id)
-            bot.send_message(call.message.chat.id, "Главное меню:", parse_mode='HTML', reply_markup=get_main_menu())
+            send_message(call.message.chat.id, "Главное меню:", parse_mode='HTML', reply_markup=get_main_menu())
 
     # Обработчик команды /stats
     @bot.message_handler(commands=['stats'])
@@ -173,20 +330,17 @@ def setup_bot(token: str) -> telebot.TeleBot:
         command_parts = message.text.split()
 
         if len(command_parts) > 1:
-            # Если есть параметр после команды, используем его как никнейм
-            nickname = command_parts[1].strip()
-            process_stats_request(message, nickname)
+            # Если есть параметры после команды, используем их как никнеймы
+            process_stats_request(message, parse_nicknames(' '.join(command_parts[1:])))
         else:
             # Если параметра нет, просим пользователя ввести никнейм
-            msg = bot.send_message(
+            send_message(
                 message.chat.id,
-                'Пожалуйста, введите никнейм игрока:',
+                NICKNAME_PROMPT,
                 parse_mode='HTML'
             )
-            # Устанавливаем состояние ожидания никнейма
-            user_states[message.from_user.id] = {'state': STATE_WAITING_FOR_NICKNAME}
-            # Регистрируем следующий шаг
-            bot.register_next_step_handler(msg, process_nickname_input)
+            # Устанавливаем состояние ожидания никнейма; ответ примет nickname_input_handler
+            user_states.set(message.from_user.id, STATE_WAITING_FOR_NICKNAME)
 
     # Обработчик ввода никнейма после команды /stats
     def process_nickname_input(message: Message):
@@ -194,54 +348,171 @@ def setup_bot(token: str) -> telebot.TeleBot:
         # Проверяем, что пользователь находится в нужном состоянии
         user_id = message.from_user.id
 
-        if user_id in user_states and user_states[user_id]['state'] == STATE_WAITING_FOR_NICKNAME:
-            # Получаем никнейм из сообщения
-            nickname = message.text.strip()
+        if user_states.get(user_id) == STATE_WAITING_FOR_NICKNAME:
+            # Получаем никнеймы из сообщения (можно несколько, по одному на строку)
+            nicknames = parse_nicknames(message.text)
 
             # Сбрасываем состояние пользователя
-            user_states.pop(user_id, None)
+            user_states.pop(user_id)
 
             # Обрабатываем запрос статистики
-            process_stats_request(message, nickname)
+            process_stats_request(message, nicknames)
         else:
             # Если пользователь не в режиме ожидания никнейма, игнорируем сообщение
             pass
 
 
     # Функция обработки запроса статистики
-    def process_stats_request(message: Message, nickname: str):
-        """Process a statistics request for a given nickname."""
+    def process_stats_request(message: Message, nicknames: List[str]):
+        """Queue a statistics request for one or more nicknames on the stats worker pool."""
+        if not nicknames:
+            send_message(message.chat.id, NICKNAME_PROMPT, parse_mode='HTML')
+            return
+
+        if len(nicknames) > Config.BATCH_STATS_MAX_NICKNAMES:
+            send_message(
+                message.chat.id,
+                f'За один раз можно запросить не больше {Config.BATCH_STATS_MAX_NICKNAMES} игроков.',
+                parse_mode='HTML',
+            )
+            return
+
         # Логируем запрос
-        logging.info(f"User {message.from_user.id} requested stats for '{nickname}'")
+        logging.info("User %s requested stats for %s", message.from_user.id, nicknames)
+
+        if not stats_queue.submit(message.chat.id, run_stats_request, message, nicknames):
+            logging.warning("Stats queue is full, rejecting request for %s: %s", nicknames, stats_queue.stats())
+            send_message(
+                message.chat.id,
+                'Сейчас слишком много запросов статистики. Пожалуйста, попробуйте через минуту.',
+                parse_mode='HTML',
+            )
+            return
 
-        # Показываем "печатает..." пока обрабатываем запрос
+        # Показываем "печатает..." пока запрос ждёт в очереди и выполняется
         bot.send_chat_action(message.chat.id, 'typing')
 
+    @timed(HANDLER_SECONDS, 'run_stats_request')
+    def run_stats_request(message: Message, nicknames: List[str]):
+        """Fetch statistics and reply; runs on a stats worker thread."""
+        if len(nicknames) > 1:
+            run_batch_stats_request(message, nicknames)
+            return
+
+        nickname = nicknames[0]
         try:
             # Получаем статистику игрока
             stats = get_player_stats(nickname)
 
             if stats:
-                # Форматируем сообщение
+                # Форматируем сообщение; длинный профиль уходит несколькими сообщениями
                 formatted_message = format_stats_message(nickname, stats)
-                bot.send_message(message.chat.id, formatted_message, parse_mode='HTML')
+                for chunk in split_message([formatted_message]):
+                    send_message(message.chat.id, chunk, parse_mode='HTML')
             else:
-                bot.send_message(
+                send_message(
                     message.chat.id,
-                    f'Не удалось найти игрока с никнеймом "{nickname}". '
+                    f'Не удалось найти игрока с никнеймом "{html.escape(nickname)}". '
                     f'Проверьте правильность написания и попробуйте снова.\n'
                     f'Используйте команду /stats для нового поиска.',
                     parse_mode='HTML',
                 )
+        except IccupUnavailableError:
+            send_message(message.chat.id, ICCUP_UNAVAILABLE_MESSAGE, parse_mode='HTML')
         except Exception as e:
-            logging.error(f"Error processing stats for {nickname}: {str(e)}")
-            bot.send_message(
+            logging.error("Error processing stats for %s: %s", nickname, e)
+            send_message(
                 message.chat.id,
                 'Произошла ошибка при получении статистики. Пожалуйста, попробуйте позже.\n'
                 'Используйте команду /stats для нового поиска.',
                 parse_mode='HTML',
             )
 
+    def run_batch_stats_request(message: Message, nicknames: List[str]):
+        """Fetch statistics for several players concurrently and reply with one consolidated message."""
+        # Игроки загружаются параллельно асинхронным движком; одинаковые запросы из разных чатов объединяются
+        futures = {nickname: submit_player_stats(nickname) for nickname in nicknames}
+        done, not_done = wait(futures.values(), timeout=Config.BATCH_STATS_TIMEOUT)
+        # Не оставляем корутины работать на движке после ответа; общая загрузка защищена shield
+        for future in not_done:
+            future.cancel()
+
+        blocks = []
+        for nickname, future in futures.items():
+            # Один ник с < или & не должен ломать разметку всего сводного ответа
+            name = html.escape(nickname)
+            if future not in done:
+                blocks.append(f'⏳ <b>{name}</b>: превышено время ожидания ответа от iccup.com.\n')
+                continue
+            try:
+                stats = future.result()
+            except IccupUnavailableError:
+                blocks.append(f'⏳ <b>{name}</b>: iccup.com временно недоступен.\n')
+                continue
+            except Exception as e:
+                logging.error("Error processing stats for %s: %s", nickname, e)
+                blocks.append(f'⚠️ <b>{name}</b>: ошибка при получении статистики.\n')
+                continue
+            if stats:
+                blocks.append(format_stats_message(nickname, stats))
+            else:
+                blocks.append(f'❌ Не удалось найти игрока с никнеймом "{name}".\n')
+
+        for chunk in split_message(blocks):
+            send_message(message.chat.id, chunk, parse_mode='HTML')
+
+    # Обработчик команды /progress
+    @bot.message_handler(commands=['progress'])
+    def progress_command(message: Message):
+        """Show how a player's stats changed over the last PROGRESS_DAYS days."""
+        nicknames = parse_nicknames(' '.join(message.text.split()[1:]))
+        if not nicknames:
+            send_message(message.chat.id, 'Используйте команду так: /progress &lt;никнейм&gt;', parse_mode='HTML')
+            return
+
+        if not stats_queue.submit(message.chat.id, run_progress_request, message, nicknames[0]):
+            send_message(
+                message.chat.id,
+                'Сейчас слишком много запросов статистики. Пожалуйста, попробуйте через минуту.',
+                parse_mode='HTML',
+            )
+            return
+        bot.send_chat_action(message.chat.id, 'typing')
+
+    @timed(HANDLER_SECONDS, 'run_progress_request')
+    def run_progress_request(message: Message, nickname: str):
+        """Refresh the player's stats and reply with the trend; runs on a stats worker thread."""
+        history = get_stats_history()
+        if history is None:
+            send_message(message.chat.id, 'История статистики отключена.', parse_mode='HTML')
+            return
+
+        try:
+            # Свежая загрузка добавляет снимок в историю, если прошлый достаточно старый
+            stats = get_player_stats(nickname)
+            if not stats:
+                send_message(
+                    message.chat.id,
+                    f'Не удалось найти игрока с никнеймом "{html.escape(nickname)}". '
+                    f'Проверьте правильность написания и попробуйте снова.',
+                    parse_mode='HTML',
+                )
+                return
+            progress = history.progress(normalize_nickname(nickname), days=Config.PROGRESS_DAYS)
+        except IccupUnavailableError:
+            send_message(message.chat.id, ICCUP_UNAVAILABLE_MESSAGE, parse_mode='HTML')
+            return
+        except Exception as e:
+            logging.error("Error processing progress for %s: %s", nickname, e)
+            send_message(
+                message.chat.id,
+                'Произошла ошибка при получении истории статистики. Пожалуйста, попробуйте позже.',
+                parse_mode='HTML',
+            )
+            return
+
+        send_message(message.chat.id, format_progress_message(nickname, progress), parse_mode='HTML')
+
     # Обработчик команды /cancel
     @bot.message_handler(commands=['cancel'])
     def cancel_command(message: Message):
@@ -249,10 +520,9 @@ def setup_bot(token: str) -> telebot.TeleBot:
         user_id = message.from_user.id
 
         # Сбрасываем состояние пользователя
-        if user_id in user_states:
-            user_states.pop(user_id, None)
+        user_states.pop(user_id)
 
-        bot.send_message(
+        send_message(
             message.chat.id,
             'Операция отменена. Вы в главном меню.',
             parse_mode='HTML',
@@ -268,9 +538,8 @@ def setup_bot(token: str) -> telebot.TeleBot:
         text = message.text.strip()
 
         # Если пользователь в состоянии ожидания ввода
-        if user_id in user_states:
-            state = user_states[user_id]['state']
-
+        state = user_states.get(user_id)
+        if state is not None:
             if state == STATE_WAITING_FOR_NICKNAME:
                 # Если ожидается никнейм
                 process_nickname_input(message)
@@ -284,15 +553,13 @@ def setup_bot(token: str) -> telebot.TeleBot:
         # Обработка нажатий на кнопки меню
         if text.startswith('📈 Статистика игроков'):
             # Запрашиваем ввод никнейма для получения статистики
-            msg = bot.send_message(
+            send_message(
                 message.chat.id,
-                'Пожалуйста, введите никнейм игрока:',
+                NICKNAME_PROMPT,
                 parse_mode='HTML'
             )
             # Устанавливаем состояние ожидания никнейма
-            user_states[user_id] = {'state': STATE_WAITING_FOR_NICKNAME}
-            # Регистрируем следующий шаг
-            bot.register_next_step_handler(msg, process_nickname_input)
+            user_states.set(user_id, STATE_WAITING_FOR_NICKNAME)
 
 
         elif text.startswith('🎉 Конкурсы'):
@@ -316,7 +583,7 @@ def setup_bot(token: str) -> telebot.TeleBot:
                 "Воскресенье Custom Closed LOD\n"
                 "Время проведения: 19:00 по МСК\n"
             )
-            bot.send_message(message.chat.id, contest_message, parse_mode='HTML')
+            send_message(message.chat.id, contest_message, parse_mode='HTML')
 
         elif text.startswith('Вакансии'):
             # Отправляем информацию о вакансии
@@ -345,7 +612,7 @@ def setup_bot(token: str) -> telebot.TeleBot:
                 "Custom Forum Team - Порядок нужен везде, в особенности, на форуме\n"
                 "Заинтересованы? <a href='https://iccup.com/job_custom_forum'>Мы ждем вас!</a>\n"
             )
-            bot.send_message(message.chat.id, Vacancies_message, parse_mode='HTML')
+            send_message(message.chat.id, Vacancies_message, parse_mode='HTML')
 
         elif text.startswith('❓ FAQ'):
             # Отправляем информацию о FAQ
@@ -368,7 +635,7 @@ def setup_bot(token: str) -> telebot.TeleBot:
                 "Q: Какие есть полезные ссылки?\n"
                 "Ответ: <a href='https://t.me/iCCupTech/18'>Читайте тут</a>"
             )
-            bot.send_message(message.chat.id, faq_message, parse_mode='HTML')
+            send_message(message.chat.id, faq_message, parse_mode='HTML')
 
         elif text.startswith('🛠 Техническая поддержка'):
             # Tech supp
@@ -393,18 +660,121 @@ def setup_bot(token: str) -> telebot.TeleBot:
                 "Q. <a href='https://t.me/iCCupTech/33'>Ошибки с ACCESS VIOLATION</a>.\n"
                 "Q. <a href='https://t.me/iCCupTech/34'>Не работают хоткеи</a>.\n"
             )
-            bot.send_message(message.chat.id, Tech_message, parse_mode='HTML')
+            send_message(message.chat.id, Tech_message, parse_mode='HTML')
 
         else:
             # Если не распознали команду - показываем подсказку
-            bot.send_message(
+            send_message(
                 message.chat.id,
                 'Для взаимодействия с ботом используйте кнопки меню или следующие команды:\n'
                 '/start - главное меню\n'
                 '/menu - показать меню\n'
                 '/stats - получить статистику игрока\n'
+                '/progress - изменение статистики игрока за месяц\n'
                 '/cancel - отменить текущую операцию',
                 parse_mode='HTML',
             )
 
+    # Инлайн-режим: @bot никнейм в любом чате.
+    # Готовые результаты кэшируются по нику (включая "не найден"), одновременные запросы одного ника
+    # ждут одну загрузку, поэтому за окно кэша iccup.com запрашивается не больше одного раза на ник
+    inline_results = TTLCache(maxsize=Config.INLINE_CACHE_SIZE, ttl=Config.INLINE_CACHE_TTL)
+    inline_inflight: Dict[str, Future] = {}
+    inline_lock = threading.Lock()
+    # Telegram присылает запрос на каждое нажатие клавиши — обрабатываем только последний
+    inline_debouncer = Debouncer(Config.INLINE_DEBOUNCE, name='inline-debouncer')
+    bot.inline_results = inline_results
+
+    def build_inline_result(key: str, nickname: str) -> Optional[InlineQueryResultArticle]:
+        """Fetch a player's stats and render them as an inline result; None if the player is not found."""
+        stats = get_player_stats(nickname)
+        if not stats:
+            return None
+        text = split_message([format_stats_message(nickname, stats)])[0]
+        return InlineQueryResultArticle(
+            id=hashlib.md5(key.encode('utf-8')).hexdigest(),
+            title=f"Статистика {stats.username or nickname}",
+            description=format_stats_summary(stats),
+            input_message_content=InputTextMessageContent(text, parse_mode='HTML'),
+        )
+
+    def get_inline_result(key: str, nickname: str) -> Optional[InlineQueryResultArticle]:
+        """Return the cached inline result for a nickname, rendering it at most once per cache window."""
+        cached = inline_results.get(key)
+        if cached is not None and cached[1]:
+            return cached[0]
+
+        with inline_lock:
+            future = inline_inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                inline_inflight[key] = future
+
+        if is_owner:
+            try:
+                result = build_inline_result(key, nickname)
+                inline_results.set(key, result)
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with inline_lock:
+                    del inline_inflight[key]
+        return future.result(timeout=Config.BATCH_STATS_TIMEOUT)
+
+    def answer_inline(query: InlineQuery, result: Optional[InlineQueryResultArticle], cache_time: int) -> None:
+        try:
+            bot.answer_inline_query(query.id, [result] if result is not None else [], cache_time=cache_time)
+        except Exception as e:
+            # Запрос мог устареть, пока загружалась статистика
+            logging.warning("Failed to answer inline query %s: %s", query.id, e)
+
+    @timed(HANDLER_SECONDS, 'run_inline_query')
+    def run_inline_query(query: InlineQuery, key: str, nickname: str):
+        """Render and send the inline answer; runs on a stats worker thread."""
+        try:
+            result = get_inline_result(key, nickname)
+        except IccupUnavailableError:
+            answer_inline(query, None, cache_time=Config.INLINE_ERROR_CACHE_TIME)
+            return
+        except Exception as e:
+            logging.error("Error processing inline stats for %s: %s", nickname, e)
+            answer_inline(query, None, cache_time=Config.INLINE_ERROR_CACHE_TIME)
+            return
+        answer_inline(query, result, cache_time=Config.INLINE_CACHE_TIME)
+
+    def queue_inline_query(query: InlineQuery, key: str, nickname: str):
+        if not stats_queue.submit(query.from_user.id, run_inline_query, query, key, nickname):
+            logging.warning("Stats queue is full, dropping inline query for %s", nickname)
+
+    @bot.inline_handler(func=lambda query: True)
+    def inline_query_handler(query: InlineQuery):
+        """Answer `@bot nickname` with the player's stats card."""
+        nicknames = parse_nicknames(query.query)
+        if not nicknames or len(nicknames[0]) < Config.INLINE_MIN_QUERY_LENGTH:
+            inline_debouncer.cancel(query.from_user.id)
+            return
+
+        nickname = nicknames[0]
+        key = normalize_nickname(nickname)
+        cached = inline_results.get(key)
+        if cached is not None and cached[1]:
+            # Готовый результат отдаём сразу, без задержки и без очереди
+            inline_debouncer.cancel(query.from_user.id)
+            answer_inline(query, cached[0], cache_time=Config.INLINE_CACHE_TIME)
+            return
+        inline_debouncer.submit(query.from_user.id, queue_inline_query, query, key, nickname)
+
+    # Ввод никнейма после /stats или кнопки меню. Регистрируется последним, чтобы команды
+    # вроде /cancel обрабатывались как обычно; состояние хранится в user_states и переживает
+    # перезапуск, поэтому next-step обработчики telebot больше не нужны
+    @bot.message_handler(
+        content_types=['text'],
+        func=lambda message: user_states.get(message.from_user.id) == STATE_WAITING_FOR_NICKNAME)
+    def nickname_input_handler(message: Message):
+        process_nickname_input(message)
+
+    # Время выполнения каждого обработчика и каждого вызова Bot API — в метрики
+    instrument_telebot(bot)
     return bot
\ No newline at end of file
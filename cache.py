@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe bounded cache with per-entry TTL and LRU eviction.
+
+    Expired entries are not dropped on read: they are returned as stale so the
+    caller can serve them immediately and refresh the value in the background.
+    Once an entry has been stale for longer than max_stale it is dropped and
+    reported as a miss, so a value whose refreshes keep failing is not served
+    forever.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_stale: Optional[float] = None):
+        """
+        Args:
+            maxsize: Maximum number of entries kept in the cache
+            ttl: Time in seconds after which an entry is considered stale
+            max_stale: Seconds a stale entry may still be served (default: no limit)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, bool]]:
+        """
+        Look up a key.
+
+        Returns:
+            Tuple (value, is_fresh) or None if the key is not cached
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            now = time.monotonic()
+            if now < expires_at:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value, True
+            if self.max_stale is not None and now >= expires_at + self.max_stale:
+                # Слишком старое значение не отдаём даже как устаревшее
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stale_hits += 1
+            return value, False
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if needed."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def expires_in(self, key: Hashable) -> Optional[float]:
+        """
+        Seconds until the entry goes stale (negative if already stale), without counting a hit.
+
+        Returns:
+            Remaining freshness in seconds or None if the key is not cached
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[1] - time.monotonic() if entry is not None else None
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def begin_refresh(self, key: Hashable) -> bool:
+        """
+        Mark a key as being refreshed.
+
+        Returns:
+            True if the caller should run the refresh, False if one is already running
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: Hashable) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters for monitoring."""
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expired': self.expired,
+                'refreshing': len(self._refreshing),
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
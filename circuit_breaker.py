@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_EVENTS = REGISTRY.counter(
+    'circuit_breaker_events', 'Circuit breaker state changes and rejected calls', ('breaker', 'event'))
+
+
+class CircuitBreaker:
+    """
+    Fail fast while a remote service is down and detect its recovery in the background.
+
+    While closed, calls are allowed and consecutive failures are counted;
+    failure_threshold of them open the breaker. While open, allow() returns
+    False so callers can answer immediately instead of waiting for a timeout.
+    After reset_timeout the breaker goes half-open and a background thread
+    runs the probe: success closes the breaker, failure opens it again with
+    the timeout doubled (up to max_reset_timeout). User requests never serve
+    as probes.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, probe: Callable[[], bool], failure_threshold: int = 5,
+                 reset_timeout: float = 30, max_reset_timeout: float = 300):
+        """
+        Args:
+            name: Name used in logs and metrics
+            probe: Checks whether the service works again; returns True on success
+            failure_threshold: Consecutive failures after which the breaker opens
+            reset_timeout: Seconds the breaker stays open before the first probe
+            max_reset_timeout: Upper bound for the open period after repeated failed probes
+        """
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._open_for = reset_timeout
+        self._probe_at = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may be made now; counts a rejection otherwise."""
+        if self._state == self.CLOSED:
+            return True
+        with self._lock:
+            self.rejected += 1
+        CIRCUIT_EVENTS.inc(self.name, 'rejected')
+        return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next recovery probe (0 when the breaker is closed)."""
+        if self._state == self.CLOSED:
+            return 0.0
+        return max(0.0, self._probe_at - time.monotonic())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state != self.CLOSED:
+                # Ответ на запрос, начатый до размыкания: сервис снова работает
+                self._close()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                return
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._open(self.reset_timeout)
+
+    # --- Переходы состояний (под блокировкой) ---
+
+    def _open(self, duration: float) -> None:
+        self._state = self.OPEN
+        self._open_for = duration
+        self._probe_at = time.monotonic() + duration
+        self._timer = threading.Timer(duration, self._run_probe)
+        self._timer.daemon = True
+        self._timer.start()
+        CIRCUIT_EVENTS.inc(self.name, 'opened')
+        logger.warning("Circuit breaker %s opened after %d failures, next probe in %.0f s",
+                       self.name, self._failures, duration)
+
+    def _close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._state = self.CLOSED
+        self._failures = 0
+        self._open_for = self.reset_timeout
+        CIRCUIT_EVENTS.inc(self.name, 'closed')
+        logger.info("Circuit breaker %s closed", self.name)
+
+    def _run_probe(self) -> None:
+        with self._lock:
+            if self._state != self.OPEN:
+                return
+            self._state = self.HALF_OPEN
+        try:
+            healthy = self.probe()
+        except Exception as e:
+            logger.warning("Circuit breaker %s probe failed: %s", self.name, e)
+            healthy = False
+
+        with self._lock:
+            if self._state != self.HALF_OPEN:
+                return
+            if healthy:
+                self._close()
+            else:
+                CIRCUIT_EVENTS.inc(self.name, 'probe_failed')
+                self._open(min(self._open_for * 2, self.max_reset_timeout))
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'state': self._state,
+                'failures': self._failures,
+                'rejected': self.rejected,
+                'retry_after': round(self.retry_after(), 1),
+            }
+
+    def shutdown(self) -> None:
+        """Cancel a pending probe."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
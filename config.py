@@ -2,6 +2,139 @@ import os
 
 class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///site.db'  # Используем SQLite для простоты, заменяй на свою БД
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///site.db')  # Используем SQLite для простоты, заменяй на свою БД
     SECRET_KEY = os.environ.get('SECRET_KEY', 'your_secret_key_here')
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', 'your_telegram_bot_token_here')
+
+    # Параметры HTTP-клиента для запросов к iccup.com
+    SCRAPER_POOL_SIZE = int(os.environ.get('SCRAPER_POOL_SIZE', 10))
+    SCRAPER_CONNECT_TIMEOUT = float(os.environ.get('SCRAPER_CONNECT_TIMEOUT', 3.05))
+    SCRAPER_READ_TIMEOUT = float(os.environ.get('SCRAPER_READ_TIMEOUT', 10))
+    SCRAPER_MAX_CONCURRENCY = int(os.environ.get('SCRAPER_MAX_CONCURRENCY', 20))
+    # auto | selectolax | lxml | html.parser
+    HTML_PARSER_BACKEND = os.environ.get('HTML_PARSER_BACKEND', 'auto')
+
+    # Кэш статистики игроков
+    STATS_CACHE_SIZE = int(os.environ.get('STATS_CACHE_SIZE', 1000))
+    STATS_CACHE_TTL = float(os.environ.get('STATS_CACHE_TTL', 300))
+    # Сколько секунд после TTL ещё можно отдавать устаревшую запись, пока обновление не удаётся
+    STATS_CACHE_MAX_STALE = float(os.environ.get('STATS_CACHE_MAX_STALE', 3600))
+    # Негативный кэш: «Player not found» не запрашивается повторно в течение этого времени
+    NOT_FOUND_CACHE_SIZE = int(os.environ.get('NOT_FOUND_CACHE_SIZE', 5000))
+    NOT_FOUND_CACHE_TTL = float(os.environ.get('NOT_FOUND_CACHE_TTL', 60))
+
+    # Автоматический выключатель запросов к iccup.com: после стольких таймаутов/5xx подряд
+    # запросы отклоняются сразу, а доступность сайта проверяется в фоне
+    ICCUP_FAILURE_THRESHOLD = int(os.environ.get('ICCUP_FAILURE_THRESHOLD', 5))
+    ICCUP_RESET_TIMEOUT = float(os.environ.get('ICCUP_RESET_TIMEOUT', 30))
+    ICCUP_MAX_RESET_TIMEOUT = float(os.environ.get('ICCUP_MAX_RESET_TIMEOUT', 300))
+
+    # Пул воркеров для запросов /stats
+    STATS_WORKERS = int(os.environ.get('STATS_WORKERS', 8))
+    STATS_QUEUE_LIMIT = int(os.environ.get('STATS_QUEUE_LIMIT', 200))
+    STATS_QUEUE_PER_CHAT_LIMIT = int(os.environ.get('STATS_QUEUE_PER_CHAT_LIMIT', 5))
+
+    # Пакетные запросы /stats nick1 nick2 ...
+    BATCH_STATS_MAX_NICKNAMES = int(os.environ.get('BATCH_STATS_MAX_NICKNAMES', 20))
+    BATCH_STATS_TIMEOUT = float(os.environ.get('BATCH_STATS_TIMEOUT', 20))
+
+    # Режим получения обновлений: polling | webhook
+    BOT_MODE = os.environ.get('BOT_MODE', 'polling')
+    WEBHOOK_HOST = os.environ.get('WEBHOOK_HOST', '127.0.0.1')
+    WEBHOOK_PORT = int(os.environ.get('WEBHOOK_PORT', 8443))
+    WEBHOOK_PATH = os.environ.get('WEBHOOK_PATH', '/telegram/webhook')
+    WEBHOOK_SECRET_TOKEN = os.environ.get('WEBHOOK_SECRET_TOKEN')
+    WEBHOOK_URL = os.environ.get('WEBHOOK_URL')  # Публичный HTTPS-адрес, который регистрируется в Telegram
+    WEBHOOK_MAX_BODY_SIZE = int(os.environ.get('WEBHOOK_MAX_BODY_SIZE', 1024 * 1024))
+
+    # Лимиты исходящих сообщений Telegram
+    SEND_GLOBAL_RATE = float(os.environ.get('SEND_GLOBAL_RATE', 30))
+    SEND_CHAT_RATE = float(os.environ.get('SEND_CHAT_RATE', 1))
+    SEND_GROUP_RATE = float(os.environ.get('SEND_GROUP_RATE', 20 / 60))
+    SEND_WORKERS = int(os.environ.get('SEND_WORKERS', 4))
+
+    # Хранилище тикетов техподдержки
+    TICKETS_SNAPSHOT_PATH = os.environ.get('TICKETS_SNAPSHOT_PATH', 'tickets.json')
+    TICKETS_JOURNAL_PATH = os.environ.get('TICKETS_JOURNAL_PATH', 'tickets.journal')
+    TICKETS_COMPACT_EVERY = int(os.environ.get('TICKETS_COMPACT_EVERY', 1000))
+    TICKETS_FSYNC = os.environ.get('TICKETS_FSYNC', '1') == '1'
+    # Бот техподдержки и чат администраторов, куда приходят тикеты
+    SUPPORT_BOT_TOKEN = os.environ.get('SUPPORT_BOT_TOKEN', 'your_support_bot_token_here')
+    ADMIN_CHAT_ID = int(os.environ.get('ADMIN_CHAT_ID', 0))
+
+    # Список сообщений в админке
+    ADMIN_PAGE_SIZE = int(os.environ.get('ADMIN_PAGE_SIZE', 50))
+    ADMIN_MAX_PAGE_SIZE = int(os.environ.get('ADMIN_MAX_PAGE_SIZE', 200))
+    ADMIN_PREVIEW_LENGTH = int(os.environ.get('ADMIN_PREVIEW_LENGTH', 100))
+    ADMIN_BULK_MAX_IDS = int(os.environ.get('ADMIN_BULK_MAX_IDS', 1000))
+
+    # Полнотекстовый поиск по сообщениям
+    SEARCH_SNIPPET_TOKENS = int(os.environ.get('SEARCH_SNIPPET_TOKENS', 12))
+    SEARCH_MAX_PAGE = int(os.environ.get('SEARCH_MAX_PAGE', 50))
+
+    # Живая лента сообщений в админке (SSE)
+    ADMIN_FEED_POLL_INTERVAL = float(os.environ.get('ADMIN_FEED_POLL_INTERVAL', 1))
+    ADMIN_FEED_KEEPALIVE = float(os.environ.get('ADMIN_FEED_KEEPALIVE', 15))
+    ADMIN_FEED_RETRY_MS = int(os.environ.get('ADMIN_FEED_RETRY_MS', 3000))
+    ADMIN_FEED_RETENTION = int(os.environ.get('ADMIN_FEED_RETENTION', 100000))
+    # Отдельный asyncio-сервер ленты: открытые вкладки не занимают потоки WSGI; 0 — отдавать ленту через Flask
+    ADMIN_FEED_HOST = os.environ.get('ADMIN_FEED_HOST', '0.0.0.0')
+    ADMIN_FEED_PORT = int(os.environ.get('ADMIN_FEED_PORT', 5001))
+    # Пусто — разрешены страницы с того же хоста на любом порту
+    ADMIN_FEED_ALLOW_ORIGIN = os.environ.get('ADMIN_FEED_ALLOW_ORIGIN', '')
+
+    # Настройки SQLite для базы админки
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16384))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 5))
+    SQLITE_POOL_OVERFLOW = int(os.environ.get('SQLITE_POOL_OVERFLOW', 10))
+    SQLITE_POOL_TIMEOUT = float(os.environ.get('SQLITE_POOL_TIMEOUT', 10))
+
+    # Запись тикетов техподдержки в таблицу Message пачками
+    TICKETS_DB_INGEST = os.environ.get('TICKETS_DB_INGEST', '0') == '1'
+    MESSAGE_BATCH_SIZE = int(os.environ.get('MESSAGE_BATCH_SIZE', 100))
+    MESSAGE_BATCH_INTERVAL = float(os.environ.get('MESSAGE_BATCH_INTERVAL', 0.5))
+
+    # Состояния диалога пользователей бота
+    USER_STATE_TTL = float(os.environ.get('USER_STATE_TTL', 900))
+    USER_STATE_MAX_USERS = int(os.environ.get('USER_STATE_MAX_USERS', 10000))
+    USER_STATE_PATH = os.environ.get('USER_STATE_PATH', 'user_states.journal')
+
+    # Инлайн-режим (@bot никнейм)
+    INLINE_DEBOUNCE = float(os.environ.get('INLINE_DEBOUNCE', 0.4))
+    INLINE_MIN_QUERY_LENGTH = int(os.environ.get('INLINE_MIN_QUERY_LENGTH', 2))
+    INLINE_CACHE_SIZE = int(os.environ.get('INLINE_CACHE_SIZE', 1000))
+    INLINE_CACHE_TTL = float(os.environ.get('INLINE_CACHE_TTL', 300))
+    # Сколько секунд Telegram сам отдаёт сохранённый ответ на одинаковый запрос
+    INLINE_CACHE_TIME = int(os.environ.get('INLINE_CACHE_TIME', 300))
+    INLINE_ERROR_CACHE_TIME = int(os.environ.get('INLINE_ERROR_CACHE_TIME', 5))
+
+    # Фоновое обновление статистики популярных игроков
+    PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', '1') == '1'
+    PREFETCH_REQUESTS_PER_MINUTE = float(os.environ.get('PREFETCH_REQUESTS_PER_MINUTE', 30))
+    PREFETCH_TOP_N = int(os.environ.get('PREFETCH_TOP_N', 200))
+    PREFETCH_REFRESH_AHEAD = float(os.environ.get('PREFETCH_REFRESH_AHEAD', 60))
+    PREFETCH_HALF_LIFE = float(os.environ.get('PREFETCH_HALF_LIFE', 3600))
+    PREFETCH_MIN_SCORE = float(os.environ.get('PREFETCH_MIN_SCORE', 2))
+
+    # История статистики игроков для /progress
+    HISTORY_ENABLED = os.environ.get('HISTORY_ENABLED', '1') == '1'
+    HISTORY_DIR = os.environ.get('HISTORY_DIR', 'stats_history')
+    HISTORY_MIN_INTERVAL = float(os.environ.get('HISTORY_MIN_INTERVAL', 3600))
+    PROGRESS_DAYS = int(os.environ.get('PROGRESS_DAYS', 30))
+
+    # Логирование: запись в консоль и файл идёт в фоновом потоке
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.environ.get('LOG_FILE') or None
+    LOG_JSON = os.environ.get('LOG_JSON', '0') == '1'
+    # Записей в секунду с одного места вызова для INFO/DEBUG (0 — без ограничения)
+    LOG_RATE_LIMIT = float(os.environ.get('LOG_RATE_LIMIT', 5))
+    LOG_RATE_BURST = int(os.environ.get('LOG_RATE_BURST', 20))
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+    # Эндпоинт /metrics для процессов ботов (в админке он доступен по маршруту Flask); 0 — выключен
+    METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.environ.get('METRICS_PORT', 0))
+    SUPPORT_METRICS_PORT = int(os.environ.get('SUPPORT_METRICS_PORT', 0))
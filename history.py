@@ -0,0 +1,257 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from player_stats import PlayerStats
+
+logger = logging.getLogger(__name__)
+
+# Числовые поля PlayerStats, которые сохраняются в истории
+HISTORY_FIELDS = ('pts', 'wins', 'losses', 'win_ratio', 'kda', 'apm', 'leave_rate')
+
+SECONDS_PER_DAY = 86400
+
+
+def snapshot_values(stats: PlayerStats) -> np.ndarray:
+    """Extract HISTORY_FIELDS from parsed stats as a float32 vector (NaN for missing values)."""
+    values = [getattr(stats, field) for field in HISTORY_FIELDS]
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float32)
+
+
+class StatsHistory:
+    """
+    Append-only history of player stats snapshots stored column by column.
+
+    Every column (player index, timestamp and one per field in HISTORY_FIELDS)
+    is a flat binary file of 4-byte values, so a snapshot costs
+    4 * (2 + len(HISTORY_FIELDS)) bytes on disk. Nicknames are stored once in
+    players.txt and referenced by their line number. Stored columns are
+    memory-mapped and sorted by player once, so one player's series is a
+    slice of that index plus a scan of the snapshots appended since.
+    """
+
+    def __init__(self, directory: str, min_interval: float = 3600, reindex_every: int = 10000):
+        """
+        Args:
+            directory: Directory with the column files
+            min_interval: Minimum seconds between two stored snapshots of one player
+            reindex_every: Number of appended snapshots after which the player index is rebuilt
+        """
+        self.directory = directory
+        self.min_interval = min_interval
+        self.reindex_every = reindex_every
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._players: Dict[str, int] = {}
+        self._last_ts: Dict[int, int] = {}
+        self._files = None
+        # Отсортированная по игроку часть истории (memmap) и хвост из недавних снимков
+        self._columns: Dict[str, np.ndarray] = {}
+        self._order = np.empty(0, dtype=np.int64)
+        self._sorted_players = np.empty(0, dtype=np.uint32)
+        self._tail: List[Tuple[int, int, np.ndarray]] = []
+
+    # --- Файлы ---
+
+    def _column_path(self, name: str) -> str:
+        suffix = 'u32' if name in ('player', 'ts') else 'f32'
+        return os.path.join(self.directory, f'{name}.{suffix}')
+
+    @staticmethod
+    def _column_dtype(name: str):
+        return np.uint32 if name in ('player', 'ts') else np.float32
+
+    def _column_names(self) -> Tuple[str, ...]:
+        return ('player', 'ts') + HISTORY_FIELDS
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        players_path = os.path.join(self.directory, 'players.txt')
+        if os.path.exists(players_path):
+            with open(players_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.endswith('\n'):
+                        self._players[line[:-1]] = len(self._players)
+
+        # После сбоя колонки могут отличаться по длине — обрезаем до общей
+        sizes = [os.path.getsize(p) // 4 if os.path.exists(p) else 0
+                 for p in map(self._column_path, self._column_names())]
+        count = min(sizes)
+        for name in self._column_names():
+            path = self._column_path(name)
+            if os.path.exists(path) and os.path.getsize(path) != count * 4:
+                with open(path, 'r+b') as f:
+                    f.truncate(count * 4)
+        self._index_columns(count)
+        self._loaded = True
+        logger.info("Loaded stats history: %s snapshots of %s players", count, len(self._players))
+
+    def _index_columns(self, count: int) -> None:
+        """Memory-map the stored columns and sort snapshots by player, then by time."""
+        self._columns = {}
+        for name in self._column_names():
+            if count:
+                self._columns[name] = np.memmap(self._column_path(name), dtype=self._column_dtype(name),
+                                                mode='r', shape=(count,))
+            else:
+                self._columns[name] = np.empty(0, dtype=self._column_dtype(name))
+        players = self._columns['player']
+        self._order = np.lexsort((self._columns['ts'], players))
+        self._sorted_players = players[self._order]
+        # Время последнего снимка каждого игрока нужно для min_interval
+        if count:
+            last = np.r_[self._sorted_players[1:] != self._sorted_players[:-1], True]
+            for player, ts in zip(self._sorted_players[last], self._columns['ts'][self._order][last]):
+                self._last_ts[int(player)] = int(ts)
+        self._tail = []
+
+    def _open_files(self):
+        if self._files is None:
+            self._files = {name: open(self._column_path(name), 'ab') for name in self._column_names()}
+            self._files['players'] = open(os.path.join(self.directory, 'players.txt'), 'a', encoding='utf-8')
+        return self._files
+
+    # --- Запись ---
+
+    def record(self, key: str, stats: PlayerStats, ts: Optional[float] = None) -> bool:
+        """
+        Store a snapshot of a player's stats unless one was stored less than min_interval ago.
+
+        Args:
+            key: Normalized nickname
+            stats: Parsed player stats
+            ts: Unix time of the snapshot (default: now)
+
+        Returns:
+            True if the snapshot was stored
+        """
+        ts = int(time.time() if ts is None else ts)
+        values = snapshot_values(stats)
+        if np.isnan(values).all():
+            return False
+
+        with self._lock:
+            self._ensure_loaded()
+            files = self._open_files()
+            player = self._players.get(key)
+            if player is None:
+                player = len(self._players)
+                self._players[key] = player
+                files['players'].write(key + '\n')
+                files['players'].flush()
+            elif ts - self._last_ts.get(player, 0) < self.min_interval:
+                return False
+
+            files['player'].write(np.uint32(player).tobytes())
+            files['ts'].write(np.uint32(ts).tobytes())
+            for field, value in zip(HISTORY_FIELDS, values):
+                files[field].write(value.tobytes())
+            for f in files.values():
+                f.flush()
+
+            self._last_ts[player] = ts
+            self._tail.append((player, ts, values))
+            if len(self._tail) >= self.reindex_every:
+                self._index_columns(len(self._columns['player']) + len(self._tail))
+            return True
+
+    # --- Чтение ---
+
+    def series(self, key: str, since: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return a player's snapshots in time order.
+
+        Args:
+            key: Normalized nickname
+            since: Only snapshots taken at or after this Unix time
+
+        Returns:
+            Tuple (timestamps, values) with values of shape (n, len(HISTORY_FIELDS))
+        """
+        with self._lock:
+            self._ensure_loaded()
+            player = self._players.get(key)
+            if player is None:
+                return np.empty(0, dtype=np.uint32), np.empty((0, len(HISTORY_FIELDS)), dtype=np.float32)
+
+            # Искомые значения того же типа, что и массив, иначе numpy приводит весь индекс
+            start, end = np.searchsorted(self._sorted_players, np.array([player, player + 1], dtype=np.uint32))
+            positions = self._order[start:end]
+            ts = self._columns['ts'][positions]
+            if since is not None:
+                # Снимки игрока в индексе уже упорядочены по времени
+                first = np.searchsorted(ts, np.uint32(max(0, since)))
+                positions, ts = positions[first:], ts[first:]
+            values = np.column_stack([self._columns[field][positions] for field in HISTORY_FIELDS])
+            recent = [(t, v) for p, t, v in self._tail if p == player and (since is None or t >= since)]
+
+        if recent:
+            ts = np.concatenate([ts, np.array([t for t, _ in recent], dtype=np.uint32)])
+            values = np.vstack([values.reshape(-1, len(HISTORY_FIELDS)), np.array([v for _, v in recent])])
+        return ts, values.reshape(-1, len(HISTORY_FIELDS))
+
+    def progress(self, key: str, days: float) -> Optional[Dict]:
+        """
+        Compute how a player's stats changed over the last days.
+
+        Returns:
+            None if there are fewer than two snapshots, otherwise a dict with 'snapshots',
+            'days' (span covered), 'first', 'last', 'delta' and 'trend' (change per day from a
+            least-squares fit); the last four map field names to floats (NaN when unknown)
+        """
+        ts, values = self.series(key, since=time.time() - days * SECONDS_PER_DAY)
+        if len(ts) < 2:
+            return None
+        values = values.astype(np.float64)
+        x = (ts.astype(np.float64) - ts[0]) / SECONDS_PER_DAY
+
+        # Первое и последнее известное значение каждого поля с учётом пропусков
+        known = ~np.isnan(values)
+        rows = np.arange(len(ts))[:, None]
+        first_idx = np.where(known, rows, len(ts)).min(axis=0)
+        last_idx = np.where(known, rows, -1).max(axis=0)
+        has_any = last_idx >= 0
+        columns = np.arange(values.shape[1])
+        first = np.where(has_any, values[np.minimum(first_idx, len(ts) - 1), columns], np.nan)
+        last = np.where(has_any, values[np.maximum(last_idx, 0), columns], np.nan)
+
+        # Наклон МНК по всем полям сразу; пропуски исключаются из сумм
+        counts = known.sum(axis=0)
+        x_mean = np.where(known, x[:, None], 0).sum(axis=0) / np.maximum(counts, 1)
+        y_mean = np.nansum(values, axis=0) / np.maximum(counts, 1)
+        dx = np.where(known, x[:, None] - x_mean, 0)
+        dy = np.where(known, values - y_mean, 0)
+        denominator = (dx * dx).sum(axis=0)
+        valid = (counts >= 2) & (denominator > 0)
+        trend = np.where(valid, (dx * dy).sum(axis=0) / np.where(valid, denominator, 1), np.nan)
+
+        return {
+            'snapshots': len(ts),
+            'days': float(x[-1]),
+            'first': dict(zip(HISTORY_FIELDS, first.tolist())),
+            'last': dict(zip(HISTORY_FIELDS, last.tolist())),
+            'delta': dict(zip(HISTORY_FIELDS, (last - first).tolist())),
+            'trend': dict(zip(HISTORY_FIELDS, trend.tolist())),
+        }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stored = len(self._columns.get('player', ()))
+            return {
+                'players': len(self._players),
+                'snapshots': stored + len(self._tail),
+                'bytes_per_snapshot': 4 * len(self._column_names()),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._files is not None:
+                for f in self._files.values():
+                    f.close()
+                self._files = None
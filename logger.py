@@ -1,46 +1,210 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from typing import Optional
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional, Tuple
 
+from metrics import REGISTRY
 
-def setup_logger(log_level: int = logging.INFO, log_file: Optional[str] = None) -> logging.Logger:
+LOGGER_NAME = "dota_stats_bot"
+
+# Очередь и фоновый поток, который пишет записи в консоль и файл; создаются один раз на процесс
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+_setup_lock = threading.Lock()
+
+
+def parse_log_level(name: str) -> Optional[int]:
+    """Return the numeric level for a name such as 'debug' or 'WARNING', or None if it is unknown."""
+    # getLevelName возвращает строку 'Level FOO' для неизвестного имени, а setLevel на ней падает
+    level = logging.getLevelName(name.strip().upper())
+    return level if isinstance(level, int) else None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'location': f'{record.filename}:{record.lineno}',
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limit how often one logging call site may emit records below WARNING.
+
+    Every call site (file and line) gets a token bucket of burst records
+    refilled at rate per second; records beyond it are dropped. The next record
+    that passes notes how many were dropped. Warnings and errors always pass.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Args:
+            rate: Records per second allowed from one call site
+            burst: Records a call site may emit at once before it is limited
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        # (файл, строка) -> (доступные токены, время последнего пополнения, пропущено записей)
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.msg = f'{record.msg} [{suppressed} similar messages suppressed]'
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller: when the queue is full the record is dropped and counted."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Сообщение собирается здесь: аргументы могут измениться после возврата из вызова logger.*.
+        # Трассировка остаётся в exc_text, чтобы форматтер слушателя вывел её как обычно
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logger(log_level: int = logging.INFO, log_file: Optional[str] = None, json_format: bool = False,
+                 rate_limit: Optional[float] = None, rate_burst: int = 20,
+                 queue_size: int = 10000) -> logging.Logger:
     """
     Set up and configure the logger.
 
+    Records of all loggers in the process are put on a queue by the calling
+    thread and written to the console (and the log file) by a background
+    listener thread, so logging never waits for I/O or file rotation. Calling
+    this again only updates the level; handlers are installed once.
+
     Args:
         log_level: The logging level (default: logging.INFO)
         log_file: Path to the log file (default: None, logs to console only)
+        json_format: Write one JSON object per record instead of text lines
+        rate_limit: Records per second allowed from one call site below WARNING (default: no limit)
+        rate_burst: Records one call site may emit at once before rate_limit applies
+        queue_size: Maximum number of records waiting to be written; further records are dropped
 
     Returns:
         Configured logger instance
     """
-    # Create logger
-    logger = logging.getLogger("dota_stats_bot")
-    logger.setLevel(log_level)
-
-    # Create formatters
-    detailed_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
-    )
-
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(detailed_formatter)
-    logger.addHandler(console_handler)
-
-    # Create file handler if log_file is specified
-    if log_file:
-        # Create logs directory if it doesn't exist
-        log_dir = os.path.dirname(log_file)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-
-        # Create rotating file handler (10 MB max size, keep 3 backup files)
-        file_handler = RotatingFileHandler(
-            log_file, maxBytes=10 * 1024 * 1024, backupCount=3
-        )
-        file_handler.setFormatter(detailed_formatter)
-        logger.addHandler(file_handler)
+    global _listener, _queue_handler
+
+    logger = logging.getLogger(LOGGER_NAME)
+    root = logging.getLogger()
+    with _setup_lock:
+        root.setLevel(log_level)
+        logger.setLevel(log_level)
+        if _listener is not None:
+            return logger
+
+        # Create formatters
+        if json_format:
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
+            )
+
+        # Create console handler
+        handlers = [logging.StreamHandler()]
+
+        # Create file handler if log_file is specified
+        if log_file:
+            # Create logs directory if it doesn't exist
+            log_dir = os.path.dirname(log_file)
+            if log_dir and not os.path.exists(log_dir):
+                os.makedirs(log_dir)
+
+            # Create rotating file handler (10 MB max size, keep 3 backup files)
+            handlers.append(RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=3))
+
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        # Обработчики вызываются только в потоке слушателя; в коде запроса — лишь постановка в очередь
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        if rate_limit:
+            _queue_handler.addFilter(RateLimitFilter(rate_limit, rate_burst))
+        root.addHandler(_queue_handler)
+        _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logger)
 
     return logger
+
+
+def shutdown_logger() -> None:
+    """Write out the queued records and stop the listener thread."""
+    global _listener, _queue_handler
+
+    with _setup_lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        if _queue_handler.dropped:
+            logging.getLogger(LOGGER_NAME).warning(
+                "%d log records were dropped because the log queue was full", _queue_handler.dropped)
+        _listener = None
+        _queue_handler = None
+
+
+def dropped_records() -> int:
+    """Number of records dropped so far because the log queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+REGISTRY.callback('log_records_dropped', 'Log records dropped because the log queue was full',
+                  lambda: {(): dropped_records()}, type_name='counter')
@@ -1,13 +1,33 @@
 import os
 import logging
 import time
-from logger import setup_logger
-from bot import setup_bot
+from logger import parse_log_level, setup_logger
+from bot import setup_bot, user_states
+from scraper import start_prefetch, stop_async_engine, stop_prefetch
+from config import Config
+from webhook import run_webhook
+from metrics import start_metrics_server
+
+
+def configure_logging():
+    """Set up the queued logging pipeline from Config; an unknown LOG_LEVEL falls back to INFO."""
+    log_level = parse_log_level(Config.LOG_LEVEL)
+    logger = setup_logger(
+        log_level=log_level if log_level is not None else logging.INFO,
+        log_file=Config.LOG_FILE,
+        json_format=Config.LOG_JSON,
+        rate_limit=Config.LOG_RATE_LIMIT or None,
+        rate_burst=Config.LOG_RATE_BURST,
+        queue_size=Config.LOG_QUEUE_SIZE,
+    )
+    if log_level is None:
+        logger.warning("Unknown LOG_LEVEL %r, using INFO", Config.LOG_LEVEL)
+    return logger
 
 
 def start_telegram_bot():
     # Initialize logger
-    logger = setup_logger()
+    logger = configure_logging()
 
     # Retrieve API token
     token = os.environ.get('TELEGRAM_BOT_TOKEN')
@@ -17,7 +37,10 @@ def start_telegram_bot():
 
     logger.info('Starting bot with provided token')
     bot = setup_bot(token)
-    bot.enable_save_next_step_handlers(delay=2)
+    if Config.PREFETCH_ENABLED:
+        start_prefetch()
+    if Config.METRICS_PORT:
+        start_metrics_server(Config.METRICS_HOST, Config.METRICS_PORT)
 
     try:
         logger.info('Polling started')
@@ -28,8 +51,58 @@ def start_telegram_bot():
         logger.exception('Polling error: %s', err)
     finally:
         bot.stop_polling()
+        user_states.close()
+        stop_prefetch()
+        stop_async_engine()
         logger.info('Polling fully stopped')
 
 
+def start_telegram_bot_webhook():
+    """Run the bot in webhook mode: Telegram pushes updates to a local HTTP server."""
+    logger = configure_logging()
+
+    token = os.environ.get('TELEGRAM_BOT_TOKEN')
+    if not token:
+        logger.error('TELEGRAM_BOT_TOKEN not set!')
+        return
+
+    # Без секрета любой, кто знает адрес, может слать боту поддельные обновления
+    if not Config.WEBHOOK_SECRET_TOKEN:
+        logger.error('WEBHOOK_SECRET_TOKEN not set! Refusing to start in webhook mode')
+        return
+
+    logger.info('Starting bot in webhook mode')
+    bot = setup_bot(token)
+    if Config.PREFETCH_ENABLED:
+        start_prefetch()
+    if Config.METRICS_PORT:
+        start_metrics_server(Config.METRICS_HOST, Config.METRICS_PORT)
+
+    server = run_webhook(
+        bot,
+        host=Config.WEBHOOK_HOST,
+        port=Config.WEBHOOK_PORT,
+        path=Config.WEBHOOK_PATH,
+        secret_token=Config.WEBHOOK_SECRET_TOKEN,
+        public_url=Config.WEBHOOK_URL,
+        max_body_size=Config.WEBHOOK_MAX_BODY_SIZE,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info('Webhook server stopped by user')
+    except Exception as err:
+        logger.exception('Webhook server error: %s', err)
+    finally:
+        server.server_close()
+        user_states.close()
+        stop_prefetch()
+        stop_async_engine()
+        logger.info('Webhook server fully stopped')
+
+
 if __name__ == '__main__':
-    start_telegram_bot()
\ No newline at end of file
+    if Config.BOT_MODE == 'webhook':
+        start_telegram_bot_webhook()
+    else:
+        start_telegram_bot()
\ No newline at end of file
@@ -0,0 +1,340 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм, секунды
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing count, one value per combination of label values."""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}_total{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+                for labels, value in values]
+
+
+class Histogram:
+    """
+    Distribution of observed values (latencies in seconds) in cumulative buckets.
+
+    An observation is a bisect over the bucket bounds and three additions
+    under a lock, so it is cheap enough for every request.
+    """
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Значения меток -> [счётчики по корзинам (последняя — +Inf), сумма, количество]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, *labelvalues: str) -> '_Timer':
+        """Context manager that observes the duration of its block."""
+        return _Timer(self, labelvalues)
+
+    def count(self, *labelvalues: str) -> int:
+        entry = self._values.get(labelvalues)
+        return entry[2] if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total, count))
+                            for labels, (counts, total, count) in self._values.items())
+        lines = []
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {repr(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class CallbackMetric:
+    """
+    Gauge or counter whose values are read from a callback when metrics are rendered.
+
+    For state that already lives elsewhere (cache sizes, counters kept by a
+    component): nothing is updated on the hot path, the callback is only
+    called on a scrape.
+    """
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Dict[Tuple[str, ...], float]],
+                 labelnames: Sequence[str] = (), type_name: str = 'gauge'):
+        """
+        Args:
+            name: Metric name (a counter is rendered with the _total suffix)
+            documentation: HELP text
+            read: Returns label values -> current value
+            labelnames: Names of the labels, in the order of the tuples returned by read
+            type_name: 'gauge' or 'counter'
+        """
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.labelnames = tuple(labelnames)
+        self.type_name = type_name
+
+    def samples(self) -> List[str]:
+        name = f'{self.name}_total' if self.type_name == 'counter' else self.name
+        try:
+            values = sorted(self.read().items())
+        except Exception as e:
+            logger.warning("Failed to read metric %s: %s", self.name, e)
+            return []
+        return [f'{name}{_format_labels(self.labelnames, labels)} {_format_value(value)}' for labels, value in values]
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labelvalues', 'started')
+
+    def __init__(self, histogram: Histogram, labelvalues: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues)
+
+
+class Registry:
+    """Set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, read: Callable[[], Dict[Tuple[str, ...], float]],
+                 labelnames: Sequence[str] = (), type_name: str = 'gauge') -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, read, labelnames, type_name))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            name = f'{metric.name}_total' if metric.type_name == 'counter' else metric.name
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type_name}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Метрики приложения. Метки — только из небольших фиксированных наборов значений
+ICCUP_FETCH_SECONDS = REGISTRY.histogram(
+    'iccup_fetch_seconds', 'Time to download a profile page from iccup.com', ('status',))
+HTML_PARSE_SECONDS = REGISTRY.histogram(
+    'html_parse_seconds', 'Time to parse a profile page', ('backend',), buckets=FAST_BUCKETS)
+STATS_CACHE_REQUESTS = REGISTRY.counter(
+    'stats_cache_requests', 'Player stats lookups by cache result', ('result',))
+TELEGRAM_API_SECONDS = REGISTRY.histogram(
+    'telegram_api_seconds', 'Duration of Telegram Bot API calls', ('method', 'status'))
+HANDLER_SECONDS = REGISTRY.histogram(
+    'bot_handler_seconds', 'Execution time of bot handlers and background jobs', ('handler', 'status'))
+TICKET_STORE_WRITE_SECONDS = REGISTRY.histogram(
+    'ticket_store_write_seconds', 'Duration of ticket journal and snapshot writes', ('operation',),
+    buckets=FAST_BUCKETS)
+ADMIN_DB_QUERY_SECONDS = REGISTRY.histogram(
+    'admin_db_query_seconds', 'Duration of admin database statements', ('statement',), buckets=FAST_BUCKETS)
+
+
+def timed(histogram: Histogram, name: str) -> Callable:
+    """Decorator recording a function's execution time under labels (name, ok|error); supports coroutines."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                status = 'error'
+                try:
+                    result = await func(*args, **kwargs)
+                    status = 'ok'
+                    return result
+                finally:
+                    histogram.observe(time.perf_counter() - started, name, status)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            status = 'error'
+            try:
+                result = func(*args, **kwargs)
+                status = 'ok'
+                return result
+            finally:
+                histogram.observe(time.perf_counter() - started, name, status)
+        return wrapper
+    return decorator
+
+
+# --- Интеграции ---
+
+def instrument_telebot(bot) -> None:
+    """
+    Time all Bot API requests of telebot and every registered handler of the bot.
+
+    Call after all handlers are registered.
+    """
+    from telebot import apihelper
+
+    if apihelper.CUSTOM_REQUEST_SENDER is None:
+        def send_request(method, url, **kwargs):
+            api_method = url.rsplit('/', 1)[-1]
+            started = time.perf_counter()
+            status = 'error'
+            try:
+                response = apihelper._get_req_session().request(method, url, **kwargs)
+                status = 'ok' if response.status_code == 200 else str(response.status_code)
+                return response
+            finally:
+                TELEGRAM_API_SECONDS.observe(time.perf_counter() - started, api_method, status)
+
+        apihelper.CUSTOM_REQUEST_SENDER = send_request
+
+    for handlers in (bot.message_handlers, bot.edited_message_handlers, bot.callback_query_handlers,
+                     bot.inline_handlers):
+        for handler in handlers:
+            function = handler['function']
+            if not getattr(function, '_timed', False):
+                handler['function'] = timed(HANDLER_SECONDS, function.__name__)(function)
+                handler['function']._timed = True
+
+
+def track_queries(engine) -> None:
+    """Record the duration of every statement executed through a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'query_started', None)
+        if started is not None:
+            verb = statement.split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+            ADMIN_DB_QUERY_SECONDS.observe(time.perf_counter() - started, verb)
+
+
+# --- HTTP-эндпоинт для процессов без Flask ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host: str, port: int, registry: Optional[Registry] = None) -> ThreadingHTTPServer:
+    """
+    Serve /metrics on a background thread.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on (0 picks a free one)
+        registry: Metrics to expose (default: REGISTRY)
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry or REGISTRY
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info("Metrics available at http://%s:%s/metrics", host, server.server_port)
+    return server
@@ -1,7 +1,16 @@
 from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.schema import CreateIndex
 from app import db
 
 class Message(db.Model):
+    # Индексы под keyset-пагинацию и фильтры списка в админке
+    __table_args__ = (
+        db.Index('ix_message_created_at_id', 'created_at', 'id'),
+        db.Index('ix_message_resolved_created_at_id', 'is_resolved', 'created_at', 'id'),
+        db.Index('ix_message_user_created_at_id', 'user_id', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
     username = db.Column(db.String(100), nullable=True)
@@ -12,4 +21,84 @@ class Message(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
-        return f"Message('{self.id}', '{self.username}', '{self.created_at}')"
\ No newline at end of file
+        return f"Message('{self.id}', '{self.username}', '{self.created_at}')"
+
+
+def create_message_indexes(connection) -> None:
+    """Create the Message list indexes in a database created before they were declared."""
+    if not inspect(connection).has_table(Message.__tablename__):
+        return
+    for index in Message.__table__.indexes:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+# Полнотекстовый индекс FTS5 по текстам сообщений и комментариям админа.
+# Таблица хранит только индекс (content='message'), синхронизация — триггерами SQLite,
+# поэтому в индекс попадают и записи, добавленные ботом в обход Flask.
+MESSAGE_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5(
+        message_text, admin_comment, content='message', content_rowid='id', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS message_fts_insert AFTER INSERT ON message BEGIN
+        INSERT INTO message_fts(rowid, message_text, admin_comment)
+        VALUES (new.id, new.message_text, new.admin_comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS message_fts_delete AFTER DELETE ON message BEGIN
+        INSERT INTO message_fts(message_fts, rowid, message_text, admin_comment)
+        VALUES ('delete', old.id, old.message_text, old.admin_comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS message_fts_update AFTER UPDATE OF message_text, admin_comment ON message BEGIN
+        INSERT INTO message_fts(message_fts, rowid, message_text, admin_comment)
+        VALUES ('delete', old.id, old.message_text, old.admin_comment);
+        INSERT INTO message_fts(rowid, message_text, admin_comment)
+        VALUES (new.id, new.message_text, new.admin_comment);
+    END""",
+)
+
+
+def create_search_index(connection) -> None:
+    """Create the FTS5 table and its sync triggers; rebuild the index if the table is new."""
+    if connection.dialect.name != 'sqlite' or not inspect(connection).has_table(Message.__tablename__):
+        return
+    is_new = not inspect(connection).has_table('message_fts')
+    for statement in MESSAGE_FTS_DDL:
+        connection.exec_driver_sql(statement)
+    if is_new:
+        connection.exec_driver_sql("INSERT INTO message_fts(message_fts) VALUES ('rebuild')")
+
+
+@event.listens_for(Message.__table__, 'after_create')
+def _create_search_index(target, connection, **kwargs):
+    create_search_index(connection)
+
+
+class MessageChange(db.Model):
+    """Change log of Message rows, filled by SQLite triggers; feeds the live admin inbox."""
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    message_id = db.Column(db.Integer, db.ForeignKey('message.id'), nullable=False)
+
+
+MESSAGE_CHANGE_DDL = (
+    """CREATE TRIGGER IF NOT EXISTS message_change_insert AFTER INSERT ON message BEGIN
+        INSERT INTO message_change(message_id) VALUES (new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS message_change_update
+    AFTER UPDATE OF message_text, admin_comment, is_resolved ON message BEGIN
+        INSERT INTO message_change(message_id) VALUES (new.id);
+    END""",
+)
+
+
+def create_change_triggers(connection) -> None:
+    """Create the triggers that record Message inserts and updates in message_change."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in MESSAGE_CHANGE_DDL:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(MessageChange.__table__, 'after_create')
+def _create_change_triggers(target, connection, **kwargs):
+    create_change_triggers(connection)
@@ -0,0 +1,115 @@
+import re
+from typing import Any, Callable, Dict, Optional, Tuple
+
+NUMBER_RE = re.compile(r'-?\d+(?:[.,]\d+)?')
+
+
+def parse_float(value: str) -> Optional[float]:
+    """Parse a number as shown on the profile page ('3.21', '55.3%', '2 %', '1 534'); None if there is none."""
+    match = NUMBER_RE.search(value.replace('\xa0', '').replace(' ', ''))
+    return float(match.group().replace(',', '.')) if match else None
+
+
+def parse_int(value: str) -> Optional[int]:
+    number = parse_float(value)
+    return int(number) if number is not None else None
+
+
+def parse_text(value: str) -> Optional[str]:
+    value = value.strip()
+    return value or None
+
+
+# Подписи на странице профиля iccup.com -> (поле PlayerStats, преобразование)
+STATS_LABELS: Tuple[Tuple[str, Callable[[str], Any], Tuple[str, ...]], ...] = (
+    ('username', parse_text, ('Nickname',)),
+    ('status', parse_text, ('Status',)),
+    ('pts', parse_int, ('PTS',)),
+    ('rank', parse_text, ('Ранг', 'Rank')),
+    ('kda', parse_float, ('KDA',)),
+    ('games_played', parse_int, ('Всего игр', 'Игр', 'Games')),
+    ('wins', parse_int, ('Побед', 'Победы', 'Wins')),
+    ('losses', parse_int, ('Поражений', 'Поражения', 'Losses')),
+    ('win_ratio', parse_float, ('Win rate', 'Процент побед', 'Винрейт')),
+    ('average_kills', parse_float, ('Убийств', 'Среднее убийств', 'Kills')),
+    ('average_deaths', parse_float, ('Смертей', 'Среднее смертей', 'Deaths')),
+    ('average_assists', parse_float, ('Помощи', 'Среднее помощи', 'Assists')),
+    ('apm', parse_int, ('APM',)),
+    ('farm', parse_float, ('Фарм', 'Farm')),
+    ('experience_per_min', parse_float, ('Опыт в минуту', 'XPM')),
+    ('gank_participation', parse_float, ('Участие в ганках',)),
+    ('total_match_time', parse_text, ('Время в игре', 'Общее время матчей')),
+    ('avg_match_time', parse_text, ('Среднее время матча', 'Среднее время игры')),
+    ('leave_rate', parse_float, ('Leave', 'Ливы', 'Процент выходов')),
+    ('location', parse_text, ('Страна', 'Локация', 'Location')),
+)
+
+# Таблица поиска строится один раз: нормализованная подпись -> (поле, преобразование)
+LABEL_FIELDS: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    label.lower(): (field, convert) for field, convert, labels in STATS_LABELS for label in labels
+}
+
+
+class PlayerStats:
+    """
+    Parsed statistics of one player.
+
+    Filled once by the profile extractors: every label found on the page is
+    looked up in LABEL_FIELDS and converted to int, float or text. Labels that
+    are not mapped (or values that do not parse) are kept as raw text in
+    extra, so nothing shown on the page is lost. Instances are shared through
+    the stats cache and must not be modified after extraction.
+    """
+
+    __slots__ = tuple(field for field, _, _ in STATS_LABELS) + ('extra',)
+    FIELDS = tuple(field for field, _, _ in STATS_LABELS)
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, None)
+        self.extra: Dict[str, str] = {}
+        for field, value in values.items():
+            setattr(self, field, value)
+
+    def set_label(self, label: str, raw: str) -> None:
+        """Store a value found on the profile page under its label."""
+        mapping = LABEL_FIELDS.get(label.strip().rstrip(':').lower())
+        if mapping is not None:
+            field, convert = mapping
+            value = convert(raw)
+            if value is not None:
+                setattr(self, field, value)
+                return
+        self.extra[label] = raw
+
+    def finish(self) -> 'PlayerStats':
+        """Fill values that can be derived from others (games played, win ratio)."""
+        if self.games_played is None and self.wins is not None and self.losses is not None:
+            self.games_played = self.wins + self.losses
+        if self.win_ratio is None and self.wins is not None and self.games_played:
+            self.win_ratio = round(100 * self.wins / self.games_played, 1)
+        return self
+
+    def __len__(self) -> int:
+        """Number of known values, including raw extra ones."""
+        return sum(getattr(self, field) is not None for field in self.FIELDS) + len(self.extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a JSON-compatible dict with only the known values."""
+        data = {field: getattr(self, field) for field in self.FIELDS if getattr(self, field) is not None}
+        if self.extra:
+            data['extra'] = dict(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PlayerStats':
+        values = {field: data[field] for field in cls.FIELDS if field in data}
+        stats = cls(**values)
+        stats.extra = dict(data.get('extra', {}))
+        return stats
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PlayerStats) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"PlayerStats({self.to_dict()!r})"
@@ -0,0 +1,187 @@
+import heapq
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class PopularityCounter:
+    """
+    Lookup counts per key that decay exponentially over time.
+
+    A lookup adds 1 to the key's score and the score halves every half_life
+    seconds, so the ranking follows what is popular now rather than all-time
+    totals. Only the max_keys highest-scoring keys are remembered.
+    """
+
+    def __init__(self, half_life: float, max_keys: int):
+        """
+        Args:
+            half_life: Seconds after which a lookup counts half as much
+            max_keys: Maximum number of keys tracked
+        """
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self._decay = math.log(2) / half_life
+        # key -> [score, updated_at, nickname]
+        self._scores: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _score_at(self, entry: list, now: float) -> float:
+        return entry[0] * math.exp(-self._decay * (now - entry[1]))
+
+    def record(self, key: str, nickname: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._scores.get(key)
+            if entry is None:
+                self._scores[key] = [1.0, now, nickname]
+                if len(self._scores) > self.max_keys * 1.25:
+                    self._prune(now)
+            else:
+                entry[0] = self._score_at(entry, now) + 1.0
+                entry[1] = now
+
+    def _prune(self, now: float) -> None:
+        """Keep only the max_keys highest current scores."""
+        keep = heapq.nlargest(self.max_keys, self._scores.items(), key=lambda item: self._score_at(item[1], now))
+        self._scores = dict(keep)
+
+    def top(self, count: int, min_score: float = 0.0) -> List[Tuple[str, str, float]]:
+        """
+        Return the most popular keys right now.
+
+        Returns:
+            List of (key, nickname, score), highest score first
+        """
+        now = time.monotonic()
+        with self._lock:
+            scored = [(self._score_at(entry, now), key, entry[2]) for key, entry in self._scores.items()]
+        best = heapq.nlargest(count, (item for item in scored if item[0] >= min_score))
+        return [(key, nickname, score) for score, key, nickname in best]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+class PrefetchScheduler:
+    """
+    Background refresh of the most requested player profiles.
+
+    Lookups are counted in a PopularityCounter. A single thread walks the top
+    keys and re-fetches those whose cache entry is missing or about to go
+    stale, so popular players are always answered from fresh cache. Fetches
+    are spaced evenly to stay within requests_per_minute toward iccup.com.
+    """
+
+    def __init__(self, cache: TTLCache, fetch: Callable[[str], Optional[Dict]], requests_per_minute: float,
+                 store: Optional[Callable[[str, Dict], None]] = None, top_n: int = 200, refresh_ahead: float = 60, half_life: float = 3600,
+                 min_score: float = 2.0, max_keys: int = 10000, idle_interval: float = 5.0,
+                 available: Optional[Callable[[], bool]] = None):
+        """
+        Args:
+            cache: Player stats cache that is kept warm
+            fetch: Uncached fetch function, nickname -> stats dict or None
+            requests_per_minute: Crawl budget for prefetch requests
+            store: Saves fetched stats under a key (default: cache.set)
+            top_n: How many of the most popular keys are kept warm
+            refresh_ahead: Refresh an entry this many seconds before it goes stale
+            half_life: Half-life of lookup counts in seconds
+            min_score: Minimum popularity score for a key to be prefetched
+            max_keys: Maximum number of keys tracked by the popularity counter
+            idle_interval: Seconds to wait when there is nothing to refresh
+            available: Returns False while the source is known to be down; prefetch pauses until it is back
+        """
+        self.cache = cache
+        self.fetch = fetch
+        self.store = store or cache.set
+        self.interval = 60.0 / requests_per_minute
+        self.top_n = top_n
+        self.refresh_ahead = refresh_ahead
+        self.min_score = min_score
+        self.idle_interval = idle_interval
+        self.available = available
+        self.popularity = PopularityCounter(half_life=half_life, max_keys=max_keys)
+        # Ключи, для которых загрузка не дала данных, не повторяем до истечения TTL кэша
+        self._failed_at: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.prefetched = 0
+        self.failed = 0
+
+    def record(self, key: str, nickname: str) -> None:
+        """Count one interactive lookup of a nickname."""
+        self.popularity.record(key, nickname)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='stats-prefetch', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _next_candidate(self) -> Optional[Tuple[str, str]]:
+        """Pick the most popular key whose cache entry is missing or close to going stale."""
+        now = time.monotonic()
+        for key, nickname, _ in self.popularity.top(self.top_n, self.min_score):
+            expires_in = self.cache.expires_in(key)
+            if expires_in is not None and expires_in > self.refresh_ahead:
+                continue
+            failed_at = self._failed_at.get(key)
+            if failed_at is not None and now - failed_at < self.cache.ttl:
+                continue
+            return key, nickname
+        return None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            # Пока сайт недоступен, не тратим попытки: иначе популярные ключи попадут в _failed_at
+            # и не будут обновляться ещё целый TTL после восстановления
+            if self.available is not None and not self.available():
+                self._stop.wait(self.idle_interval)
+                continue
+            candidate = self._next_candidate()
+            if candidate is None:
+                self._stop.wait(self.idle_interval)
+                continue
+            self._prefetch(*candidate)
+            # Равномерно расходуем бюджет запросов к iccup.com
+            self._stop.wait(self.interval)
+
+    def _prefetch(self, key: str, nickname: str) -> None:
+        if not self.cache.begin_refresh(key):
+            return
+        try:
+            stats = self.fetch(nickname)
+        except Exception as e:
+            stats = None
+            logger.warning("Prefetch of %s failed: %s", nickname, e)
+        finally:
+            self.cache.end_refresh(key)
+
+        if stats:
+            self.store(key, stats)
+            self._failed_at.pop(key, None)
+            self.prefetched += 1
+        else:
+            self._failed_at[key] = time.monotonic()
+            self.failed += 1
+            if len(self._failed_at) > self.top_n * 10:
+                self._failed_at.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'tracked_keys': len(self.popularity),
+            'prefetched': self.prefetched,
+            'failed': self.failed,
+            'requests_per_minute': 60.0 / self.interval,
+        }
@@ -1,84 +1,697 @@
+import asyncio
+import concurrent.futures
 import logging
+import re
+import threading
+import time
+import httpx
 import requests
-from bs4 import BeautifulSoup
-from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+from typing import Callable, Dict, Optional
+from cache import TTLCache
+from circuit_breaker import CircuitBreaker
+from config import Config
+from history import StatsHistory
+from metrics import HTML_PARSE_SECONDS, ICCUP_FETCH_SECONDS, REGISTRY, STATS_CACHE_REQUESTS
+from player_stats import PlayerStats
+from prefetch import PrefetchScheduler
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
 
 # Set up logger
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+PROFILE_URL = "https://iccup.com/dota/gamingprofile/{nickname}.html"
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Общая сессия с пулом keep-alive соединений к iccup.com
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _create_session(pool_size: int) -> requests.Session:
+    """Create a requests session with a keep-alive connection pool."""
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': USER_AGENT,
+        'Connection': 'keep-alive',
+    })
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the shared HTTP session used for all requests to iccup.com.
+
+    The session is created lazily on first use. Its connection pool is sized by
+    Config.SCRAPER_POOL_SIZE; when all connections are busy, callers wait for a
+    free one instead of opening extra sockets.
+
+    Returns:
+        Shared requests.Session instance
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session(Config.SCRAPER_POOL_SIZE)
+    return _session
+
+
+def close_http_session() -> None:
+    """Close the shared HTTP session and drop its pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_request_timeout() -> tuple:
+    """Return the (connect, read) timeout pair for requests to iccup.com."""
+    return Config.SCRAPER_CONNECT_TIMEOUT, Config.SCRAPER_READ_TIMEOUT
+
+
+# Кэш статистики игроков по нормализованному никнейму
+_stats_cache = TTLCache(maxsize=Config.STATS_CACHE_SIZE, ttl=Config.STATS_CACHE_TTL,
+                        max_stale=Config.STATS_CACHE_MAX_STALE)
+
+# Никнеймы, для которых iccup.com ответил «Player not found»: значение — True
+_not_found_cache = TTLCache(maxsize=Config.NOT_FOUND_CACHE_SIZE, ttl=Config.NOT_FOUND_CACHE_TTL)
+
+# История снимков статистики для /progress; None — история отключена
+_history: Optional[StatsHistory] = (
+    StatsHistory(Config.HISTORY_DIR, min_interval=Config.HISTORY_MIN_INTERVAL) if Config.HISTORY_ENABLED else None
+)
+
+
+class IccupUnavailableError(Exception):
+    """Raised instead of a request to iccup.com while the site is considered down."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"iccup.com is unavailable, retry in {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+
+def normalize_nickname(nickname: str) -> str:
+    """Normalize a nickname for use as a cache key."""
+    return nickname.strip().lower()
 
 
-def get_player_stats(nickname: str) -> Optional[Dict]:
+def get_player_stats(nickname: str) -> Optional[PlayerStats]:
     """
-    Scrape player statistics from iccup.com DotA profile page.
+    Get player statistics, served from the cache when possible.
+
+    Fresh cache entries are returned directly. Stale entries are returned
+    immediately while a single background refresh fetches new data. Nicknames
+    recently reported as not found are answered from the negative cache.
 
     Args:
         nickname: The player's nickname/username on iccup.com
 
     Returns:
-        Dictionary containing player statistics or None if player not found
+        Parsed player statistics or None if player not found
+
+    Raises:
+        IccupUnavailableError: iccup.com is down and the cache has no entry
     """
-    url = f"https://iccup.com/dota/gamingprofile/{nickname}.html"
+    key = normalize_nickname(nickname)
+    _prefetcher.record(key, nickname)
+    cached = _stats_cache.get(key)
+    if cached is not None:
+        stats, is_fresh = cached
+        STATS_CACHE_REQUESTS.inc('hit' if is_fresh else 'stale')
+        if not is_fresh:
+            _refresh_in_background(key, nickname)
+        return stats
+    if _is_known_not_found(key):
+        return None
+
+    STATS_CACHE_REQUESTS.inc('miss')
+    stats = fetch_player_stats(nickname)
+    if stats:
+        _store_stats(key, stats)
+    return stats
+
+
+def _store_stats(key: str, stats: PlayerStats) -> None:
+    """Cache freshly scraped stats and add a snapshot to the history."""
+    _stats_cache.set(key, stats)
+    if _history is not None:
+        try:
+            _history.record(key, stats)
+        except Exception as e:
+            logger.error("Failed to record stats history for '%s': %s", key, e)
+
+
+def _is_known_not_found(key: str) -> bool:
+    """Return True if iccup.com reported this nickname as not found within NOT_FOUND_CACHE_TTL."""
+    cached = _not_found_cache.get(key)
+    if cached is None or not cached[1]:
+        return False
+    STATS_CACHE_REQUESTS.inc('not_found')
+    return True
+
+
+def get_stats_history() -> Optional[StatsHistory]:
+    """Return the stats snapshot history, or None if it is disabled."""
+    return _history
+
+
+def _refresh_in_background(key: str, nickname: str) -> None:
+    """Start a background refresh of a stale cache entry unless one is already running or iccup.com is down."""
+    if _breaker.state != CircuitBreaker.CLOSED or not _stats_cache.begin_refresh(key):
+        return
+
+    def refresh():
+        try:
+            stats = fetch_player_stats(nickname)
+            if stats:
+                _store_stats(key, stats)
+        except IccupUnavailableError:
+            # Устаревшая запись остаётся в кэше до восстановления сайта
+            pass
+        finally:
+            _stats_cache.end_refresh(key)
 
+    threading.Thread(target=refresh, name=f"stats-refresh-{key}", daemon=True).start()
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Return size and hit/miss/eviction counters of the stats cache and the not-found cache."""
+    return {'stats': _stats_cache.stats(), 'not_found': _not_found_cache.stats()}
+
+
+def _cache_metric(field: str) -> Callable[[], Dict[tuple, float]]:
+    return lambda: {(cache,): stats[field] for cache, stats in get_cache_stats().items()}
+
+
+# Размер и вытеснения кэшей читаются при каждом запросе /metrics
+REGISTRY.callback('stats_cache_entries', 'Entries in the player stats caches', _cache_metric('size'), ('cache',))
+REGISTRY.callback('stats_cache_max_entries', 'Capacity of the player stats caches', _cache_metric('maxsize'), ('cache',))
+REGISTRY.callback('stats_cache_evictions', 'Entries evicted from the player stats caches to stay within capacity',
+                  _cache_metric('evictions'), ('cache',), type_name='counter')
+REGISTRY.callback('stats_cache_expired', 'Entries dropped after being stale for longer than the allowed age',
+                  _cache_metric('expired'), ('cache',), type_name='counter')
+REGISTRY.callback('stats_cache_refreshing', 'Background refreshes of stale stats in progress',
+                  _cache_metric('refreshing'), ('cache',))
+
+
+def get_circuit_stats() -> Dict[str, object]:
+    """Return the state of the iccup.com circuit breaker."""
+    return _breaker.stats()
+
+
+# Никнейм последнего неудачного запроса: по нему фоновая проверка узнаёт, ожил ли сайт
+_last_failed_nickname = 'iccup'
+
+
+def _probe_iccup() -> bool:
+    """Check whether iccup.com answers again; any response below 500 except 429 counts."""
+    url = PROFILE_URL.format(nickname=_last_failed_nickname)
     try:
-        # Log the scraping attempt
-        logger.info(f"Scraping stats for player '{nickname}' from {url}")
+        response = get_http_session().get(url, timeout=get_request_timeout())
+    except requests.exceptions.RequestException as e:
+        logger.info("iccup.com is still unavailable: %s", e)
+        return False
+    return not _is_site_failure(response.status_code)
+
+
+def _is_site_failure(status_code: int) -> bool:
+    return status_code >= 500 or status_code == 429
+
+
+def _record_outcome(key: str, nickname: str, status: str, site_failed: bool) -> None:
+    """Report the result of a request to the circuit breaker and the negative cache."""
+    global _last_failed_nickname
+    if site_failed:
+        _last_failed_nickname = nickname
+        _breaker.record_failure()
+        return
+    _breaker.record_success()
+    if status == 'not_found':
+        # Игрок удалён или переименован: прежняя статистика больше не отдаётся
+        _stats_cache.delete(key)
+        _not_found_cache.set(key, True)
+    elif status == 'ok':
+        _not_found_cache.delete(key)
+
+
+# Таймауты и 5xx подряд размыкают цепь: запросы /stats перестают ждать полный таймаут
+_breaker = CircuitBreaker(
+    'iccup',
+    probe=_probe_iccup,
+    failure_threshold=Config.ICCUP_FAILURE_THRESHOLD,
+    reset_timeout=Config.ICCUP_RESET_TIMEOUT,
+    max_reset_timeout=Config.ICCUP_MAX_RESET_TIMEOUT,
+)
 
-        # Send the HTTP request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
 
-        # Check if the request was successful
-        if response.status_code != 200:
-            logger.warning(f"Failed to retrieve page for {nickname}. Status code: {response.status_code}")
-            return None
+# 1 для текущего состояния выключателя, 0 для остальных
+REGISTRY.callback('iccup_circuit_state', 'Current state of the iccup.com circuit breaker',
+                  lambda: {(state,): int(get_circuit_stats()['state'] == state)
+                           for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN)},
+                  ('state',))
+REGISTRY.callback('iccup_circuit_retry_after_seconds', 'Seconds until the next iccup.com recovery probe',
+                  lambda: {(): get_circuit_stats()['retry_after']})
 
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'html.parser')
 
-        # Check if profile exists
-        if "Player not found" in response.text or "Profile not found" in response.text:
-            logger.warning(f"Player '{nickname}' not found on iccup.com")
-            return None
+def _check_breaker() -> None:
+    if not _breaker.allow():
+        raise IccupUnavailableError(_breaker.retry_after())
 
-        # Extract player statistics
-        stats = extract_player_stats(soup)
 
-        if not stats:
-            logger.warning(f"Could not extract stats for player '{nickname}'")
-            return None
+def fetch_player_stats(nickname: str) -> Optional[PlayerStats]:
+    """
+    Scrape player statistics from iccup.com DotA profile page, bypassing the cache.
+
+    Args:
+        nickname: The player's nickname/username on iccup.com
 
-        logger.info(f"Successfully scraped stats for '{nickname}'")
+    Returns:
+        Parsed player statistics or None if player not found
+
+    Raises:
+        IccupUnavailableError: The circuit breaker is open, no request was made
+    """
+    _check_breaker()
+    url = PROFILE_URL.format(nickname=nickname)
+    started = time.perf_counter()
+    downloaded = None
+    status = 'error'
+    site_failed = False
+
+    try:
+        # Log the scraping attempt
+        logger.info("Scraping stats for player '%s' from %s", nickname, url)
+
+        # Send the HTTP request over a pooled keep-alive connection
+        response = get_http_session().get(url, timeout=get_request_timeout())
+        downloaded = time.perf_counter()
+        site_failed = _is_site_failure(response.status_code)
+        stats = parse_profile_response(nickname, response.status_code, response.text)
+        status = profile_status(response.status_code, response.text, stats)
         return stats
 
+    except requests.exceptions.Timeout as e:
+        status = 'timeout'
+        site_failed = True
+        logger.error("Timeout when scraping stats for '%s': %s", nickname, e)
+        return None
     except requests.exceptions.RequestException as e:
-        logger.error(f"Request error when scraping stats for '{nickname}': {str(e)}")
+        site_failed = True
+        logger.error("Request error when scraping stats for '%s': %s", nickname, e)
         return None
     except Exception as e:
-        logger.error(f"Error scraping stats for '{nickname}': {str(e)}")
+        logger.error("Error scraping stats for '%s': %s", nickname, e)
         return None
+    finally:
+        ICCUP_FETCH_SECONDS.observe((downloaded or time.perf_counter()) - started, status)
+        _record_outcome(normalize_nickname(nickname), nickname, status, site_failed)
+
+
+# Фоновое обновление популярных профилей: частые запросы обслуживаются из тёплого кэша
+_prefetcher = PrefetchScheduler(
+    cache=_stats_cache,
+    fetch=fetch_player_stats,
+    store=_store_stats,
+    requests_per_minute=Config.PREFETCH_REQUESTS_PER_MINUTE,
+    top_n=Config.PREFETCH_TOP_N,
+    refresh_ahead=Config.PREFETCH_REFRESH_AHEAD,
+    half_life=Config.PREFETCH_HALF_LIFE,
+    min_score=Config.PREFETCH_MIN_SCORE,
+    available=lambda: _breaker.state == CircuitBreaker.CLOSED,
+)
+
+
+def start_prefetch() -> None:
+    """Start refreshing the most requested profiles in the background."""
+    _prefetcher.start()
+
+
+def stop_prefetch() -> None:
+    _prefetcher.stop()
+
+
+def get_prefetch_stats() -> Dict[str, float]:
+    """Return popularity tracking and prefetch counters."""
+    return _prefetcher.stats()
+
+
+REGISTRY.callback('prefetch_tracked_keys', 'Nicknames tracked by the prefetch popularity counter',
+                  lambda: {(): get_prefetch_stats()['tracked_keys']})
+REGISTRY.callback('prefetch_fetches', 'Background prefetch downloads by result',
+                  lambda: {(result,): get_prefetch_stats()[result] for result in ('prefetched', 'failed')},
+                  ('result',), type_name='counter')
+
+
+def is_not_found_page(text: str) -> bool:
+    return "Player not found" in text or "Profile not found" in text
+
+
+def profile_status(status_code: int, text: str, stats: Optional[PlayerStats]) -> str:
+    """Classify the outcome of a profile download for metrics: ok, not_found or error."""
+    if stats:
+        return 'ok'
+    if status_code == 200 and is_not_found_page(text):
+        return 'not_found'
+    return 'error'
+
+
+def parse_profile_response(nickname: str, status_code: int, text: str) -> Optional[PlayerStats]:
+    """
+    Turn a downloaded profile page into player statistics.
+
+    Args:
+        nickname: The player's nickname/username on iccup.com
+        status_code: HTTP status code of the response
+        text: HTML body of the response
+
+    Returns:
+        Parsed player statistics or None if player not found
+    """
+    # Check if the request was successful
+    if status_code != 200:
+        logger.warning("Failed to retrieve page for %s. Status code: %s", nickname, status_code)
+        return None
+
+    # Check if profile exists
+    if is_not_found_page(text):
+        logger.warning("Player '%s' not found on iccup.com", nickname)
+        return None
+
+    # Parse the HTML content and extract player statistics
+    stats = parse_player_stats(text)
+
+    if not stats:
+        logger.warning("Could not extract stats for player '%s'", nickname)
+        return None
+
+    logger.info("Successfully scraped stats for '%s'", nickname)
+    return stats
+
+
+# Асинхронный движок: общий httpx-клиент, ограничение параллелизма
+# и объединение одновременных запросов одного никнейма (single-flight)
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_async_semaphore: Optional[asyncio.Semaphore] = None
+_inflight: Dict[str, "asyncio.Future[Optional[PlayerStats]]"] = {}
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Return the httpx client bound to the running event loop, creating it if needed."""
+    global _async_loop, _async_client, _async_semaphore, _inflight
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_loop = loop
+        _async_client = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            timeout=httpx.Timeout(Config.SCRAPER_READ_TIMEOUT, connect=Config.SCRAPER_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=Config.SCRAPER_MAX_CONCURRENCY,
+                max_keepalive_connections=Config.SCRAPER_POOL_SIZE,
+            ),
+        )
+        _async_semaphore = asyncio.Semaphore(Config.SCRAPER_MAX_CONCURRENCY)
+        _inflight = {}
+    return _async_client
 
 
-def extract_player_stats(soup: BeautifulSoup) -> Dict:
-    stats = {}
+async def close_async_client() -> None:
+    """Close the shared httpx client."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+async def async_fetch_player_stats(nickname: str) -> Optional[PlayerStats]:
+    """
+    Asynchronously scrape player statistics from iccup.com, bypassing the cache.
+
+    The number of simultaneous requests to iccup.com is bounded by
+    Config.SCRAPER_MAX_CONCURRENCY.
+
+    Args:
+        nickname: The player's nickname/username on iccup.com
+
+    Returns:
+        Parsed player statistics or None if player not found
+
+    Raises:
+        IccupUnavailableError: The circuit breaker is open, no request was made
+    """
+    _check_breaker()
+    url = PROFILE_URL.format(nickname=nickname)
+    client = _get_async_client()
+    started = None
+    downloaded = None
+    status = 'error'
+    site_failed = False
+
+    try:
+        async with _async_semaphore:
+            logger.info("Scraping stats for player '%s' from %s", nickname, url)
+            # Время ожидания семафора в длительность запроса не входит
+            started = time.perf_counter()
+            response = await client.get(url)
+            downloaded = time.perf_counter()
+        site_failed = _is_site_failure(response.status_code)
+        # Разбор HTML нагружает процессор — выполняем его вне цикла событий
+        stats = await asyncio.to_thread(parse_profile_response, nickname, response.status_code, response.text)
+        status = profile_status(response.status_code, response.text, stats)
+        return stats
+
+    except httpx.TimeoutException as e:
+        status = 'timeout'
+        site_failed = True
+        logger.error("Timeout when scraping stats for '%s': %s", nickname, e)
+        return None
+    except httpx.HTTPError as e:
+        site_failed = True
+        logger.error("Request error when scraping stats for '%s': %s", nickname, e)
+        return None
+    except Exception as e:
+        logger.error("Error scraping stats for '%s': %s", nickname, e)
+        return None
+    finally:
+        if started is not None:
+            ICCUP_FETCH_SECONDS.observe((downloaded or time.perf_counter()) - started, status)
+            _record_outcome(normalize_nickname(nickname), nickname, status, site_failed)
+
+
+async def _fetch_single_flight(key: str, nickname: str) -> Optional[PlayerStats]:
+    """Fetch stats for a key, sharing one in-flight request among all concurrent callers."""
+    _get_async_client()
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(async_fetch_player_stats(nickname))
+        _inflight[key] = future
+
+        def done(fut):
+            if _inflight.get(key) is fut:
+                del _inflight[key]
+            if not fut.cancelled() and fut.exception() is None and fut.result():
+                _store_stats(key, fut.result())
+
+        future.add_done_callback(done)
+    # shield: отмена одного ожидающего не должна отменять общий запрос
+    return await asyncio.shield(future)
+
+
+# Ссылки на фоновые обновления: цикл событий хранит задачи только по слабым ссылкам
+_refresh_tasks = set()
+
+
+def _refresh_in_background_async(key: str, nickname: str) -> None:
+    """Async counterpart of _refresh_in_background; shares the refresh marker with the sync path and prefetch."""
+    # При разомкнутой цепи устаревшая запись отдаётся как есть, без попытки обновления
+    if _breaker.state != CircuitBreaker.CLOSED or not _stats_cache.begin_refresh(key):
+        return
+    task = asyncio.ensure_future(_fetch_single_flight(key, nickname))
+    _refresh_tasks.add(task)
+
+    def done(fut):
+        _refresh_tasks.discard(fut)
+        _stats_cache.end_refresh(key)
+        # Исключение забираем здесь, иначе asyncio предупредит о неполученном исключении задачи
+        if not fut.cancelled() and fut.exception() is not None:
+            logger.warning("Background refresh of '%s' failed: %s", nickname, fut.exception())
+
+    task.add_done_callback(done)
+
+
+async def async_get_player_stats(nickname: str) -> Optional[PlayerStats]:
+    """
+    Asynchronous counterpart of get_player_stats.
+
+    Shares the cache with get_player_stats. Concurrent calls for the same
+    nickname are collapsed into a single request to iccup.com.
+
+    Args:
+        nickname: The player's nickname/username on iccup.com
+
+    Returns:
+        Parsed player statistics or None if player not found
+
+    Raises:
+        IccupUnavailableError: iccup.com is down and the cache has no entry
+    """
+    key = normalize_nickname(nickname)
+    _prefetcher.record(key, nickname)
+    cached = _stats_cache.get(key)
+    if cached is not None:
+        stats, is_fresh = cached
+        STATS_CACHE_REQUESTS.inc('hit' if is_fresh else 'stale')
+        if not is_fresh:
+            _refresh_in_background_async(key, nickname)
+        return stats
+    if _is_known_not_found(key):
+        return None
+
+    STATS_CACHE_REQUESTS.inc('miss')
+    return await _fetch_single_flight(key, nickname)
+
+
+# Цикл событий асинхронного движка в отдельном потоке: потоки бота передают ему корутины
+_engine_loop: Optional[asyncio.AbstractEventLoop] = None
+_engine_lock = threading.Lock()
+
+
+def _get_engine_loop() -> asyncio.AbstractEventLoop:
+    global _engine_loop
+    with _engine_lock:
+        if _engine_loop is None:
+            _engine_loop = asyncio.new_event_loop()
+            threading.Thread(target=_engine_loop.run_forever, name='scraper-async', daemon=True).start()
+        return _engine_loop
+
+
+def submit_player_stats(nickname: str) -> concurrent.futures.Future:
+    """
+    Schedule async_get_player_stats on the shared engine loop from synchronous code.
+
+    All nicknames of a batch are fetched concurrently over one httpx client,
+    and concurrent requests for the same nickname (from any chat) share one
+    download.
+
+    Args:
+        nickname: The player's nickname/username on iccup.com
+
+    Returns:
+        Future resolving to the player statistics or None if player not found
+    """
+    return asyncio.run_coroutine_threadsafe(async_get_player_stats(nickname), _get_engine_loop())
+
+
+def stop_async_engine() -> None:
+    """Close the shared httpx client and stop the engine loop."""
+    global _engine_loop
+    with _engine_lock:
+        loop, _engine_loop = _engine_loop, None
+    if loop is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(close_async_client(), loop).result(timeout=5)
+    except Exception as e:
+        logger.warning("Failed to close the async HTTP client: %s", e)
+    loop.call_soon_threadsafe(loop.stop)
+
+
+# Бэкенды парсинга HTML: selectolax (самый быстрый), lxml и html.parser (запасной)
+PARSER_BACKENDS = ('selectolax', 'lxml', 'html.parser')
+
+# Классы элементов профиля, которые нужны extract_player_stats.
+# Остальная часть страницы в дерево не попадает.
+PROFILE_STRAINER = SoupStrainer(
+    attrs={'class': re.compile(r'(?:^|\s)(?:profile-uname|KPyTOCTb|i-pts|stata-body|bnet-status)(?:\s|$)')}
+)
+
+SKIPPED_TABLE_KEYS = ("Ранк", "список игр")
+
+
+def get_parser_backend(backend: Optional[str] = None) -> str:
+    """
+    Resolve the HTML parser backend to use.
+
+    Args:
+        backend: Requested backend name or 'auto' (default: Config.HTML_PARSER_BACKEND)
+
+    Returns:
+        Name of an available backend from PARSER_BACKENDS
+    """
+    backend = backend or Config.HTML_PARSER_BACKEND
+    if backend == 'selectolax' and SelectolaxParser is not None:
+        return backend
+    if backend == 'lxml' and HAS_LXML:
+        return backend
+    if backend == 'auto':
+        if SelectolaxParser is not None:
+            return 'selectolax'
+        if HAS_LXML:
+            return 'lxml'
+    elif backend not in PARSER_BACKENDS:
+        logger.warning("Unknown HTML parser backend '%s', falling back to html.parser", backend)
+    return 'html.parser'
+
+
+def parse_player_stats(html: str, backend: Optional[str] = None) -> PlayerStats:
+    """
+    Parse a profile page and extract player statistics.
+
+    Every backend produces the same record as extract_player_stats on a
+    full html.parser tree.
+
+    Args:
+        html: HTML body of the profile page
+        backend: Parser backend name or 'auto' (default: Config.HTML_PARSER_BACKEND)
+
+    Returns:
+        Parsed player statistics (empty if nothing was found)
+    """
+    backend = get_parser_backend(backend)
+    with HTML_PARSE_SECONDS.time(backend):
+        if backend == 'selectolax':
+            return extract_player_stats_selectolax(SelectolaxParser(html))
+        soup = BeautifulSoup(html, backend, parse_only=PROFILE_STRAINER)
+        return extract_player_stats(soup)
+
+
+def extract_player_stats(soup: BeautifulSoup) -> PlayerStats:
+    stats = PlayerStats()
 
     try:
         # Получаем имя игрока
         username_element = soup.select_one('.profile-uname')
         if username_element:
-            stats['Nickname'] = username_element.text.strip()
+            stats.set_label('Nickname', username_element.text.strip())
 
         # Парсим KDA сразу после ника
         kda_element = soup.select_one('.KPyTOCTb #k-num')
         if kda_element:
-            stats['KDA'] = kda_element.text.strip()
+            stats.set_label('KDA', kda_element.text.strip())
 
         # Парсим PTS сразу после ника
         pts_element = soup.select_one('.i-pts')
         if pts_element:
-            stats['PTS'] = pts_element.text.strip()
+            stats.set_label('PTS', pts_element.text.strip())
 
         # Извлекаем остальную статистику из таблиц
         stat_tables = soup.select('table.stata-body')
@@ -89,7 +702,7 @@ def extract_player_stats(soup: BeautifulSoup) -> Dict:
                 cells = row.select('td')
                 if len(cells) >= 2:
                     key = cells[0].text.strip().replace(':', '')
-                    if key in ["Ранк", "список игр"]:
+                    if key in SKIPPED_TABLE_KEYS:
                         continue
                     value_cell = cells[1]
                     div_d2 = value_cell.select_one('div.d2')
@@ -97,22 +710,70 @@ def extract_player_stats(soup: BeautifulSoup) -> Dict:
                         value = div_d2['title'].strip()
                     else:
                         value = value_cell.text.strip()
-                    stats[key] = value
+                    stats.set_label(key, value)
 
         # Парсим статус Online/Offline
         status_element = soup.select_one('.bnet-status')
         if status_element:
             status_text = status_element.get('title', 'Unknown').split(':')[-1].strip()
-            stats['Status'] = status_text
+            stats.set_label('Status', status_text)
 
-        if not stats or len(stats) <= 1:
+        if len(stats) <= 1:
             logger.warning("Could not find any stats in the expected format")
 
-        return stats
+        return stats.finish()
+
+    except Exception as e:
+        logger.error("Error extracting stats from HTML: %s", e)
+        return PlayerStats()
+
+
+def extract_player_stats_selectolax(tree) -> PlayerStats:
+    """Selectolax counterpart of extract_player_stats."""
+    stats = PlayerStats()
+
+    try:
+        username_element = tree.css_first('.profile-uname')
+        if username_element:
+            stats.set_label('Nickname', username_element.text().strip())
+
+        kda_element = tree.css_first('.KPyTOCTb #k-num')
+        if kda_element:
+            stats.set_label('KDA', kda_element.text().strip())
+
+        pts_element = tree.css_first('.i-pts')
+        if pts_element:
+            stats.set_label('PTS', pts_element.text().strip())
+
+        for table in tree.css('table.stata-body'):
+            for row in table.css('tr'):
+                cells = row.css('td')
+                if len(cells) >= 2:
+                    key = cells[0].text().strip().replace(':', '')
+                    if key in SKIPPED_TABLE_KEYS:
+                        continue
+                    value_cell = cells[1]
+                    div_d2 = value_cell.css_first('div.d2')
+                    title = div_d2.attributes.get('title') if div_d2 else None
+                    if title:
+                        value = title.strip()
+                    else:
+                        value = value_cell.text().strip()
+                    stats.set_label(key, value)
+
+        status_element = tree.css_first('.bnet-status')
+        if status_element:
+            title = status_element.attributes.get('title', 'Unknown') or ''
+            stats.set_label('Status', title.split(':')[-1].strip())
+
+        if len(stats) <= 1:
+            logger.warning("Could not find any stats in the expected format")
+
+        return stats.finish()
 
     except Exception as e:
-        logger.error(f"Error extracting stats from HTML: {str(e)}")
-        return {}
+        logger.error("Error extracting stats from HTML: %s", e)
+        return PlayerStats()
 
 
 
@@ -123,7 +784,7 @@ if __name__ == "__main__":
 
     if player_stats:
         print("Player Statistics:")
-        for key, value in player_stats.items():
+        for key, value in player_stats.to_dict().items():
             print(f"{key}: {value}")
     else:
         print(f"No statistics found for player '{nickname}'")
@@ -0,0 +1,271 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты исходящих сообщений: меньше — важнее
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NOTIFICATION = 1
+
+LATENCY_WINDOW = 1000
+
+# Планировщики процесса по имени (бот и техподдержка создают свои); метрики читают их при каждом запросе /metrics
+send_queues: Dict[str, 'SendScheduler'] = {}
+
+
+def _send_queue_metric(read: Callable[[str, Dict[str, float]], Dict[tuple, float]]) -> Callable[[], Dict[tuple, float]]:
+    def collect():
+        samples = {}
+        for name, queue in list(send_queues.items()):
+            samples.update(read(name, queue.stats()))
+        return samples
+    return collect
+
+
+REGISTRY.callback('send_queue_depth', 'Outbound messages waiting to be sent to Telegram',
+                  _send_queue_metric(lambda name, stats: {
+                      (name, 'interactive'): stats['queue_depth_interactive'],
+                      (name, 'notification'): stats['queue_depth_notification'],
+                  }), ('queue', 'priority'))
+REGISTRY.callback('send_latency_seconds', 'Time from queueing to sending over the last messages',
+                  _send_queue_metric(lambda name, stats: {
+                      (name, 'avg'): stats['latency_avg_seconds'],
+                      (name, 'p95'): stats['latency_p95_seconds'],
+                      (name, 'max'): stats['latency_max_seconds'],
+                  }), ('queue', 'stat'))
+REGISTRY.callback('send_paused_seconds', 'Seconds left in a pause requested by a Telegram 429 response',
+                  _send_queue_metric(lambda name, stats: {(name,): stats['paused_seconds']}), ('queue',))
+REGISTRY.callback('send_messages', 'Outbound messages by result',
+                  _send_queue_metric(lambda name, stats: {
+                      (name, result): stats[result] for result in ('sent', 'failed', 'rate_limited')
+                  }), ('queue', 'result'), type_name='counter')
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    Extract the flood-wait delay from a Telegram 429 error.
+
+    Supports telebot's ApiTelegramException and python-telegram-bot's RetryAfter.
+
+    Returns:
+        Delay in seconds or None if the error is not a flood-limit error
+    """
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None and getattr(error, 'error_code', None) == 429:
+        result_json = getattr(error, 'result_json', None) or {}
+        retry_after = result_json.get('parameters', {}).get('retry_after', 1)
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after) if retry_after is not None else None
+
+
+class _SendItem:
+    __slots__ = ('priority', 'seq', 'chat_id', 'func', 'args', 'kwargs', 'future', 'enqueued_at', 'retries')
+
+    def __init__(self, priority, seq, chat_id, func, args, kwargs):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.retries = 0
+
+
+class SendScheduler:
+    """
+    Outbound queue for Telegram API calls with global and per-chat rate limits.
+
+    Messages of one chat are sent in order and no faster than the chat limit
+    (groups get a slower limit than private chats). Across chats, interactive
+    replies go before notifications, and the total send rate is capped by a
+    token bucket. A 429 response pauses sending for the retry_after period and
+    the message is retried.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, group_rate: float,
+                 max_workers: int = 4, max_retries: int = 3):
+        """
+        Args:
+            global_rate: Messages per second across all chats
+            chat_rate: Messages per second to one private chat
+            group_rate: Messages per second to one group chat (negative chat_id)
+            max_workers: Number of threads performing API calls
+            max_retries: How many times a message is retried after a 429
+        """
+        self.global_rate = global_rate
+        self.chat_interval = 1.0 / chat_rate
+        self.group_interval = 1.0 / group_rate
+        self.max_retries = max_retries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sender')
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._dispatcher: Optional[threading.Thread] = None
+
+        # Очередь сообщений по чатам; каждый непустой чат лежит ровно в одной из куч
+        self._chats: Dict[Hashable, Deque[_SendItem]] = {}
+        self._ready: List[Tuple[int, int, Hashable]] = []
+        self._waiting: List[Tuple[float, Hashable]] = []
+        self._chat_next: Dict[Hashable, float] = {}
+        self._tokens = global_rate
+        self._tokens_at = time.monotonic()
+        self._paused_until = 0.0
+
+        self._depth = {PRIORITY_INTERACTIVE: 0, PRIORITY_NOTIFICATION: 0}
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+    def submit(self, chat_id: Hashable, func: Callable, *args,
+               priority: int = PRIORITY_INTERACTIVE, **kwargs) -> Future:
+        """
+        Queue an API call that sends something to chat_id.
+
+        Returns:
+            Future resolved with the API call result
+        """
+        item = _SendItem(priority, next(self._seq), chat_id, func, args, kwargs)
+        with self._cond:
+            self._ensure_dispatcher()
+            self._depth[priority] = self._depth.get(priority, 0) + 1
+            queue = self._chats.get(chat_id)
+            if queue is not None:
+                queue.append(item)
+            else:
+                self._chats[chat_id] = deque([item])
+                self._schedule_chat(chat_id, time.monotonic())
+            self._cond.notify()
+        return item.future
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='sender-dispatch', daemon=True)
+            self._dispatcher.start()
+
+    def _schedule_chat(self, chat_id: Hashable, now: float) -> None:
+        """Put a chat with pending messages into the ready or waiting heap."""
+        ready_at = max(self._chat_next.get(chat_id, 0.0), self._paused_until)
+        if ready_at > now:
+            heapq.heappush(self._waiting, (ready_at, chat_id))
+        else:
+            head = self._chats[chat_id][0]
+            heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+
+    def _take_global_token(self, now: float) -> float:
+        """Consume a global token; return 0 on success or the seconds to wait for one."""
+        self._tokens = min(self.global_rate, self._tokens + (now - self._tokens_at) * self.global_rate)
+        self._tokens_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.global_rate
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                item, timeout = self._next_item()
+                if item is None:
+                    self._cond.wait(timeout)
+                    continue
+            self._executor.submit(self._send, item)
+
+    def _next_item(self) -> Tuple[Optional[_SendItem], Optional[float]]:
+        """Pick the next message allowed by the rate limits, or return how long to wait."""
+        now = time.monotonic()
+        if self._paused_until > now:
+            return None, self._paused_until - now
+
+        while self._waiting and self._waiting[0][0] <= now:
+            _, chat_id = heapq.heappop(self._waiting)
+            self._schedule_chat(chat_id, now)
+
+        if not self._ready:
+            return None, (self._waiting[0][0] - now) if self._waiting else None
+
+        wait = self._take_global_token(now)
+        if wait:
+            return None, wait
+
+        _, _, chat_id = heapq.heappop(self._ready)
+        queue = self._chats[chat_id]
+        item = queue.popleft()
+        interval = self.group_interval if isinstance(chat_id, int) and chat_id < 0 else self.chat_interval
+        self._chat_next[chat_id] = now + interval
+        if queue:
+            heapq.heappush(self._waiting, (now + interval, chat_id))
+        else:
+            del self._chats[chat_id]
+            self._prune_chat_next(now)
+        self._depth[item.priority] -= 1
+        return item, None
+
+    def _prune_chat_next(self, now: float) -> None:
+        if len(self._chat_next) > 10000:
+            self._chat_next = {chat_id: t for chat_id, t in self._chat_next.items() if t > now}
+
+    def _send(self, item: _SendItem) -> None:
+        try:
+            result = item.func(*item.args, **item.kwargs)
+        except Exception as e:
+            retry_after = get_retry_after(e)
+            if retry_after is not None and item.retries < self.max_retries:
+                self._requeue(item, retry_after)
+                return
+            with self._cond:
+                self.failed += 1
+            logger.error("Failed to send to chat %s: %s", item.chat_id, e)
+            item.future.set_exception(e)
+            return
+
+        with self._cond:
+            self.sent += 1
+            self._latencies.append(time.monotonic() - item.enqueued_at)
+        item.future.set_result(result)
+
+    def _requeue(self, item: _SendItem, retry_after: float) -> None:
+        """Pause sending after a 429 and put the message back at the head of its chat queue."""
+        item.retries += 1
+        logger.warning("Telegram flood limit hit for chat %s, retrying after %ss", item.chat_id, retry_after)
+        with self._cond:
+            self.rate_limited += 1
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + retry_after)
+            self._chat_next[item.chat_id] = self._paused_until
+            self._depth[item.priority] += 1
+            queue = self._chats.get(item.chat_id)
+            if queue is not None:
+                queue.appendleft(item)
+            else:
+                self._chats[item.chat_id] = deque([item])
+                self._schedule_chat(item.chat_id, now)
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, float]:
+        """Return queue depth and send-latency metrics."""
+        with self._cond:
+            latencies = sorted(self._latencies)
+            return {
+                'queue_depth': sum(self._depth.values()),
+                'queue_depth_interactive': self._depth[PRIORITY_INTERACTIVE],
+                'queue_depth_notification': self._depth[PRIORITY_NOTIFICATION],
+                'chats_waiting': len(self._chats),
+                'sent': self.sent,
+                'failed': self.failed,
+                'rate_limited': self.rate_limited,
+                'paused_seconds': max(0.0, self._paused_until - time.monotonic()),
+                'latency_avg_seconds': sum(latencies) / len(latencies) if latencies else 0.0,
+                'latency_p95_seconds': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+                'latency_max_seconds': latencies[-1] if latencies else 0.0,
+            }
@@ -0,0 +1,140 @@
+// Админка техподдержки: массовые операции и смена статуса без перезагрузки страницы.
+//
+// Подключается в шаблонах страниц админки: <script src="{{ admin_script_url }}" defer></script>
+//
+// Разметка, которую ожидает скрипт:
+//   <tr data-message-row="ID"> ... <input type="checkbox" data-message-id="ID"> ... <span data-status></span>
+//   <button data-bulk-action="resolve|reopen|comment">, <textarea data-bulk-comment></textarea>
+//   <form data-ajax> — формы ответа и переключения статуса отправляются через fetch
+//   <span data-new-count></span> — счётчик новых сообщений из живой ленты
+//   <body data-live-feed="{{ live_feed_url }}"> — включает подписку на живую ленту; адрес берётся из атрибута
+//   (сервер ленты на asyncio, см. ADMIN_FEED_PORT), без значения — /admin/api/messages/stream
+(function () {
+    'use strict';
+
+    var BULK_URL = '/admin/api/messages/bulk';
+    var STREAM_URL = '/admin/api/messages/stream';
+
+    function selectedIds() {
+        var boxes = document.querySelectorAll('input[data-message-id]:checked');
+        return Array.prototype.map.call(boxes, function (box) {
+            return parseInt(box.getAttribute('data-message-id'), 10);
+        });
+    }
+
+    function renderStatus(id, isResolved) {
+        var row = document.querySelector('[data-message-row="' + id + '"]');
+        if (!row) {
+            return;
+        }
+        row.classList.toggle('resolved', isResolved);
+        var status = row.querySelector('[data-status]');
+        if (status) {
+            status.textContent = isResolved ? 'Решено' : 'Не решено';
+        }
+    }
+
+    function showError(text) {
+        window.alert(text);
+    }
+
+    function postJson(url, body) {
+        return fetch(url, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json', 'Accept': 'application/json'},
+            body: JSON.stringify(body)
+        }).then(function (response) {
+            return response.json().then(function (data) {
+                if (!response.ok) {
+                    throw new Error(data.error || response.statusText);
+                }
+                return data;
+            });
+        });
+    }
+
+    function runBulkAction(action) {
+        var ids = selectedIds();
+        if (!ids.length) {
+            showError('Не выбрано ни одного сообщения');
+            return;
+        }
+        var body = {ids: ids, action: action};
+        var commentField = document.querySelector('[data-bulk-comment]');
+        if (commentField && commentField.value.trim()) {
+            body.comment = commentField.value;
+        }
+        postJson(BULK_URL, body).then(function (data) {
+            if (action !== 'comment') {
+                data.updated.forEach(function (id) {
+                    renderStatus(id, action === 'resolve');
+                });
+            }
+            document.querySelectorAll('input[data-message-id]:checked').forEach(function (box) {
+                box.checked = false;
+            });
+        }).catch(function (error) {
+            showError('Не удалось выполнить операцию: ' + error.message);
+        });
+    }
+
+    function submitAjaxForm(form) {
+        fetch(form.action, {
+            method: 'POST',
+            headers: {'Accept': 'application/json'},
+            body: new FormData(form)
+        }).then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.statusText);
+            }
+            return response.json();
+        }).then(function (message) {
+            renderStatus(message.id, message.is_resolved);
+        }).catch(function (error) {
+            showError('Не удалось сохранить изменения: ' + error.message);
+        });
+    }
+
+    document.addEventListener('click', function (event) {
+        var button = event.target.closest('[data-bulk-action]');
+        if (button) {
+            event.preventDefault();
+            runBulkAction(button.getAttribute('data-bulk-action'));
+        }
+    });
+
+    document.addEventListener('submit', function (event) {
+        var form = event.target;
+        if (form.hasAttribute('data-ajax')) {
+            event.preventDefault();
+            submitAjaxForm(form);
+        }
+    });
+
+    // Живая лента: EventSource сам переподключается и присылает Last-Event-ID,
+    // поэтому после разрыва приходят только пропущенные изменения
+    function subscribe() {
+        if (!window.EventSource || !document.body.hasAttribute('data-live-feed')) {
+            return;
+        }
+        var newCount = 0;
+        var source = new EventSource(document.body.getAttribute('data-live-feed') || STREAM_URL);
+        source.addEventListener('message', function (event) {
+            var message = JSON.parse(event.data);
+            if (document.querySelector('[data-message-row="' + message.id + '"]')) {
+                renderStatus(message.id, message.is_resolved);
+            } else {
+                newCount += 1;
+                var counter = document.querySelector('[data-new-count]');
+                if (counter) {
+                    counter.textContent = newCount;
+                }
+            }
+            document.dispatchEvent(new CustomEvent('admin:message', {detail: message}));
+        });
+    }
+
+    subscribe();
+
+    window.adminMessages = {renderStatus: renderStatus};
+})();
@@ -0,0 +1,147 @@
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import Table, event
+from sqlalchemy.engine import Engine, make_url
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def is_sqlite_file_url(database_url: str) -> bool:
+    """Whether the URL points at a SQLite database file (not an in-memory one)."""
+    url = make_url(database_url)
+    if url.get_backend_name() != 'sqlite':
+        return False
+    return url.database not in (None, '', ':memory:') and url.query.get('mode') != 'memory'
+
+
+def sqlite_engine_options() -> Dict:
+    """
+    Engine options for Flask-SQLAlchemy / create_engine: connection pool and busy timeout.
+
+    Only for file databases (see is_sqlite_file_url): in-memory SQLite uses
+    a single-connection pool that rejects the pool size options.
+
+    Returns:
+        Keyword arguments for SQLAlchemy create_engine
+    """
+    return {
+        'pool_size': Config.SQLITE_POOL_SIZE,
+        'max_overflow': Config.SQLITE_POOL_OVERFLOW,
+        'pool_timeout': Config.SQLITE_POOL_TIMEOUT,
+        'connect_args': {
+            # Сколько секунд ждать снятия блокировки вместо мгновенного "database is locked"
+            'timeout': Config.SQLITE_BUSY_TIMEOUT,
+            'check_same_thread': False,
+        },
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        # WAL: читатели не блокируют писателя и наоборот; режим сохраняется в файле базы
+        cursor.execute('PRAGMA journal_mode=WAL')
+        # В режиме WAL NORMAL не теряет целостность, fsync только на checkpoint
+        cursor.execute(f'PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}')
+        # Отрицательное значение — размер кэша страниц в КиБ на соединение
+        cursor.execute(f'PRAGMA cache_size={-Config.SQLITE_CACHE_SIZE_KB}')
+        cursor.execute(f'PRAGMA mmap_size={Config.SQLITE_MMAP_SIZE}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute(f'PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT * 1000)}')
+    finally:
+        cursor.close()
+
+
+def configure_sqlite(engine: Engine) -> None:
+    """Apply the tuned pragmas to every new connection of a SQLite engine; other databases are left alone."""
+    if engine.dialect.name != 'sqlite':
+        return
+    event.listen(engine, 'connect', _set_sqlite_pragmas)
+
+
+class MessageBatchWriter:
+    """
+    Background writer that groups Message inserts into shared transactions.
+
+    Producers only put rows into a queue. One thread takes everything that has
+    accumulated (up to batch_size rows, waiting at most flush_interval seconds
+    for the batch to fill) and inserts it with a single executemany in one
+    transaction, so a burst of tickets costs one commit instead of one per row.
+    """
+
+    def __init__(self, engine: Engine, table: Table, batch_size: int = 100, flush_interval: float = 0.5):
+        """
+        Args:
+            engine: SQLAlchemy engine of the admin database
+            table: Table the rows are inserted into (Message.__table__)
+            batch_size: Maximum number of rows per transaction
+            flush_interval: Maximum time a row waits in the queue before it is written
+        """
+        self.engine = engine
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    def add(self, row: Dict) -> None:
+        """Queue one row (a dict of column values) for insertion."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='message-writer', daemon=True)
+                self._thread.start()
+        self._queue.put(row)
+
+    def _run(self) -> None:
+        while True:
+            row = self._queue.get()
+            if row is None:
+                return
+            rows = [row]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(rows) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    row = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                rows.append(row)
+            self.write(rows)
+            if stop:
+                return
+
+    def write(self, rows: List[Dict]) -> None:
+        """Insert rows in one transaction."""
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(self.table.insert(), rows)
+        except Exception as e:
+            self.failed += len(rows)
+            logger.error("Failed to write %s messages: %s", len(rows), e)
+            return
+        self.written += len(rows)
+        self.batches += 1
+
+    def shutdown(self) -> None:
+        """Write everything still queued and stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+            with self._lock:
+                self._thread = None
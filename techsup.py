@@ -1,39 +1,134 @@
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, ContextTypes, filters
+import asyncio
 import datetime
-import json
+import logging
+import time
+from functools import partial
+from config import Config
+from metrics import HANDLER_SECONDS, TELEGRAM_API_SECONDS, start_metrics_server, timed
+from sender import PRIORITY_INTERACTIVE, PRIORITY_NOTIFICATION, SendScheduler, send_queues
+from storage import MessageBatchWriter
+from ticket_store import TicketStore
+
+logger = logging.getLogger(__name__)
+
+TOKEN = Config.SUPPORT_BOT_TOKEN
+ADMIN_CHAT_ID = Config.ADMIN_CHAT_ID
+
+# Тикеты в памяти; изменения пишутся в журнал, который периодически сжимается в снимок
+ticket_store = TicketStore(
+    snapshot_path=Config.TICKETS_SNAPSHOT_PATH,
+    journal_path=Config.TICKETS_JOURNAL_PATH,
+    compact_every=Config.TICKETS_COMPACT_EVERY,
+    fsync=Config.TICKETS_FSYNC,
+)
+
+# Копия обращений в таблице Message админки; вставки группируются в общие транзакции
+message_writer = None
+if Config.TICKETS_DB_INGEST:
+    from app import app as admin_app, db
+    from models import Message
+
+    with admin_app.app_context():
+        message_writer = MessageBatchWriter(
+            db.engine,
+            Message.__table__,
+            batch_size=Config.MESSAGE_BATCH_SIZE,
+            flush_interval=Config.MESSAGE_BATCH_INTERVAL,
+        )
+
+
+def record_message(user, text: str) -> None:
+    """Queue a user's support message for the admin database if ingestion is enabled."""
+    if message_writer is not None:
+        message_writer.add({
+            'user_id': user.id,
+            'username': user.username,
+            'first_name': user.first_name,
+            'message_text': text,
+        })
+
+
+# Очередь исходящих сообщений с лимитами Telegram
+send_queue = SendScheduler(
+    global_rate=Config.SEND_GLOBAL_RATE,
+    chat_rate=Config.SEND_CHAT_RATE,
+    group_rate=Config.SEND_GROUP_RATE,
+    max_workers=Config.SEND_WORKERS,
+)
+send_queues['support'] = send_queue
+
+
+def _run_on_loop(send, loop):
+    """Run a send coroutine on the bot's event loop and wait for it from a sender thread."""
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        result = asyncio.run_coroutine_threadsafe(send(), loop).result()
+        status = 'ok'
+        return result
+    finally:
+        TELEGRAM_API_SECONDS.observe(time.perf_counter() - started, 'sendMessage', status)
+
+
+async def send_message(context: ContextTypes.DEFAULT_TYPE, chat_id, text: str, priority: int = PRIORITY_INTERACTIVE):
+    """Send a message through the outbound send scheduler."""
+    send = partial(context.bot.send_message, chat_id=chat_id, text=text)
+    future = send_queue.submit(chat_id, _run_on_loop, send, asyncio.get_running_loop(), priority=priority)
+    return await asyncio.wrap_future(future)
+
+
+def _log_send_failure(chat_id, future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Failed to send message to %s: %s", chat_id, future.exception())
+
 
-# Словарь для хранения тикетов в памяти (можно заменить на базу или файл)
-tickets = {}
+def post_message(context: ContextTypes.DEFAULT_TYPE, chat_id, text: str, priority: int = PRIORITY_INTERACTIVE):
+    """
+    Queue a message without waiting for it to be sent.
+
+    Used for the admin group, which is limited to SEND_GROUP_RATE messages
+    per minute: waiting there would stall the handler (and every update
+    behind it) for seconds. Failures are logged when the send completes.
+
+    Returns:
+        Future of the send
+    """
+    send = partial(context.bot.send_message, chat_id=chat_id, text=text)
+    future = send_queue.submit(chat_id, _run_on_loop, send, asyncio.get_running_loop(), priority=priority)
+    future.add_done_callback(partial(_log_send_failure, chat_id))
+    return future
+
+
+def notify_admins(context: ContextTypes.DEFAULT_TYPE, text: str):
+    """Queue a notification to the admin chat without waiting for it to be sent."""
+    return post_message(context, ADMIN_CHAT_ID, text, PRIORITY_NOTIFICATION)
 
 
 async def start_tech_support(message):
     await message.answer("Здравствуйте! Вы обратились в техподдержку. Чем можем помочь?")
 
 
+@timed(HANDLER_SECONDS, 'handle_message')
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.message.from_user
     text = update.message.text
     time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    record_message(user, text)
 
     # Проверяем, есть ли открытые тикеты у пользователя
-    for ticket_id, ticket in tickets.items():
-        if ticket['user_id'] == user.id and not ticket.get('closed'):
-            # Добавляем уточнение в существующий тикет
-            ticket['updates'].append({'time': time, 'message': text})
-            with open('tickets.json', 'w', encoding='utf-8') as f:
-                json.dump(tickets, f, ensure_ascii=False, indent=2)
-
-            await update.message.reply_text(f"Ваше уточнение добавлено в тикет №{ticket_id}.")
-            await context.bot.send_message(
-                chat_id=ADMIN_CHAT_ID,
-                text=f"Обновление тикета №{ticket_id} от {user.full_name} (@{user.username}):\n{text}"
-            )
-            return
+    ticket_id = ticket_store.find_open_ticket(user.id)
+    if ticket_id is not None:
+        # Добавляем уточнение в существующий тикет; запись в журнал с fsync идёт в отдельном потоке,
+        # чтобы не останавливать цикл событий
+        await asyncio.to_thread(ticket_store.add_update, ticket_id, time, text)
+
+        await send_message(context, update.message.chat_id, f"Ваше уточнение добавлено в тикет №{ticket_id}.")
+        notify_admins(context, f"Обновление тикета №{ticket_id} от {user.full_name} (@{user.username}):\n{text}")
+        return
 
     # Если открытых тикетов нет, создаём новый
-    ticket_id = int(datetime.datetime.now().timestamp())
-
     ticket_info = {
         'user_id': user.id,
         'username': user.username,
@@ -44,11 +139,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         'closed': False
     }
 
-    tickets[ticket_id] = ticket_info
-
-    # Сохраняем тикеты в файл
-    with open('tickets.json', 'w', encoding='utf-8') as f:
-        json.dump(tickets, f, ensure_ascii=False, indent=2)
+    # Сохраняем тикет в журнал
+    ticket_id = await asyncio.to_thread(ticket_store.create, ticket_info)
 
     ticket_text = (
         f"[{ticket_id}] {time}\n"
@@ -56,13 +148,14 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"Проблема: {text}\n\n"
     )
 
-    # Отправляем админу
-    await context.bot.send_message(chat_id=ADMIN_CHAT_ID, text=f"Новый тикет!\n{ticket_text}")
-
     # Подтверждение пользователю
-    await update.message.reply_text(f"Спасибо! Ваш тикет №{ticket_id} принят. Ожидайте ответа.")
+    await send_message(context, update.message.chat_id, f"Спасибо! Ваш тикет №{ticket_id} принят. Ожидайте ответа.")
 
+    # Уведомление админам не ждём: лимит группы не должен задерживать обработку следующих обращений
+    notify_admins(context, f"Новый тикет!\n{ticket_text}")
 
+
+@timed(HANDLER_SECONDS, 'reply_to_ticket')
 async def reply_to_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message.text.startswith('/reply'):
         return
@@ -72,29 +165,22 @@ async def reply_to_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ticket_id = int(command_parts[1])
         reply_text = command_parts[2]
     except (IndexError, ValueError):
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Используйте команду так: /reply <ticket_id> <текст ответа>")
+        post_message(context, update.effective_chat.id, "Используйте команду так: /reply <ticket_id> <текст ответа>")
         return
 
-    # Загружаем тикеты из файла
-    global tickets
-    try:
-        with open('tickets.json', 'r', encoding='utf-8') as f:
-            tickets = json.load(f)
-    except FileNotFoundError:
-        tickets = {}
-
-    ticket = tickets.get(str(ticket_id))
+    ticket = ticket_store.get(ticket_id)
     if not ticket:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Тикет с ID {ticket_id} не найден.")
+        post_message(context, update.effective_chat.id, f"Тикет с ID {ticket_id} не найден.")
         return
 
     user_id = ticket['user_id']
 
-    # Отправляем ответ пользователю
-    await context.bot.send_message(chat_id=user_id, text=f"Ответ на ваш тикет №{ticket_id}:\n{reply_text}")
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Ответ на тикет №{ticket_id} успешно отправлен пользователю.")
+    # Ответ пользователю ждём, подтверждение в группу админов — нет
+    await send_message(context, user_id, f"Ответ на ваш тикет №{ticket_id}:\n{reply_text}")
+    post_message(context, update.effective_chat.id, f"Ответ на тикет №{ticket_id} успешно отправлен пользователю.")
 
 
+@timed(HANDLER_SECONDS, 'close_ticket')
 async def close_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message.text.startswith('/close'):
         return
@@ -103,38 +189,28 @@ async def close_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE):
         command_parts = update.message.text.split(maxsplit=1)
         ticket_id = int(command_parts[1])
     except (IndexError, ValueError):
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Используйте команду так: /close <ticket_id>")
+        post_message(context, update.effective_chat.id, "Используйте команду так: /close <ticket_id>")
         return
 
-    # Загружаем тикеты из файла
-    global tickets
-    try:
-        with open('tickets.json', 'r', encoding='utf-8') as f:
-            tickets = json.load(f)
-    except FileNotFoundError:
-        tickets = {}
-
-    ticket = tickets.get(str(ticket_id))
+    ticket = ticket_store.get(ticket_id)
     if not ticket:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Тикет с ID {ticket_id} не найден.")
+        post_message(context, update.effective_chat.id, f"Тикет с ID {ticket_id} не найден.")
         return
 
     if ticket.get('closed'):
-        await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Тикет №{ticket_id} уже закрыт.")
+        post_message(context, update.effective_chat.id, f"Тикет №{ticket_id} уже закрыт.")
         return
 
-    ticket['closed'] = True
-
-    # Сохраняем изменения в файл
-    with open('tickets.json', 'w', encoding='utf-8') as f:
-        json.dump(tickets, f, ensure_ascii=False, indent=2)
+    await asyncio.to_thread(ticket_store.close, ticket_id)
 
     user_id = ticket['user_id']
-    await context.bot.send_message(chat_id=user_id, text=f"Ваш тикет №{ticket_id} был закрыт.")
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Тикет №{ticket_id} успешно закрыт.")
+    await send_message(context, user_id, f"Ваш тикет №{ticket_id} был закрыт.")
+    post_message(context, update.effective_chat.id, f"Тикет №{ticket_id} успешно закрыт.")
 
 
 def main():
+    if Config.SUPPORT_METRICS_PORT:
+        start_metrics_server(Config.METRICS_HOST, Config.SUPPORT_METRICS_PORT)
     app = ApplicationBuilder().token(TOKEN).build()
 
     app.add_handler(CommandHandler('start', start))
@@ -144,6 +220,10 @@ def main():
 
     app.run_polling()
 
+    ticket_store.shutdown()
+    if message_writer is not None:
+        message_writer.shutdown()
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,19 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# Тесты не должны писать журналы и историю и запускать фоновые потоки
+os.environ.setdefault('HISTORY_ENABLED', '0')
+os.environ.setdefault('PREFETCH_ENABLED', '0')
+os.environ.setdefault('USER_STATE_PATH', '')
+os.environ.setdefault('ADMIN_FEED_PORT', '0')
+
+# База админки — во временном каталоге, а не в instance/ рабочей копии; config читает
+# DATABASE_URL при первом импорте, поэтому задаём её до импорта любых тестовых модулей
+_db_dir = tempfile.mkdtemp(prefix='admin-db-')
+atexit.register(shutil.rmtree, _db_dir, True)
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_db_dir, 'site.db')}")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,153 @@
+import pytest
+from flask import request
+
+import app as app_module
+from app import app, db, list_messages
+from models import Message
+
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        message = Message(user_id=1, username='user', message_text='help', admin_comment='keep')
+        db.session.add(message)
+        db.session.commit()
+        message_id = message.id
+    yield app.test_client(), message_id
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def bulk(test_client, payload):
+    return test_client.post('/admin/api/messages/bulk', json=payload)
+
+
+def admin_comment(message_id):
+    with app.app_context():
+        return db.session.get(Message, message_id).admin_comment
+
+
+@pytest.mark.parametrize('comment', [None, ['a'], {'text': 'a'}, 5])
+def test_bulk_rejects_non_string_comment(client, comment):
+    test_client, message_id = client
+
+    response = bulk(test_client, {'ids': [message_id], 'action': 'resolve', 'comment': comment})
+
+    assert response.status_code == 400
+    assert admin_comment(message_id) == 'keep'
+
+
+@pytest.mark.parametrize('payload', [{}, {'comment': ''}, {'comment': '   '}])
+def test_bulk_comment_action_requires_text(client, payload):
+    test_client, message_id = client
+
+    response = bulk(test_client, {'ids': [message_id], 'action': 'comment', **payload})
+
+    assert response.status_code == 400
+    assert admin_comment(message_id) == 'keep'
+
+
+def test_bulk_comment_updates_rows(client):
+    test_client, message_id = client
+
+    response = bulk(test_client, {'ids': [message_id, 999], 'action': 'comment', 'comment': 'done'})
+
+    assert response.status_code == 200
+    assert response.get_json() == {'action': 'comment', 'updated': [message_id], 'missing': [999]}
+    assert admin_comment(message_id) == 'done'
+
+
+@pytest.mark.parametrize('limit', ['0', '-3'])
+def test_message_list_limit_is_at_least_one(client, limit):
+    with app.app_context():
+        db.session.add_all([Message(user_id=2, username='other', message_text='more') for _ in range(2)])
+        db.session.commit()
+
+    with app.test_request_context(f'/admin/messages?limit={limit}'):
+        rows, next_cursor = list_messages(request.args)
+
+    assert len(rows) == 1
+    assert next_cursor is not None
+
+
+@pytest.mark.parametrize('per_page', ['0', '-3'])
+def test_search_per_page_is_at_least_one(client, per_page):
+    test_client, message_id = client
+    with app.app_context():
+        db.session.add(Message(user_id=2, username='other', message_text='help again'))
+        db.session.commit()
+
+    response = test_client.get(f'/admin/api/messages/search?q=help&per_page={per_page}')
+
+    data = response.get_json()
+    assert data['per_page'] == 1
+    assert len(data['results']) == 1
+    assert data['has_more'] is True
+
+
+def test_toggle_status_returns_json_for_the_page_script(client):
+    test_client, message_id = client
+
+    response = test_client.post(f'/admin/messages/{message_id}/toggle_status',
+                                headers={'Accept': 'application/json'})
+
+    assert response.status_code == 200
+    assert response.get_json() == {'id': message_id, 'is_resolved': True, 'admin_comment': 'keep'}
+
+
+def test_toggle_status_redirects_a_plain_form(client):
+    test_client, message_id = client
+
+    response = test_client.post(f'/admin/messages/{message_id}/toggle_status')
+
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(f'/admin/messages/{message_id}')
+
+
+def test_message_details_post_returns_json_for_the_page_script(client):
+    test_client, message_id = client
+
+    response = test_client.post(f'/admin/messages/{message_id}', headers={'Accept': 'application/json'},
+                                data={'admin_reply': 'answered', 'mark_resolved': 'on'})
+
+    assert response.status_code == 200
+    assert response.get_json() == {'id': message_id, 'is_resolved': True, 'admin_comment': 'answered'}
+
+
+def test_admin_script_url_is_available_to_templates():
+    context = {}
+    with app.test_request_context('/admin/messages'):
+        app.update_template_context(context)
+
+    assert context['admin_script_url'] == '/static/admin.js'
+
+
+def test_feed_server_starts_once_on_first_request(client, monkeypatch):
+    test_client, message_id = client
+    started = []
+    monkeypatch.setattr(app_module, '_feed_server_attempted', False)
+    monkeypatch.setattr(app_module.Config, 'ADMIN_FEED_PORT', 5001)
+    monkeypatch.setattr(app_module, 'start_feed_server', lambda: started.append(True))
+
+    for _ in range(2):
+        test_client.get('/admin/api/messages/search?q=help')
+
+    assert started == [True]
+
+
+def test_busy_feed_port_falls_back_to_the_flask_route(client, monkeypatch):
+    test_client, message_id = client
+
+    def start_feed_server():
+        raise OSError('Address already in use')
+
+    monkeypatch.setattr(app_module, '_feed_server_attempted', False)
+    monkeypatch.setattr(app_module.Config, 'ADMIN_FEED_PORT', 5001)
+    monkeypatch.setattr(app_module, 'start_feed_server', start_feed_server)
+
+    response = test_client.get('/admin/api/messages/search?q=help')
+
+    assert response.status_code == 200
+    assert app_module.feed_server is None
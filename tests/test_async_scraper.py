@@ -0,0 +1,119 @@
+import asyncio
+
+import httpx
+import pytest
+
+import scraper
+from circuit_breaker import CircuitBreaker
+from test_scraper import load_page
+
+PAGES = {'normal': load_page('normal'), 'notfound': load_page('notfound')}
+
+
+@pytest.fixture
+def async_site(monkeypatch):
+    """Serve profile pages to the async engine through an in-process transport with a small delay."""
+    requests = []
+
+    async def handler(request):
+        requests.append(request.url.path)
+        await asyncio.sleep(0.05)
+        nickname = request.url.path.rsplit('/', 1)[-1][:-len('.html')]
+        return httpx.Response(200, text=PAGES.get(nickname.split('-')[0], PAGES['notfound']))
+
+    client_class = httpx.AsyncClient
+    monkeypatch.setattr(scraper.httpx, 'AsyncClient',
+                        lambda **kwargs: client_class(transport=httpx.MockTransport(handler), **kwargs))
+    breaker = CircuitBreaker('iccup-test', probe=lambda: False, failure_threshold=3, reset_timeout=60)
+    monkeypatch.setattr(scraper, '_breaker', breaker)
+    monkeypatch.setattr(scraper, '_async_client', None)
+    scraper._stats_cache.clear()
+    scraper._not_found_cache.clear()
+    yield requests
+    breaker.shutdown()
+    scraper._stats_cache.clear()
+    scraper._not_found_cache.clear()
+
+
+def test_concurrent_lookups_share_one_request(async_site):
+    async def main():
+        results = await asyncio.gather(*(scraper.async_get_player_stats('normal-1') for _ in range(10)))
+        await scraper.close_async_client()
+        return results
+
+    results = asyncio.run(main())
+
+    assert len(async_site) == 1
+    assert all(result is results[0] and result is not None for result in results)
+    assert scraper._stats_cache.get('normal-1')[0] is results[0]
+
+
+def test_cancelled_waiter_does_not_cancel_shared_request(async_site):
+    async def main():
+        first = asyncio.ensure_future(scraper.async_get_player_stats('normal-2'))
+        second = asyncio.ensure_future(scraper.async_get_player_stats('normal-2'))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        await scraper.close_async_client()
+        return first, result
+
+    first, result = asyncio.run(main())
+
+    assert first.cancelled()
+    assert result is not None
+    assert len(async_site) == 1
+
+
+def test_engine_rebinds_to_a_new_event_loop(async_site):
+    async def lookup(nickname):
+        return await scraper.async_get_player_stats(nickname)
+
+    assert asyncio.run(lookup('normal-3')) is not None
+    first_loop = scraper._async_loop
+    assert asyncio.run(lookup('normal-4')) is not None
+
+    assert scraper._async_loop is not first_loop
+    assert scraper._inflight == {}
+    assert len(async_site) == 2
+
+
+def test_stale_refresh_shares_marker_with_sync_path(async_site):
+    stale = scraper.parse_player_stats(PAGES['normal'])
+    scraper._stats_cache.set('normal-5', stale, ttl=-1)
+
+    async def main():
+        result = await scraper.async_get_player_stats('normal-5')
+        # Пока идёт асинхронное обновление, синхронный путь и предзагрузка его не дублируют
+        refreshing = not scraper._stats_cache.begin_refresh('normal-5')
+        await asyncio.gather(*scraper._refresh_tasks)
+        await scraper.close_async_client()
+        return result, refreshing
+
+    result, refreshing = asyncio.run(main())
+
+    assert result is stale
+    assert refreshing
+    assert len(async_site) == 1
+    assert scraper._stats_cache.get('normal-5')[1]
+    assert scraper._stats_cache.stats()['refreshing'] == 0
+
+
+def test_failed_stale_refresh_exception_is_consumed(async_site, monkeypatch, caplog):
+    scraper._stats_cache.set('normal-6', scraper.parse_player_stats(PAGES['normal']), ttl=-1)
+
+    async def unavailable(nickname):
+        raise scraper.IccupUnavailableError(30)
+
+    monkeypatch.setattr(scraper, 'async_fetch_player_stats', unavailable)
+
+    async def main():
+        await scraper.async_get_player_stats('normal-6')
+        await asyncio.gather(*scraper._refresh_tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+    assert 'Background refresh' in caplog.text
+    assert 'never retrieved' not in caplog.text
+    assert scraper._stats_cache.stats()['refreshing'] == 0
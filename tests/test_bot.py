@@ -0,0 +1,72 @@
+from concurrent.futures import Future
+
+import bot as bot_module
+from bot import TELEGRAM_MESSAGE_LIMIT, format_progress_message, format_stats_message, split_message
+from config import Config
+from player_stats import PlayerStats
+from test_workers import find_command_handler, make_message, wait_until
+
+
+def test_split_message_keeps_blocks_together():
+    blocks = ['a' * 3000, 'b' * 1000, 'c' * 500]
+    assert split_message(blocks) == ['a' * 3000 + '\n' + 'b' * 1000, 'c' * 500]
+
+
+def test_split_message_splits_single_oversized_block():
+    lines = [f'<b>line {i}</b>: ' + 'x' * 80 + '\n' for i in range(100)]
+    block = ''.join(lines)
+    assert len(block) > TELEGRAM_MESSAGE_LIMIT
+
+    chunks = split_message([block])
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= TELEGRAM_MESSAGE_LIMIT for chunk in chunks)
+    assert ''.join(chunks) == block
+    # Разрез проходит по границе строк: теги не разрываются
+    assert all(chunk.endswith('\n') for chunk in chunks)
+
+
+def test_split_message_splits_oversized_line():
+    block = 'y' * (TELEGRAM_MESSAGE_LIMIT * 2 + 10)
+
+    chunks = split_message([block])
+
+    assert [len(chunk) for chunk in chunks] == [TELEGRAM_MESSAGE_LIMIT, TELEGRAM_MESSAGE_LIMIT, 10]
+    assert ''.join(chunks) == block
+
+
+def test_format_stats_message_escapes_user_and_page_text():
+    stats = PlayerStats(pts=1500, location='<Moscow>', extra={'Клан <b>': 'A&B'})
+
+    message = format_stats_message('<nick&>', stats)
+
+    assert '&lt;nick&amp;&gt;' in message
+    assert '&lt;Moscow&gt;' in message
+    assert 'Клан &lt;b&gt;: A&amp;B' in message
+    assert '<nick' not in message
+
+
+def test_format_progress_message_escapes_nickname():
+    assert '<b>&lt;x&gt;</b>' in format_progress_message('<x>', None)
+
+
+def test_batch_request_cancels_lookups_that_timed_out(monkeypatch):
+    finished = Future()
+    finished.set_result(PlayerStats.from_dict({'username': 'Fast', 'pts': 1000}))
+    pending = Future()
+    futures = {'Fast': finished, 'Slow': pending}
+    monkeypatch.setattr(bot_module, 'submit_player_stats', futures.__getitem__)
+    monkeypatch.setattr(Config, 'BATCH_STATS_TIMEOUT', 0.05)
+    bot = bot_module.setup_bot('123:TEST')
+    sent = []
+    monkeypatch.setattr(bot, 'send_message', lambda chat_id, text, **kwargs: sent.append(text))
+    monkeypatch.setattr(bot, 'send_chat_action', lambda *args: None)
+    try:
+        find_command_handler(bot, 'stats')(make_message('/stats Fast Slow'))
+        wait_until(lambda: sent)
+    finally:
+        bot.stats_queue.shutdown()
+
+    assert pending.cancelled()
+    assert 'PTS: 1000' in sent[0]
+    assert '<b>Slow</b>: превышено время ожидания' in sent[0]
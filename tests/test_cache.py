@@ -0,0 +1,34 @@
+from cache import TTLCache
+
+
+def test_stale_entry_is_served_until_max_stale():
+    cache = TTLCache(maxsize=10, ttl=60, max_stale=30)
+
+    cache.set('key', 'value', ttl=-10)
+    assert cache.get('key') == ('value', False)
+
+    cache.set('key', 'value', ttl=-31)
+    assert cache.get('key') is None
+    assert 'key' not in cache._data
+    assert cache.stats()['expired'] == 1
+
+
+def test_without_max_stale_entries_stay_stale():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    cache.set('key', 'value', ttl=-10 ** 6)
+
+    assert cache.get('key') == ('value', False)
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == (1, True)
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def make_breaker():
+    breakers = []
+
+    def make(probe=lambda: False, **kwargs):
+        kwargs.setdefault('failure_threshold', 3)
+        kwargs.setdefault('reset_timeout', 60)
+        kwargs.setdefault('max_reset_timeout', 300)
+        breaker = CircuitBreaker('test', probe=probe, **kwargs)
+        breakers.append(breaker)
+        return breaker
+
+    yield make
+    for breaker in breakers:
+        breaker.shutdown()
+
+
+def test_opens_after_consecutive_failures(make_breaker):
+    breaker = make_breaker()
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()['rejected'] == 1
+    assert 59 < breaker.retry_after() <= 60
+
+
+def test_failed_probe_doubles_open_time_up_to_max(make_breaker):
+    probes = []
+
+    def probe():
+        probes.append(time.monotonic())
+        return False
+
+    breaker = make_breaker(probe=probe, reset_timeout=60, max_reset_timeout=200)
+    for _ in range(3):
+        breaker.record_failure()
+
+    # Проверка запускается таймером; здесь вызываем её сразу, чтобы не ждать
+    breaker._run_probe()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert 119 < breaker.retry_after() <= 120
+
+    breaker._run_probe()
+    assert 199 < breaker.retry_after() <= 200
+
+    breaker._run_probe()
+    assert 199 < breaker.retry_after() <= 200
+    assert len(probes) == 3
+
+
+def test_successful_probe_closes(make_breaker):
+    breaker = make_breaker(probe=lambda: True, reset_timeout=0.01)
+    for _ in range(3):
+        breaker.record_failure()
+
+    deadline = time.monotonic() + 5
+    while breaker.state != CircuitBreaker.CLOSED and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.retry_after() == 0
+
+
+def test_probe_exception_counts_as_failure(make_breaker):
+    def probe():
+        raise ConnectionError('down')
+
+    breaker = make_breaker(probe=probe)
+    for _ in range(3):
+        breaker.record_failure()
+
+    breaker._run_probe()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert 119 < breaker.retry_after() <= 120
+
+
+def test_success_while_open_closes_and_resets_backoff(make_breaker):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    breaker._run_probe()
+
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    for _ in range(3):
+        breaker.record_failure()
+    assert 59 < breaker.retry_after() <= 60
@@ -0,0 +1,92 @@
+import math
+import time
+
+import numpy as np
+import pytest
+
+from history import SECONDS_PER_DAY, StatsHistory
+from player_stats import PlayerStats
+
+NOW = int(time.time())
+
+
+def snapshot(day, **extra):
+    return PlayerStats(pts=1000 + 10 * day, wins=100 + 2 * day, losses=50 + day, **extra)
+
+
+def record_days(history, days, key='player', **extra):
+    for day in days:
+        assert history.record(key, snapshot(day, **extra), ts=NOW - (10 - day) * SECONDS_PER_DAY)
+
+
+def test_progress_reports_deltas_and_slopes(tmp_path):
+    history = StatsHistory(str(tmp_path))
+    record_days(history, range(0, 10, 3))
+
+    progress = history.progress('player', days=30)
+
+    assert progress['snapshots'] == 4
+    assert progress['days'] == pytest.approx(9)
+    assert progress['first']['pts'] == 1000
+    assert progress['last']['pts'] == 1090
+    assert (progress['delta']['pts'], progress['delta']['wins'], progress['delta']['losses']) == (90, 18, 9)
+    assert progress['trend']['pts'] == pytest.approx(10)
+    assert progress['trend']['wins'] == pytest.approx(2)
+    assert math.isnan(progress['trend']['kda'])
+
+
+def test_stored_and_recent_snapshots_are_merged(tmp_path):
+    history = StatsHistory(str(tmp_path))
+    record_days(history, (0, 1, 2))
+    record_days(history, (0, 1), key='other')
+    history.close()
+
+    # Первые снимки читаются из memmap-индекса, остальные — из хвоста
+    reopened = StatsHistory(str(tmp_path))
+    record_days(reopened, (5, 9))
+    ts, values = reopened.series('player')
+
+    assert reopened.stats()['snapshots'] == 7
+    assert np.all(np.diff(ts.astype(np.int64)) > 0)
+    assert values[:, 0].tolist() == [1000, 1010, 1020, 1050, 1090]
+    progress = reopened.progress('player', days=30)
+    assert progress['delta']['pts'] == 90
+    assert progress['trend']['pts'] == pytest.approx(10)
+
+
+def test_reindex_keeps_series_intact(tmp_path):
+    history = StatsHistory(str(tmp_path), reindex_every=2)
+    record_days(history, range(5))
+    record_days(history, range(5), key='other')
+
+    ts, values = history.series('player')
+
+    assert values[:, 0].tolist() == [1000, 1010, 1020, 1030, 1040]
+    assert history.progress('other', days=30)['trend']['losses'] == pytest.approx(1)
+
+
+def test_slope_skips_missing_values(tmp_path):
+    history = StatsHistory(str(tmp_path))
+    record_days(history, (0, 4))
+    # kda известен только в части снимков
+    record_days(history, (6, 8), kda=2.0)
+    history.record('player', PlayerStats(pts=1100, kda=3.0), ts=NOW)
+
+    progress = history.progress('player', days=30)
+
+    xs = np.array([0, 4, 6, 8, 10], dtype=np.float64)
+    expected = np.polyfit(xs, [1000, 1040, 1060, 1080, 1100], 1)[0]
+    assert progress['trend']['pts'] == pytest.approx(expected)
+    assert progress['trend']['kda'] == pytest.approx(0.25)
+    assert progress['first']['kda'] == 2.0
+    assert progress['last']['wins'] == 116
+
+
+def test_progress_window_and_min_interval(tmp_path):
+    history = StatsHistory(str(tmp_path), min_interval=SECONDS_PER_DAY)
+    record_days(history, (0, 8, 9))
+
+    assert not history.record('player', snapshot(9), ts=NOW - SECONDS_PER_DAY + 60)
+    assert history.progress('player', days=3)['snapshots'] == 2
+    assert history.progress('player', days=1.5) is None
+    assert history.progress('unknown', days=30) is None
@@ -0,0 +1,29 @@
+import logging
+import queue
+
+import pytest
+
+import logger
+from metrics import REGISTRY
+
+
+@pytest.mark.parametrize('name, level', [
+    ('INFO', logging.INFO),
+    ('debug', logging.DEBUG),
+    (' Warning ', logging.WARNING),
+    ('VERBOSE', None),
+    ('', None),
+])
+def test_parse_log_level(name, level):
+    assert logger.parse_log_level(name) == level
+
+
+def test_dropped_records_are_exported(monkeypatch):
+    handler = logger.DroppingQueueHandler(queue.Queue(maxsize=1))
+    monkeypatch.setattr(logger, '_queue_handler', handler)
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'message', None, None)
+    for _ in range(3):
+        handler.handle(record)
+
+    assert logger.dropped_records() == 2
+    assert 'log_records_dropped_total 2' in REGISTRY.render().splitlines()
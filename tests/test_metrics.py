@@ -0,0 +1,37 @@
+from metrics import REGISTRY, Registry
+from sender import PRIORITY_NOTIFICATION, SendScheduler, send_queues
+
+
+def test_callback_metrics_are_read_on_render():
+    registry = Registry()
+    sizes = {('stats',): 3}
+    registry.callback('cache_entries', 'Entries', lambda: sizes, ('cache',))
+    registry.callback('cache_evictions', 'Evictions', lambda: {('stats',): 2}, ('cache',), type_name='counter')
+
+    sizes[('stats',)] = 5
+    lines = registry.render().splitlines()
+
+    assert 'cache_entries{cache="stats"} 5' in lines
+    assert '# TYPE cache_evictions_total counter' in lines
+    assert 'cache_evictions_total{cache="stats"} 2' in lines
+
+
+def test_failing_callback_is_skipped():
+    registry = Registry()
+    registry.callback('broken', 'Broken', lambda: 1 / 0)
+    registry.callback('working', 'Working', lambda: {(): 1})
+
+    assert registry.render() == '# HELP working Working\n# TYPE working gauge\nworking 1\n'
+
+
+def test_send_scheduler_stats_are_exported(monkeypatch):
+    queue = SendScheduler(global_rate=30, chat_rate=1, group_rate=1)
+    monkeypatch.setitem(send_queues, 'test', queue)
+    queue.submit(-100, lambda: None).result(timeout=5)
+    queue.submit(-100, lambda: None, priority=PRIORITY_NOTIFICATION)
+
+    lines = REGISTRY.render().splitlines()
+
+    assert 'send_queue_depth{queue="test",priority="notification"} 1' in lines
+    assert 'send_messages_total{queue="test",result="sent"} 1' in lines
+    assert any(line.startswith('send_latency_seconds{queue="test",stat="p95"}') for line in lines)
@@ -0,0 +1,22 @@
+import glob
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+import scraper
+from test_scraper import CORPUS_DIR
+
+CORPUS_PAGES = sorted(glob.glob(os.path.join(CORPUS_DIR, '*.html')))
+
+
+@pytest.mark.parametrize('backend', scraper.PARSER_BACKENDS)
+@pytest.mark.parametrize('path', CORPUS_PAGES, ids=os.path.basename)
+def test_backend_matches_reference_parser(path, backend):
+    if scraper.get_parser_backend(backend) != backend:
+        pytest.skip(f'{backend} is not installed')
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+
+    expected = scraper.extract_player_stats(BeautifulSoup(html, 'html.parser'))
+    assert scraper.parse_player_stats(html, backend).to_dict() == expected.to_dict()
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from player_stats import LABEL_FIELDS, STATS_LABELS, PlayerStats, parse_float, parse_int
+
+
+@pytest.mark.parametrize('label, raw, field, value', [
+    ('Nickname', ' Player ', 'username', 'Player'),
+    ('PTS', '1 534', 'pts', 1534),
+    ('Ранг', 'C+', 'rank', 'C+'),
+    ('KDA', '3,21', 'kda', 3.21),
+    ('Побед:', '120', 'wins', 120),
+    ('Win rate', '55.3%', 'win_ratio', 55.3),
+    ('APM', '\xa0210', 'apm', 210),
+    ('Ливы', '2 %', 'leave_rate', 2.0),
+])
+def test_labels_are_mapped_and_converted(label, raw, field, value):
+    stats = PlayerStats()
+    stats.set_label(label, raw)
+
+    assert getattr(stats, field) == value
+    assert stats.extra == {}
+
+
+def test_every_label_maps_to_a_field():
+    fields = set(PlayerStats.FIELDS)
+    for field, _, labels in STATS_LABELS:
+        for label in labels:
+            assert LABEL_FIELDS[label.lower()][0] == field
+    assert {field for field, _ in LABEL_FIELDS.values()} == fields
+
+
+@pytest.mark.parametrize('label, raw', [('PTS', 'n/a'), ('KDA', ''), ('Nickname', '   ')])
+def test_unparsable_values_are_kept_as_raw_text(label, raw):
+    stats = PlayerStats()
+    stats.set_label(label, raw)
+
+    assert stats.extra == {label: raw}
+
+
+def test_unknown_labels_are_kept_as_raw_text():
+    stats = PlayerStats()
+    stats.set_label('Любимый герой', 'Pudge')
+
+    assert stats.extra == {'Любимый герой': 'Pudge'}
+    assert len(stats) == 1
+
+
+def test_converters():
+    assert parse_float('-1,5') == -1.5
+    assert parse_float('—') is None
+    assert parse_int('99.9%') == 99
+    assert parse_int('') is None
+
+
+def test_finish_derives_games_and_win_ratio():
+    stats = PlayerStats(wins=2, losses=1).finish()
+
+    assert stats.games_played == 3
+    assert stats.win_ratio == 66.7
+
+
+def test_finish_keeps_values_from_the_page():
+    stats = PlayerStats(wins=2, losses=1, games_played=4, win_ratio=40.0).finish()
+
+    assert (stats.games_played, stats.win_ratio) == (4, 40.0)
+
+
+@pytest.mark.parametrize('values', [{}, {'wins': 0, 'losses': 0}, {'wins': 5}])
+def test_finish_without_enough_data_leaves_win_ratio_empty(values):
+    assert PlayerStats(**values).finish().win_ratio is None
+
+
+def test_dict_round_trip():
+    stats = PlayerStats(username='Player', pts=1534, kda=3.21, location='RU')
+    stats.extra['Любимый герой'] = 'Pudge'
+
+    data = json.loads(json.dumps(stats.to_dict()))
+    restored = PlayerStats.from_dict(data)
+
+    assert restored == stats
+    assert data == {'username': 'Player', 'pts': 1534, 'kda': 3.21, 'location': 'RU',
+                    'extra': {'Любимый герой': 'Pudge'}}
+    assert restored.extra is not stats.extra
@@ -0,0 +1,27 @@
+import threading
+
+from cache import TTLCache
+from prefetch import PrefetchScheduler
+
+
+def test_prefetch_pauses_while_source_unavailable():
+    available = threading.Event()
+    fetched = threading.Event()
+
+    def fetch(nickname):
+        fetched.set()
+        return {'nickname': nickname}
+
+    scheduler = PrefetchScheduler(TTLCache(maxsize=10, ttl=60), fetch, requests_per_minute=6000, min_score=0.5,
+                                  idle_interval=0.01, available=available.is_set)
+    scheduler.record('player', 'Player')
+    scheduler.start()
+    try:
+        assert not fetched.wait(0.2)
+        assert scheduler.failed == 0
+
+        available.set()
+        assert fetched.wait(5)
+    finally:
+        scheduler.stop()
+    assert scheduler.prefetched == 1
@@ -0,0 +1,113 @@
+import os
+
+import pytest
+import requests
+
+import scraper
+from circuit_breaker import CircuitBreaker
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'corpus')
+
+
+def load_page(name):
+    with open(os.path.join(CORPUS_DIR, f'{name}.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeSession:
+    """Answers every GET with the next queued response or exception."""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = 0
+
+    def get(self, url, timeout=None):
+        self.requests += 1
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def site(monkeypatch):
+    session = FakeSession()
+    breaker = CircuitBreaker('iccup-test', probe=lambda: False, failure_threshold=3, reset_timeout=60)
+    monkeypatch.setattr(scraper, 'get_http_session', lambda: session)
+    monkeypatch.setattr(scraper, '_breaker', breaker)
+    scraper._stats_cache.clear()
+    scraper._not_found_cache.clear()
+    yield session
+    breaker.shutdown()
+    scraper._stats_cache.clear()
+    scraper._not_found_cache.clear()
+
+
+def test_not_found_is_cached(site):
+    site.responses = [FakeResponse(200, load_page('notfound'))]
+
+    assert scraper.get_player_stats('Typo') is None
+    assert scraper.get_player_stats('typo') is None
+
+    assert site.requests == 1
+
+
+def test_errors_are_not_negatively_cached(site):
+    site.responses = [FakeResponse(500), FakeResponse(200, load_page('normal'))]
+
+    assert scraper.get_player_stats('player') is None
+    assert scraper.get_player_stats('player') is not None
+    assert site.requests == 2
+
+
+def test_breaker_opens_on_timeouts_and_fails_fast(site):
+    site.responses = [requests.exceptions.ReadTimeout('slow')]
+
+    for index in range(3):
+        assert scraper.get_player_stats(f'player{index}') is None
+    with pytest.raises(scraper.IccupUnavailableError):
+        scraper.get_player_stats('player3')
+
+    assert site.requests == 3
+    assert scraper._breaker.state == CircuitBreaker.OPEN
+
+
+def test_breaker_ignores_not_found_and_counts_5xx(site):
+    site.responses = [FakeResponse(503)] * 2 + [FakeResponse(200, load_page('notfound')), FakeResponse(503)]
+
+    for index in range(4):
+        scraper.get_player_stats(f'player{index}')
+
+    # «Не найден» — нормальный ответ сайта: он сбрасывает счётчик подряд идущих ошибок
+    assert scraper._breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stale_entries_are_not_refreshed_while_open(site, monkeypatch):
+    site.responses = [requests.exceptions.ConnectTimeout('down')]
+    for index in range(3):
+        scraper.get_player_stats(f'player{index}')
+    stats = scraper.parse_player_stats(load_page('normal'))
+    scraper._stats_cache.set('cached', stats, ttl=-1)
+    started = []
+    monkeypatch.setattr(scraper.threading, 'Thread', lambda *args, **kwargs: started.append(kwargs))
+
+    assert scraper.get_player_stats('cached') is stats
+    assert started == []
+
+
+def test_refresh_to_not_found_drops_stale_entry(site):
+    stats = scraper.parse_player_stats(load_page('normal'))
+    scraper._stats_cache.set('renamed', stats, ttl=-1)
+    site.responses = [FakeResponse(200, load_page('notfound'))]
+
+    scraper.fetch_player_stats('renamed')
+
+    assert scraper._stats_cache.get('renamed') is None
+    assert scraper.get_player_stats('renamed') is None
+    assert site.requests == 1
@@ -0,0 +1,15 @@
+import pytest
+
+from storage import is_sqlite_file_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('sqlite:///site.db', True),
+    ('sqlite:////var/lib/bot/site.db', True),
+    ('sqlite://', False),
+    ('sqlite:///:memory:', False),
+    ('sqlite:///file:admin?mode=memory&uri=true', False),
+    ('postgresql://user@localhost/admin', False),
+])
+def test_is_sqlite_file_url(url, expected):
+    assert is_sqlite_file_url(url) is expected
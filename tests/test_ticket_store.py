@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+from ticket_store import TicketStore
+
+
+def make_ticket(user_id, problem='help'):
+    return {'user_id': user_id, 'username': None, 'full_name': 'Test', 'time': '2024-01-01 00:00:00',
+            'problem': problem, 'updates': [], 'closed': False}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'tickets.json'), str(tmp_path / 'tickets.journal')
+
+
+def open_store(paths, compact_every=1000):
+    snapshot_path, journal_path = paths
+    return TicketStore(snapshot_path, journal_path, compact_every=compact_every, fsync=False)
+
+
+def test_journal_is_replayed_after_restart(paths):
+    store = open_store(paths)
+    first = store.create(make_ticket(1))
+    second = store.create(make_ticket(2))
+    store.add_update(first, '2024-01-01 00:01:00', 'more details')
+    store.close(second)
+
+    reloaded = open_store(paths)
+
+    assert reloaded.get(first)['updates'] == [{'time': '2024-01-01 00:01:00', 'message': 'more details'}]
+    assert reloaded.get(second)['closed'] is True
+    assert reloaded.tickets == store.tickets
+
+
+def test_snapshot_and_newer_journal_records_are_combined(paths):
+    store = open_store(paths, compact_every=2)
+    first = store.create(make_ticket(1))
+    store.add_update(first, 't1', 'in snapshot')
+    store.add_update(first, 't2', 'in journal')
+
+    reloaded = open_store(paths)
+
+    assert [update['message'] for update in reloaded.get(first)['updates']] == ['in snapshot', 'in journal']
+
+
+def test_torn_last_record_is_truncated(paths):
+    store = open_store(paths)
+    ticket_id = store.create(make_ticket(1))
+    journal_path = paths[1]
+    with open(journal_path, encoding='utf-8') as f:
+        complete = f.read()
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'op': 'create', 'id': ticket_id + 1, 'ticket': make_ticket(2), 'seq': 99})[:25])
+
+    reloaded = open_store(paths)
+
+    assert list(reloaded.tickets) == [ticket_id]
+    with open(journal_path, encoding='utf-8') as f:
+        assert f.read() == complete
+    # Новые записи идут с начала строки, а не приклеиваются к обрывку
+    new_id = reloaded.create(make_ticket(3))
+    assert open_store(paths).get(new_id)['user_id'] == 3
+
+
+def test_ticket_ids_stay_unique_across_restart(paths, monkeypatch):
+    monkeypatch.setattr('ticket_store.time.time', lambda: 1_000)
+    store = open_store(paths)
+    ids = [store.create(make_ticket(user_id)) for user_id in range(3)]
+
+    reloaded = open_store(paths)
+    new_id = reloaded.create(make_ticket(4))
+
+    assert ids == [1_000, 1_001, 1_002]
+    assert new_id == 1_003
+
+
+def test_failed_write_leaves_memory_unchanged(paths):
+    store = open_store(paths)
+    ticket_id = store.create(make_ticket(1))
+
+    class BrokenJournal:
+        def write(self, data):
+            raise OSError('disk full')
+
+        def close(self):
+            pass
+
+    store._journal = BrokenJournal()
+    with pytest.raises(OSError):
+        store.close(ticket_id)
+
+    assert store.get(ticket_id)['closed'] is False
+    assert store.find_open_ticket(1) == ticket_id
+
+
+def test_open_ticket_index_follows_updates_and_close(paths):
+    store = open_store(paths)
+    first = store.create(make_ticket(1))
+    second = store.create(make_ticket(1))
+    other = store.create(make_ticket(2))
+
+    store.add_update(first, 't', 'follow-up')
+    assert store.find_open_ticket(1) == first
+
+    store.close(first)
+    assert store.find_open_ticket(1) == second
+    assert store.find_open_ticket(2) == other
+
+    store.close(second)
+    assert store.find_open_ticket(1) is None
+    assert 1 not in store._open_by_user
+
+
+def test_open_ticket_index_is_rebuilt_from_snapshot_and_journal(paths):
+    store = open_store(paths, compact_every=3)
+    closed = store.create(make_ticket(1))
+    store.close(closed)
+    in_snapshot = store.create(make_ticket(1))
+    in_journal = store.create(make_ticket(2))
+    store.close(in_snapshot)
+
+    reloaded = open_store(paths)
+
+    assert reloaded.find_open_ticket(1) is None
+    assert reloaded.find_open_ticket(2) == in_journal
+    assert reloaded._open_by_user == store._open_by_user
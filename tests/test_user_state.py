@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from user_state import UserStateStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr('user_state.time.time', clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'user_states.journal')
+
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_state_expires_after_ttl(clock, path):
+    store = UserStateStore(maxsize=10, ttl=60, path=path)
+    store.set(1, 'waiting')
+
+    clock.now += 59
+    assert store.get(1) == 'waiting'
+
+    clock.now += 2
+    assert store.get(1) is None
+    assert 1 not in store
+    assert store.stats()['expirations'] == 1
+
+
+def test_set_restarts_the_ttl(clock, path):
+    store = UserStateStore(maxsize=10, ttl=60, path=path)
+    store.set(1, 'waiting')
+    clock.now += 50
+    store.set(1, 'waiting')
+    clock.now += 50
+
+    assert store.get(1) == 'waiting'
+
+
+def test_least_recently_used_user_is_evicted(clock, path):
+    store = UserStateStore(maxsize=2, ttl=60, path=path)
+    store.set(1, 'a')
+    store.set(2, 'b')
+    # Обращение делает пользователя 1 самым свежим
+    assert store.get(1) == 'a'
+
+    store.set(3, 'c')
+
+    assert len(store) == 2
+    assert store.get(2) is None
+    assert (store.get(1), store.get(3)) == ('a', 'c')
+    assert store.stats()['evictions'] == 1
+
+
+def test_journal_is_replayed_on_restart(clock, path):
+    store = UserStateStore(maxsize=10, ttl=60, path=path)
+    store.set(1, 'a')
+    store.set(2, 'b')
+    store.set(1, 'c')
+    store.pop(2)
+
+    reloaded = UserStateStore(maxsize=10, ttl=60, path=path)
+
+    assert reloaded.get(1) == 'c'
+    assert reloaded.get(2) is None
+    assert len(reloaded) == 1
+
+
+def test_expired_states_and_torn_record_are_dropped_on_load(clock, path):
+    store = UserStateStore(maxsize=10, ttl=60, path=path)
+    store.set(1, 'old')
+    clock.now += 30
+    store.set(2, 'fresh')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('[3,"torn"')
+
+    clock.now += 40
+    reloaded = UserStateStore(maxsize=10, ttl=60, path=path)
+
+    assert reloaded.get(1) is None
+    assert reloaded.get(2) == 'fresh'
+    assert [record[:2] for record in read_records(path)] == [[2, 'fresh']]
+
+
+def test_journal_is_compacted_to_live_entries(clock, path):
+    store = UserStateStore(maxsize=10, ttl=60, path=path, compact_every=10)
+    for i in range(9):
+        store.set(1, f'state-{i}')
+    assert len(read_records(path)) == 9
+
+    store.set(2, 'other')
+
+    assert [record[:2] for record in read_records(path)] == [[1, 'state-8'], [2, 'other']]
+    assert store.stats()['journal_records'] == 2
+
+
+def test_close_rewrites_the_journal(clock, path):
+    store = UserStateStore(maxsize=10, ttl=60, path=path)
+    store.set(1, 'a')
+    store.set(2, 'b')
+    store.pop(1)
+
+    store.close()
+
+    assert [record[:2] for record in read_records(path)] == [[2, 'b']]
+
+
+def test_store_without_path_keeps_states_in_memory(clock, tmp_path):
+    store = UserStateStore(maxsize=10, ttl=60, path=None)
+    store.set(1, 'a')
+    store.close()
+
+    assert store.get(1) == 'a'
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,82 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from webhook import SECRET_TOKEN_HEADER, WebhookServer
+
+SECRET = 'test-secret'
+UPDATE = {
+    'update_id': 1,
+    'message': {
+        'message_id': 1,
+        'date': 0,
+        'text': '/start',
+        'chat': {'id': 42, 'type': 'private'},
+        'from': {'id': 7, 'is_bot': False, 'first_name': 'Test'},
+    },
+}
+
+
+class FakeBot:
+    def __init__(self):
+        self.updates = []
+
+    def process_new_updates(self, updates):
+        self.updates.extend(updates)
+
+
+@pytest.fixture
+def server():
+    server = WebhookServer(FakeBot(), '127.0.0.1', 0, '/hook', SECRET, max_body_size=4096)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, body, secret=SECRET, path='/hook', headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=5)
+    request_headers = {SECRET_TOKEN_HEADER: secret}
+    request_headers.update(headers or {})
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body)
+    try:
+        connection.request('POST', path, body=body, headers=request_headers)
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def test_valid_update_is_processed(server):
+    assert post(server, UPDATE) == 200
+    assert [update.update_id for update in server.bot.updates] == [1]
+    assert server.updates_received == 1
+
+
+def test_bad_secret_is_rejected(server):
+    assert post(server, UPDATE, secret='wrong') == 403
+    assert server.bot.updates == []
+    assert server.updates_rejected == 1
+
+
+def test_unknown_path_is_not_found(server):
+    assert post(server, UPDATE, path='/other') == 404
+
+
+@pytest.mark.parametrize('body', [[UPDATE], 'null', '42', 'not json'])
+def test_non_object_body_is_rejected(server, body):
+    assert post(server, body) == 400
+    assert server.bot.updates == []
+
+
+@pytest.mark.parametrize('length', ['-1', 'abc'])
+def test_bad_content_length_is_rejected(server, length):
+    assert post(server, '{}', headers={'Content-Length': length}) == 400
+
+
+def test_oversized_body_is_rejected(server):
+    assert post(server, ' ' * 5000) == 413
+    assert server.bot.updates == []
@@ -0,0 +1,195 @@
+import threading
+import time
+
+import pytest
+from telebot.types import InlineQuery, Message
+
+import bot as bot_module
+from config import Config
+from metrics import REGISTRY
+from player_stats import PlayerStats
+from workers import ChatTaskQueue, Debouncer
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not met in time'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def queue():
+    queue = ChatTaskQueue(max_workers=4, max_backlog=10, max_per_chat=3, name='test-worker')
+    yield queue
+    queue.shutdown()
+
+
+def test_tasks_of_one_chat_run_in_order(queue):
+    done = []
+    for i in range(3):
+        assert queue.submit('chat', lambda i=i: (time.sleep(0.01), done.append(i)))
+
+    wait_until(lambda: len(done) == 3)
+
+    assert done == [0, 1, 2]
+
+
+def test_different_chats_run_in_parallel(queue):
+    release = threading.Event()
+    started = []
+    for chat_id in ('a', 'b'):
+        queue.submit(chat_id, lambda chat_id=chat_id: (started.append(chat_id), release.wait(5)))
+
+    wait_until(lambda: len(started) == 2)
+    release.set()
+
+    assert sorted(started) == ['a', 'b']
+
+
+def test_per_chat_limit_rejects_only_that_chat(queue):
+    release = threading.Event()
+    queue.submit('busy', release.wait, 5)
+    wait_until(lambda: queue.stats()['active'] == 1)
+    for _ in range(3):
+        assert queue.submit('busy', lambda: None)
+
+    assert not queue.submit('busy', lambda: None)
+    assert queue.submit('other', lambda: None)
+    release.set()
+    assert queue.stats()['rejected'] == 1
+
+
+def test_backlog_limit_rejects_all_chats():
+    queue = ChatTaskQueue(max_workers=1, max_backlog=2, max_per_chat=5)
+    release = threading.Event()
+    try:
+        queue.submit('a', release.wait, 5)
+        wait_until(lambda: queue.stats()['active'] == 1)
+        assert queue.submit('a', lambda: None)
+        assert queue.submit('b', lambda: None)
+
+        assert not queue.submit('c', lambda: None)
+        assert queue.stats()['queue_depth'] == 2
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+def test_failed_task_does_not_block_the_chat(queue):
+    done = []
+    queue.submit('chat', lambda: 1 / 0)
+    queue.submit('chat', lambda: done.append(True))
+
+    wait_until(lambda: done)
+
+    assert queue.stats()['failed'] == 1
+
+
+def make_message(text):
+    return Message.de_json({
+        'message_id': 1,
+        'date': 0,
+        'text': text,
+        'chat': {'id': 42, 'type': 'private'},
+        'from': {'id': 7, 'is_bot': False, 'first_name': 'Test'},
+    })
+
+
+def find_command_handler(bot, command):
+    for handler in bot.message_handlers:
+        if command in (handler['filters'].get('commands') or ()):
+            return handler['function']
+    raise LookupError(command)
+
+
+def test_full_stats_queue_answers_the_user(monkeypatch):
+    monkeypatch.setattr(Config, 'STATS_QUEUE_LIMIT', 0)
+    bot = bot_module.setup_bot('123:TEST')
+    sent = []
+    monkeypatch.setattr(bot, 'send_message', lambda chat_id, text, **kwargs: sent.append((chat_id, text)))
+    monkeypatch.setattr(bot, 'send_chat_action', lambda *args: pytest.fail('request must not be queued'))
+    try:
+        find_command_handler(bot, 'stats')(make_message('/stats Player'))
+        wait_until(lambda: sent)
+    finally:
+        bot.stats_queue.shutdown()
+
+    assert sent == [(42, 'Сейчас слишком много запросов статистики. Пожалуйста, попробуйте через минуту.')]
+    assert 'worker_queue_rejected_total{queue="stats"} 1' in REGISTRY.render().splitlines()
+
+
+def test_debouncer_runs_only_the_last_call_per_key():
+    debouncer = Debouncer(0.05)
+    calls = []
+    for text in ('P', 'Pl', 'Player'):
+        debouncer.submit('user-1', calls.append, text)
+    debouncer.submit('user-2', calls.append, 'Other')
+
+    wait_until(lambda: len(calls) == 2)
+    time.sleep(0.1)
+
+    assert sorted(calls) == ['Other', 'Player']
+    assert debouncer.superseded == 2
+
+
+def test_debouncer_cancel_drops_pending_call():
+    debouncer = Debouncer(0.05)
+    calls = []
+    debouncer.submit('user', calls.append, 'x')
+    debouncer.cancel('user')
+    debouncer.submit('other', calls.append, 'y')
+
+    wait_until(lambda: calls)
+    time.sleep(0.1)
+
+    assert calls == ['y']
+
+
+def test_debouncer_uses_one_thread_for_all_keys():
+    debouncer = Debouncer(0.05, name='test-debouncer')
+    calls = []
+    before = threading.active_count()
+    for i in range(50):
+        debouncer.submit(i % 10, calls.append, i)
+
+    assert threading.active_count() <= before + 1
+    wait_until(lambda: len(calls) == 10)
+
+
+def make_inline_query(query_id, user_id, text):
+    return InlineQuery.de_json({
+        'id': str(query_id),
+        'from': {'id': user_id, 'is_bot': False, 'first_name': 'Test'},
+        'query': text,
+        'offset': '',
+    })
+
+
+def test_repeated_inline_queries_scrape_once(monkeypatch):
+    scrapes = []
+
+    def get_player_stats(nickname):
+        scrapes.append(nickname)
+        return PlayerStats.from_dict({'username': nickname, 'pts': 1000})
+
+    monkeypatch.setattr(bot_module, 'get_player_stats', get_player_stats)
+    monkeypatch.setattr(Config, 'INLINE_DEBOUNCE', 0.05)
+    bot = bot_module.setup_bot('123:TEST')
+    answers = []
+    monkeypatch.setattr(bot, 'answer_inline_query',
+                        lambda query_id, results, cache_time: answers.append((query_id, len(results))))
+    handler = bot.inline_handlers[0]['function']
+    try:
+        # Набор ника по буквам, затем повторные запросы того же ника от разных пользователей
+        for query_id, text in enumerate(('Pl', 'Pla', 'Player', 'player')):
+            handler(make_inline_query(query_id, 7, text))
+        wait_until(lambda: answers)
+        for query_id, user_id in ((10, 7), (11, 8), (12, 9)):
+            handler(make_inline_query(query_id, user_id, 'Player'))
+        wait_until(lambda: len(answers) == 4)
+    finally:
+        bot.stats_queue.shutdown()
+
+    assert scrapes == ['player']
+    assert answers == [('3', 1), ('10', 1), ('11', 1), ('12', 1)]
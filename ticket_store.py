@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from metrics import TICKET_STORE_WRITE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class TicketStore:
+    """
+    Support tickets kept in memory and persisted as a snapshot plus an append-only journal.
+
+    Every change is appended to the journal as one compact JSON line, so the
+    cost of a write does not depend on the number of stored tickets. After
+    compact_every records the whole state is written to a new snapshot and the
+    journal is truncated. At startup the state is rebuilt from the snapshot and
+    the journal records written after it.
+    """
+
+    def __init__(self, snapshot_path: str, journal_path: str, compact_every: int = 1000, fsync: bool = True):
+        """
+        Args:
+            snapshot_path: Path of the JSON snapshot (the legacy tickets.json format is also accepted)
+            journal_path: Path of the append-only journal
+            compact_every: Number of journal records after which a new snapshot is written
+            fsync: Whether to fsync every journal record before returning
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.tickets: Dict[int, Dict] = {}
+        # Индекс открытых тикетов: user_id -> ID открытых тикетов по возрастанию
+        self._open_by_user: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._last_id = 0
+        self._journal_records = 0
+        self._journal = None
+        self._load()
+
+    # --- Загрузка состояния ---
+
+    def _load(self) -> None:
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+
+        if 'tickets' in data and 'seq' in data:
+            self._seq = data['seq']
+            self._last_id = data.get('last_id', 0)
+            tickets = data['tickets']
+        else:
+            # Старый формат: весь файл — словарь тикетов
+            tickets = data
+        self.tickets = {int(ticket_id): ticket for ticket_id, ticket in tickets.items()}
+        self._last_id = max([self._last_id, *self.tickets])
+        for ticket_id in sorted(self.tickets):
+            self._index(ticket_id)
+
+        self._replay_journal()
+        logger.info("Loaded %s tickets (%s journal records)", len(self.tickets), self._journal_records)
+
+    def _replay_journal(self) -> None:
+        """Apply journal records newer than the snapshot and cut off a torn last record."""
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return
+
+        good_offset = 0
+        with f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('record is not terminated')
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning("Ignoring incomplete journal record at offset %s", good_offset)
+                    break
+                good_offset += len(line)
+                self._journal_records += 1
+                if record['seq'] > self._seq:
+                    self._apply(record)
+                    self._seq = record['seq']
+            end = f.seek(0, os.SEEK_END)
+
+        if good_offset < end:
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(good_offset)
+
+    def _apply(self, record: Dict) -> None:
+        op = record['op']
+        ticket_id = record['id']
+        if op == 'create':
+            self.tickets[ticket_id] = record['ticket']
+            self._last_id = max(self._last_id, ticket_id)
+            self._index(ticket_id)
+        elif op == 'update':
+            self.tickets[ticket_id]['updates'].append(record['update'])
+        elif op == 'close':
+            ticket = self.tickets[ticket_id]
+            ticket['closed'] = True
+            open_ids = self._open_by_user.get(ticket['user_id'], [])
+            if ticket_id in open_ids:
+                open_ids.remove(ticket_id)
+                if not open_ids:
+                    del self._open_by_user[ticket['user_id']]
+
+    def _index(self, ticket_id: int) -> None:
+        """Register an open ticket in the per-user index (IDs are added in increasing order)."""
+        ticket = self.tickets[ticket_id]
+        if not ticket.get('closed'):
+            self._open_by_user.setdefault(ticket['user_id'], []).append(ticket_id)
+
+    # --- Запись ---
+
+    def _append(self, record: Dict) -> None:
+        """Append a record to the journal and apply it in memory once it is durable."""
+        record['seq'] = self._seq + 1
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with TICKET_STORE_WRITE_SECONDS.time('append'):
+            if self._journal is None:
+                self._journal = open(self.journal_path, 'a', encoding='utf-8')
+            self._journal.write(line)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+        # Изменение видно только после записи: при ошибке записи состояние в памяти не расходится с диском
+        self._seq = record['seq']
+        self._apply(record)
+        self._journal_records += 1
+        if self._journal_records >= self.compact_every:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Write the full state to a new snapshot and start an empty journal."""
+        data = {'seq': self._seq, 'last_id': self._last_id, 'tickets': self.tickets}
+        tmp_path = self.snapshot_path + '.tmp'
+        with TICKET_STORE_WRITE_SECONDS.time('snapshot'):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            self._fsync_dir(self.snapshot_path)
+
+        # Снимок уже содержит все записи журнала; при сбое до очистки они пропускаются по seq
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, 'w', encoding='utf-8')
+        self._journal_records = 0
+        logger.info("Compacted ticket journal into snapshot at seq %s", self._seq)
+
+    @staticmethod
+    def _fsync_dir(path: str) -> None:
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _new_ticket_id(self) -> int:
+        # Идентификатор похож на timestamp, но всегда строго возрастает
+        self._last_id = max(int(time.time()), self._last_id + 1)
+        return self._last_id
+
+    # --- Публичный интерфейс ---
+
+    def get(self, ticket_id: int) -> Optional[Dict]:
+        return self.tickets.get(ticket_id)
+
+    def find_open_ticket(self, user_id: int) -> Optional[int]:
+        """Return the ID of the user's oldest open ticket, or None."""
+        open_ids = self._open_by_user.get(user_id)
+        return open_ids[0] if open_ids else None
+
+    def create(self, ticket: Dict) -> int:
+        """Store a new ticket and return its ID."""
+        with self._lock:
+            ticket_id = self._new_ticket_id()
+            self._append({'op': 'create', 'id': ticket_id, 'ticket': ticket})
+            return ticket_id
+
+    def add_update(self, ticket_id: int, time_str: str, message: str) -> None:
+        """Append a user's follow-up message to a ticket."""
+        with self._lock:
+            self._append({'op': 'update', 'id': ticket_id, 'update': {'time': time_str, 'message': message}})
+
+    def close(self, ticket_id: int) -> None:
+        with self._lock:
+            self._append({'op': 'close', 'id': ticket_id})
+
+    def compact(self) -> None:
+        with self._lock:
+            self._compact()
+
+    def shutdown(self) -> None:
+        """Write a final snapshot and close the journal."""
+        with self._lock:
+            self._compact()
+            self._journal.close()
+            self._journal = None
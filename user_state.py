@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class UserStateStore:
+    """
+    Conversation states of bot users with TTL, a size bound and an incremental journal.
+
+    Each user takes one compact record (state, expires_at). Expired entries are
+    dropped on access and when the store is loaded; when the store is full the
+    least recently used user is evicted. Every change is appended to the
+    journal as one short JSON line, and the file is rewritten with only the
+    live entries once the journal grows well past the number of users in it.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, path: Optional[str] = None, compact_every: int = 1000):
+        """
+        Args:
+            maxsize: Maximum number of users with a pending state
+            ttl: Seconds after which a state that was not updated expires
+            path: Path of the journal file; None keeps the states in memory only
+            compact_every: Minimum number of journal records before the file is rewritten
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.compact_every = compact_every
+        # user_id -> (state, expires_at); время по часам системы, чтобы переживать перезапуск
+        self._data: "OrderedDict[int, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._journal = None
+        self._journal_records = 0
+        self.expirations = 0
+        self.evictions = 0
+        if path:
+            self._load()
+
+    # --- Журнал ---
+
+    def _load(self) -> None:
+        try:
+            f = open(self.path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    user_id, state, expires_at = json.loads(line)
+                except ValueError:
+                    # Оборванная последняя запись после сбоя
+                    logger.warning("Ignoring incomplete user state record in %s", self.path)
+                    break
+                self._journal_records += 1
+                self._data.pop(user_id, None)
+                if state is not None:
+                    self._data[user_id] = (state, expires_at)
+
+        now = time.time()
+        for user_id in [u for u, (_, expires_at) in self._data.items() if expires_at <= now]:
+            del self._data[user_id]
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        # Переписываем файл сразу: в нём остаются только живые записи
+        self._compact()
+        logger.info("Loaded %s user states", len(self._data))
+
+    def _write(self, user_id: int, state: Optional[str], expires_at: float = 0) -> None:
+        if not self.path:
+            return
+        if self._journal is None:
+            self._journal = open(self.path, 'a', encoding='utf-8')
+        self._journal.write(json.dumps([user_id, state, round(expires_at, 1)], separators=(',', ':')) + '\n')
+        self._journal.flush()
+        self._journal_records += 1
+        if self._journal_records >= max(self.compact_every, 2 * len(self._data)):
+            self._compact()
+
+    def _compact(self) -> None:
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for user_id, (state, expires_at) in self._data.items():
+                f.write(json.dumps([user_id, state, round(expires_at, 1)], separators=(',', ':')) + '\n')
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        os.replace(tmp_path, self.path)
+        self._journal_records = len(self._data)
+
+    # --- Публичный интерфейс ---
+
+    def get(self, user_id: int) -> Optional[str]:
+        """Return the user's current state, or None if there is none or it has expired."""
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            state, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[user_id]
+                self.expirations += 1
+                self._write(user_id, None)
+                return None
+            self._data.move_to_end(user_id)
+            return state
+
+    def set(self, user_id: int, state: str) -> None:
+        """Set the user's state and restart its TTL, evicting the least recently used users if full."""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._data[user_id] = (state, expires_at)
+            self._data.move_to_end(user_id)
+            self._write(user_id, state, expires_at)
+            while len(self._data) > self.maxsize:
+                evicted, (_, evicted_expires_at) = self._data.popitem(last=False)
+                if evicted_expires_at <= expires_at - self.ttl:
+                    self.expirations += 1
+                else:
+                    self.evictions += 1
+                self._write(evicted, None)
+
+    def pop(self, user_id: int) -> Optional[str]:
+        """Remove the user's state and return it."""
+        with self._lock:
+            entry = self._data.pop(user_id, None)
+            if entry is None:
+                return None
+            self._write(user_id, None)
+            return entry[0]
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.get(user_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def purge_expired(self) -> int:
+        """Drop all expired entries; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [user_id for user_id, (_, expires_at) in self._data.items() if expires_at <= now]
+            for user_id in expired:
+                del self._data[user_id]
+                self._write(user_id, None)
+            self.expirations += len(expired)
+            return len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'journal_records': self._journal_records,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+            }
+
+    def close(self) -> None:
+        """Rewrite the journal with the live entries and close it."""
+        with self._lock:
+            self._compact()
@@ -0,0 +1,131 @@
+import hmac
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import telebot
+from telebot.types import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+# Обновления Telegram занимают единицы килобайт; больше — не от Telegram
+DEFAULT_MAX_BODY_SIZE = 1024 * 1024
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """
+    HTTP server that receives Telegram updates and feeds them to a TeleBot.
+
+    Updates are passed to bot.process_new_updates, so the same handlers that
+    setup_bot registers for polling are used. With a threaded TeleBot the
+    handlers run on the bot's worker pool and the HTTP response is sent
+    right away.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, bot: telebot.TeleBot, host: str, port: int, path: str, secret_token: Optional[str],
+                 max_body_size: int = DEFAULT_MAX_BODY_SIZE):
+        """
+        Args:
+            bot: Bot instance with registered handlers
+            host: Interface to listen on
+            port: Port to listen on
+            path: URL path Telegram posts updates to
+            secret_token: Expected value of the secret token header (None disables the check)
+            max_body_size: Largest accepted request body in bytes; larger requests get 413
+        """
+        super().__init__((host, port), WebhookRequestHandler)
+        self.bot = bot
+        self.webhook_path = path
+        self.secret_token = secret_token
+        self.max_body_size = max_body_size
+        self.updates_received = 0
+        self.updates_rejected = 0
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    server: WebhookServer
+
+    def do_POST(self):
+        if self.path != self.server.webhook_path:
+            self._reply(404)
+            return
+
+        secret_token = self.server.secret_token
+        if secret_token and not hmac.compare_digest(
+                self.headers.get(SECRET_TOKEN_HEADER, ''), secret_token):
+            self.server.updates_rejected += 1
+            logger.warning("Rejected webhook request from %s: bad secret token", self.client_address[0])
+            self._reply(403)
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            logger.warning("Rejected webhook request with bad Content-Length: %r", self.headers.get('Content-Length'))
+            self._reply(400)
+            return
+        if length > self.server.max_body_size:
+            logger.warning("Rejected webhook request of %d bytes (limit %d)", length, self.server.max_body_size)
+            # Тело не читаем, поэтому соединение дальше использовать нельзя
+            self.close_connection = True
+            self._reply(413)
+            return
+
+        try:
+            data = json.loads(self.rfile.read(length))
+            # de_json принимает и null, и списки — вернул бы None или упал не на том месте
+            if not isinstance(data, dict):
+                raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+            update = Update.de_json(data)
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.warning("Malformed webhook update: %r", e)
+            self._reply(400)
+            return
+
+        self.server.updates_received += 1
+        try:
+            self.server.bot.process_new_updates([update])
+        except Exception as e:
+            logger.exception("Error processing update %s: %s", update.update_id, e)
+        self._reply(200)
+
+    def _reply(self, status: int):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def run_webhook(bot: telebot.TeleBot, host: str, port: int, path: str,
+                secret_token: Optional[str] = None, public_url: Optional[str] = None,
+                max_body_size: int = DEFAULT_MAX_BODY_SIZE) -> WebhookServer:
+    """
+    Create the webhook server and register the webhook with Telegram.
+
+    Args:
+        bot: Bot instance with registered handlers
+        host: Interface to listen on
+        port: Port to listen on
+        path: URL path Telegram posts updates to
+        secret_token: Secret token Telegram must send with every update
+        public_url: Public HTTPS URL of the webhook; if set, it is registered via setWebhook
+        max_body_size: Largest accepted request body in bytes
+
+    Returns:
+        Server ready for serve_forever()
+    """
+    server = WebhookServer(bot, host, port, path, secret_token, max_body_size)
+    if public_url:
+        bot.remove_webhook()
+        bot.set_webhook(url=public_url, secret_token=secret_token)
+        logger.info("Webhook registered at %s", public_url)
+    logger.info("Webhook server listening on %s:%s%s", host, server.server_port, path)
+    return server
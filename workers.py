@@ -0,0 +1,194 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ChatTaskQueue:
+    """
+    Bounded worker pool with a FIFO queue per chat.
+
+    Tasks of one chat run one at a time in submission order, while different
+    chats are served in parallel by a fixed number of worker threads. Once the
+    backlog limit is reached, new tasks are rejected instead of queued.
+    """
+
+    def __init__(self, max_workers: int, max_backlog: int, max_per_chat: int, name: str = 'worker'):
+        """
+        Args:
+            max_workers: Number of worker threads
+            max_backlog: Maximum number of queued (not yet started) tasks across all chats
+            max_per_chat: Maximum number of queued tasks for a single chat
+            name: Prefix for worker thread names
+        """
+        self.max_backlog = max_backlog
+        self.max_per_chat = max_per_chat
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        # Очередь чата существует, пока в нём есть задачи или одна выполняется
+        self._chat_queues: Dict[Hashable, Deque[Tuple[float, Callable, tuple]]] = {}
+        self._pending = 0
+        self._active = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def submit(self, chat_id: Hashable, func: Callable, *args) -> bool:
+        """
+        Queue a task for a chat.
+
+        Returns:
+            True if the task was accepted, False if the backlog limit was hit
+        """
+        with self._lock:
+            queue = self._chat_queues.get(chat_id)
+            if self._pending >= self.max_backlog or (queue is not None and len(queue) >= self.max_per_chat):
+                self.rejected += 1
+                return False
+
+            item = (time.monotonic(), func, args)
+            start_worker = queue is None
+            if start_worker:
+                self._chat_queues[chat_id] = deque([item])
+            else:
+                queue.append(item)
+            self._pending += 1
+            self.submitted += 1
+
+        if start_worker:
+            self._executor.submit(self._run_next, chat_id)
+        return True
+
+    def _run_next(self, chat_id: Hashable) -> None:
+        """Run the oldest task of a chat and reschedule the chat if more tasks are waiting."""
+        with self._lock:
+            enqueued_at, func, args = self._chat_queues[chat_id].popleft()
+            self._pending -= 1
+            self._active += 1
+            wait = time.monotonic() - enqueued_at
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+
+        failed = False
+        try:
+            func(*args)
+        except Exception as e:
+            failed = True
+            logger.exception("Task for chat %s failed: %s", chat_id, e)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self.completed += 1
+                self.failed += failed
+                has_more = bool(self._chat_queues[chat_id])
+                if not has_more:
+                    del self._chat_queues[chat_id]
+
+        # Возвращаем чат в общую очередь, чтобы другие чаты не ждали
+        if has_more:
+            self._executor.submit(self._run_next, chat_id)
+
+    def stats(self) -> Dict[str, float]:
+        """Return queue depth, wait time and throughput counters."""
+        with self._lock:
+            started = self.completed + self._active
+            return {
+                'queue_depth': self._pending,
+                'active': self._active,
+                'chats': len(self._chat_queues),
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+                'avg_wait_seconds': self._wait_total / started if started else 0.0,
+                'max_wait_seconds': self._wait_max,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+class Debouncer:
+    """
+    Run only the last call of a burst per key, once the key has been quiet for delay seconds.
+
+    Used for inline queries, which Telegram sends on every keystroke: each new
+    call for a key replaces the pending one, so only the final text is handled.
+    All keys share one scheduler thread with a heap of deadlines, so a
+    keystroke costs a heap push instead of a new thread. Calls run on that
+    thread and should only hand work off (e.g. to a ChatTaskQueue).
+    """
+
+    def __init__(self, delay: float, name: str = 'debouncer'):
+        """
+        Args:
+            delay: Seconds without a new call before the pending one runs
+            name: Name of the scheduler thread
+        """
+        self.delay = delay
+        self.name = name
+        self._cond = threading.Condition()
+        # key -> (seq, func, args) последнего вызова; в куче (срок, seq, key), устаревшие записи пропускаются
+        self._pending: Dict[Hashable, Tuple[int, Callable, tuple]] = {}
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self.submitted = 0
+        self.superseded = 0
+
+    def submit(self, key: Hashable, func: Callable, *args) -> None:
+        """Schedule func(*args) for key, replacing a call that has not run yet."""
+        with self._cond:
+            self.submitted += 1
+            if key in self._pending:
+                self.superseded += 1
+            seq = next(self._seq)
+            self._pending[key] = (seq, func, args)
+            heapq.heappush(self._heap, (time.monotonic() + self.delay, seq, key))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self, key: Hashable) -> None:
+        """Drop the pending call for key, if any."""
+        with self._cond:
+            self._pending.pop(key, None)
+
+    def _next_due(self) -> Tuple[Hashable, Callable, tuple]:
+        """Wait for the earliest pending call whose delay has passed and take it."""
+        with self._cond:
+            while True:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, seq, key = self._heap[0]
+                entry = self._pending.get(key)
+                if entry is None or entry[0] != seq:
+                    # Вызов заменён или отменён
+                    heapq.heappop(self._heap)
+                    continue
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._heap)
+                del self._pending[key]
+                return key, entry[1], entry[2]
+
+    def _run(self) -> None:
+        while True:
+            key, func, args = self._next_due()
+            try:
+                func(*args)
+            except Exception as e:
+                logger.exception("Debounced call for %s failed: %s", key, e)